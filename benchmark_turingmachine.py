@@ -0,0 +1,428 @@
+# benchmark_turingmachine.py - benchmarks for turingmachine.py
+#
+# Copyright 2014 Jeffrey Finkelstein.
+#
+# This file is part of turingmachine.
+#
+# turingmachine is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# turingmachine is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# turingmachine.  If not, see <http://www.gnu.org/licenses/>.
+"""Provides benchmarks for :mod:`turingmachine`.
+
+Run this module as a script to run a suite of standard workloads at several
+input sizes and write the results as JSON::
+
+    python3 benchmark_turingmachine.py run --engine table -o table.json
+    python3 benchmark_turingmachine.py run --engine codegen -o codegen.json
+
+and to compare two sets of results, flagging regressions::
+
+    python3 benchmark_turingmachine.py compare table.json codegen.json
+
+The ``codegen`` and ``lockstep`` commands compare the throughput of the
+generated code and of the lockstep simulator with that of the table
+engine.
+
+For each workload and input size, the results include the number of steps,
+the wall time, the number of steps per second, and the peak memory
+allocated during the computation. For each workload, they also include the
+scaling exponent of the wall time, that is, the slope of the line of best fit
+through the logarithm of the wall time as a function of the logarithm of the
+input size.
+
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from example_machines import binary_counter_machine
+from example_machines import BUSY_BEAVERS
+from example_machines import busy_beaver_machine
+from example_machines import is_even_machine
+from example_machines import move_left_right_machine
+from example_machines import palindrome_machine
+from example_machines import parity_machine
+from example_machines import unary_multiplication_machine
+from turingmachine import ENGINES
+
+#: The version of the format of the JSON results.
+FORMAT_VERSION = 1
+
+#: The default fraction by which a measurement may worsen before
+#: :func:`compare` reports it as a regression.
+DEFAULT_THRESHOLD = 0.1
+
+
+def palindrome_input(size):
+    """Returns a binary palindrome of length `size`, surrounded by
+    blanks.
+
+    """
+    half = ('0110' * size)[:size // 2]
+    middle = '1' if size % 2 else ''
+    return '_' + half + middle + half[::-1] + '_'
+
+
+class Workload(object):
+    """A Turing machine and a family of inputs of increasing size on which to
+    benchmark it.
+
+    `machine` is a function that returns the :class:`TuringMachine`. `input`
+    is a function that returns the input string of a given size. `sizes` and
+    `quick_sizes` are the sizes at which to run the benchmark normally and
+    in quick mode, respectively. If `budget` is ``True``, the size is also
+    the budget of steps for each computation, for machines that run for too
+    long to complete.
+
+    """
+
+    def __init__(self, machine, input, sizes, quick_sizes, budget=False):
+        self.machine = machine
+        self.input = input
+        self.sizes = sizes
+        self.quick_sizes = quick_sizes
+        self.budget = budget
+
+
+#: The standard workloads, by name.
+WORKLOADS = {
+    'parity': Workload(parity_machine,
+                       lambda n: '_' + '01' * (n // 2) + '_',
+                       (10 ** 4, 10 ** 5, 10 ** 6), (10 ** 3, 10 ** 4)),
+    'is_even': Workload(is_even_machine,
+                        lambda n: '_' + '10' * (n // 2) + '_',
+                        (10 ** 4, 10 ** 5, 10 ** 6), (10 ** 3, 10 ** 4)),
+    'palindrome': Workload(palindrome_machine, palindrome_input,
+                           (250, 500, 1000, 2000), (50, 100)),
+    'move_left_right': Workload(move_left_right_machine,
+                                lambda n: '_' + '0' * n + '_',
+                                (10 ** 4, 10 ** 5, 10 ** 6),
+                                (10 ** 3, 10 ** 4)),
+    'binary_counter': Workload(binary_counter_machine,
+                               lambda n: '_' + '0' * n + '_',
+                               (10, 12, 14, 16), (6, 8)),
+    'unary_multiplication': Workload(
+        unary_multiplication_machine,
+        lambda n: '_' + '1' * n + 'x' + '1' * n + '_',
+        (10, 20, 40), (5, 10)),
+    'busy_beaver_4': Workload(lambda: busy_beaver_machine(BUSY_BEAVERS[4]),
+                              lambda n: '__', (107,), (107,)),
+    'busy_beaver_5': Workload(lambda: busy_beaver_machine(BUSY_BEAVERS[5]),
+                              lambda n: '__', (10 ** 5, 10 ** 6, 10 ** 7),
+                              (10 ** 4, 10 ** 5), budget=True),
+    }
+
+
+def measure(function, *args, **kw):
+    """Calls `function` with the given arguments and returns the two-tuple
+    *(result, seconds)*, where *seconds* is the wall time of the call.
+
+    """
+    start = time.perf_counter()
+    result = function(*args, **kw)
+    return result, time.perf_counter() - start
+
+
+def measure_memory(function, *args, **kw):
+    """Calls `function` with the given arguments and returns the peak number
+    of bytes allocated during the call, as measured by :mod:`tracemalloc`.
+
+    """
+    tracemalloc.start()
+    try:
+        function(*args, **kw)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def scaling_exponent(sizes, values):
+    """Returns the slope of the least squares line through the points
+    (log *size*, log *value*), or ``None`` if there are fewer than two
+    distinct sizes.
+
+    If *value* is proportional to *size* ** *k*, the slope is *k*.
+
+    """
+    points = [(math.log(size), math.log(value))
+              for size, value in zip(sizes, values) if value > 0]
+    if len(set(x for x, y in points)) < 2:
+        return None
+    mean_x = sum(x for x, y in points) / len(points)
+    mean_y = sum(y for x, y in points) / len(points)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    variance = sum((x - mean_x) ** 2 for x, y in points)
+    return covariance / variance
+
+
+def run_workload(name, workload, engine='table', quick=False, repeat=1,
+                 memory=True):
+    """Runs the workload named `name` at each of its sizes and returns the
+    list of measurements, one dictionary for each size.
+
+    The wall time is the minimum over `repeat` runs. If `memory` is
+    ``True``, the workload is run once more with :mod:`tracemalloc` enabled
+    to measure the peak memory, since tracing slows down the computation.
+
+    """
+    machine = workload.machine()
+    measurements = []
+    for size in workload.quick_sizes if quick else workload.sizes:
+        string = workload.input(size)
+        max_steps = size if workload.budget else None
+        # Compile the machine (and generate its code, for the codegen
+        # engine) before timing it.
+        machine.run(string, 1, engine)
+        seconds = float('inf')
+        for i in range(repeat):
+            configuration, elapsed = measure(machine.run, string, max_steps,
+                                             engine)
+            seconds = min(seconds, elapsed)
+        measurement = dict(workload=name, size=size,
+                           status=configuration.status,
+                           steps=configuration.steps, seconds=seconds,
+                           steps_per_second=configuration.steps / seconds)
+        if memory:
+            measurement['peak_memory'] = measure_memory(
+                machine.run, string, max_steps, engine)
+        measurements.append(measurement)
+    return measurements
+
+
+def run(names=None, engine='table', quick=False, repeat=1, memory=True,
+        output=sys.stdout):
+    """Runs the workloads with the given `names` (or all the workloads in
+    :data:`WORKLOADS`) and returns the results as a dictionary suitable for
+    writing as JSON.
+
+    A line of text is written to `output` for each measurement as it is
+    made.
+
+    """
+    if names is None:
+        names = sorted(WORKLOADS)
+    measurements = []
+    scaling = {}
+    for name in names:
+        results = run_workload(name, WORKLOADS[name], engine, quick, repeat,
+                               memory)
+        for result in results:
+            output.write('{workload:>22} {size:>10} {steps:>12}'
+                         ' {seconds:>10.4f}s {steps_per_second:>14.0f}'
+                         ' steps/s\n'.format(**result))
+        measurements += results
+        scaling[name] = scaling_exponent([r['size'] for r in results],
+                                         [r['seconds'] for r in results])
+    return dict(version=FORMAT_VERSION, engine=engine, quick=quick,
+                python=platform.python_version(),
+                time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                measurements=measurements, scaling=scaling)
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Compares the results `current` with the results `baseline` (as
+    returned by :func:`run`) and returns the list of regressions.
+
+    A measurement has regressed if its number of steps per second has
+    decreased, or its peak memory has increased, by more than the fraction
+    `threshold` of the baseline. It has also regressed if its status or its
+    number of steps has changed at all, since then the engine no longer
+    computes the same thing. Each regression is described by a dictionary
+    with the name of the workload, the size, the name of the metric, the
+    baseline and current values, and the relative change (or ``None``, for
+    the status and the number of steps).
+
+    """
+    measured = {(m['workload'], m['size']): m
+                for m in baseline['measurements']}
+    regressions = []
+    for measurement in current['measurements']:
+        key = (measurement['workload'], measurement['size'])
+        if key not in measured:
+            continue
+        old = measured[key]
+        for metric in 'status', 'steps':
+            if old[metric] != measurement[metric]:
+                regressions.append(dict(
+                    workload=key[0], size=key[1], metric=metric,
+                    baseline=old[metric], current=measurement[metric],
+                    change=None))
+        # The sign of each metric is positive if larger values are better.
+        for metric, sign in ('steps_per_second', 1), ('peak_memory', -1):
+            if metric not in old or metric not in measurement:
+                continue
+            if not old[metric]:
+                continue
+            change = (measurement[metric] - old[metric]) / old[metric]
+            if sign * change < -threshold:
+                regressions.append(dict(
+                    workload=key[0], size=key[1], metric=metric,
+                    baseline=old[metric], current=measurement[metric],
+                    change=change))
+    return regressions
+
+
+def benchmark_codegen(names=None, quick=False):
+    """Prints the number of steps per second taken by the table engine and
+    by the generated code for the workloads with the given `names` (or all
+    the workloads in :data:`WORKLOADS`) at each of their sizes.
+
+    """
+    if names is None:
+        names = sorted(WORKLOADS)
+    print('{:>22} {:>10} {:>12} {:>14} {:>15} {:>8}'.format(
+        'workload', 'size', 'steps', 'table steps/s', 'codegen steps/s',
+        'speedup'))
+    for name in names:
+        workload = WORKLOADS[name]
+        machine = workload.machine()
+        for size in workload.quick_sizes if quick else workload.sizes:
+            string = workload.input(size)
+            max_steps = size if workload.budget else None
+            # Generate the code before timing it.
+            machine.run(string, 1, 'codegen')
+            table, table_time = measure(machine.run, string, max_steps)
+            generated, generated_time = measure(machine.run, string,
+                                                max_steps, 'codegen')
+            assert table.status == generated.status
+            assert table.steps == generated.steps
+            print('{:>22} {:>10} {:>12} {:>14.0f} {:>15.0f} {:>7.2f}x'.format(
+                name, size, table.steps, table.steps / table_time,
+                generated.steps / generated_time,
+                table_time / generated_time))
+
+
+def benchmark_lockstep(count=20000, sizes=(8, 16, 32)):
+    """Prints the number of inputs per second evaluated by running the
+    parity, is_even, and palindrome machines on `count` random binary
+    strings of each of the given sizes, one at a time and with the lockstep
+    simulator.
+
+    """
+    generator = random.Random(0)
+    print('{:>12} {:>6} {:>13} {:>18} {:>8}'.format(
+        'workload', 'size', 'run inputs/s', 'lockstep inputs/s', 'speedup'))
+    for name in 'parity', 'is_even', 'palindrome':
+        machine = WORKLOADS[name].machine()
+        for size in sizes:
+            strings = []
+            for i in range(count):
+                bits = ''.join(generator.choice('01')
+                               for j in range(size // 2))
+                if name == 'palindrome':
+                    bits += bits[::-1]
+                else:
+                    bits += ''.join(generator.choice('01')
+                                    for j in range(size - size // 2))
+                strings.append('_' + bits + '_')
+            # Compile the machine before timing it.
+            machine.run_lockstep(strings[:1])
+            expected, run_time = measure(
+                lambda: [machine.run(s).result() for s in strings])
+            results, lockstep_time = measure(machine.run_lockstep, strings)
+            assert results == expected
+            print('{:>12} {:>6} {:>13.0f} {:>18.0f} {:>7.1f}x'.format(
+                name, size, count / run_time, count / lockstep_time,
+                run_time / lockstep_time))
+
+
+def main(argv=None):
+    """Runs the benchmarks as specified by the command-line arguments
+    `argv` and returns the exit status.
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+    parser_run = commands.add_parser('run', help='run the workloads')
+    parser_run.add_argument('workloads', nargs='*', metavar='workload',
+                            help='the workloads to run, among {}'
+                            ' (default: all)'.format(
+                                ', '.join(sorted(WORKLOADS))))
+    parser_run.add_argument('-e', '--engine', choices=ENGINES,
+                            default='table')
+    parser_run.add_argument('-o', '--output',
+                            help='the file to which to write the results as'
+                            ' JSON')
+    parser_run.add_argument('-q', '--quick', action='store_true',
+                            help='run each workload at small sizes only')
+    parser_run.add_argument('-r', '--repeat', type=int, default=1,
+                            help='the number of times to time each run')
+    parser_run.add_argument('--no-memory', dest='memory',
+                            action='store_false',
+                            help='do not measure the peak memory')
+    parser_compare = commands.add_parser(
+        'compare', help='compare two sets of results')
+    parser_compare.add_argument('baseline')
+    parser_compare.add_argument('current')
+    parser_compare.add_argument('-t', '--threshold', type=float,
+                                default=DEFAULT_THRESHOLD,
+                                help='the fraction by which a measurement'
+                                ' may worsen before it is a regression')
+    parser_codegen = commands.add_parser(
+        'codegen', help='compare the table and codegen engines')
+    parser_codegen.add_argument('workloads', nargs='*', metavar='workload',
+                                help='the workloads to run (default: all)')
+    parser_codegen.add_argument('-q', '--quick', action='store_true',
+                                help='run each workload at small sizes only')
+    commands.add_parser('lockstep',
+                        help='compare sequential runs with the lockstep'
+                        ' simulator')
+    arguments = parser.parse_args(argv)
+    if arguments.command in ('run', 'codegen'):
+        for name in arguments.workloads:
+            if name not in WORKLOADS:
+                parser.error('unknown workload: {}'.format(name))
+    if arguments.command == 'run':
+        results = run(arguments.workloads or None, arguments.engine,
+                      arguments.quick, arguments.repeat, arguments.memory)
+        for name, exponent in sorted(results['scaling'].items()):
+            if exponent is not None:
+                print('{:>22} scaling exponent {:.2f}'.format(name,
+                                                              exponent))
+        if arguments.output is not None:
+            with open(arguments.output, 'w') as f:
+                json.dump(results, f, indent=2)
+        return 0
+    if arguments.command == 'compare':
+        with open(arguments.baseline) as f:
+            baseline = json.load(f)
+        with open(arguments.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, arguments.threshold)
+        for r in regressions:
+            if r['change'] is None:
+                print('CHANGED {workload} size {size}: {metric} {baseline}'
+                      ' -> {current}'.format(**r))
+            else:
+                print('REGRESSION {workload} size {size}: {metric}'
+                      ' {baseline:.0f} -> {current:.0f}'
+                      ' ({change:+.1%})'.format(**r))
+        if not regressions:
+            print('no regressions')
+        return 1 if regressions else 0
+    if arguments.command == 'codegen':
+        benchmark_codegen(arguments.workloads or None, arguments.quick)
+        return 0
+    if arguments.command == 'lockstep':
+        benchmark_lockstep()
+        return 0
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+# example_machines.py - example Turing machines for turingmachine.py
+#
+# Copyright 2014 Jeffrey Finkelstein.
+#
+# This file is part of turingmachine.
+#
+# turingmachine is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# turingmachine is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# turingmachine.  If not, see <http://www.gnu.org/licenses/>.
+"""Provides example Turing machines, used by the tests and the benchmarks of
+:mod:`turingmachine`.
+
+"""
+from collections import defaultdict
+
+from turingmachine import L
+from turingmachine import R
+from turingmachine import TuringMachine
+
+
+def parity_machine():
+    """Returns a Turing machine that accepts exactly the binary strings that
+    have an odd number of ones.
+
+    """
+    transition = {
+        0: {'0': (0, '0', R), '1': (1, '1', R), '_': (3, '_', L)},
+        1: {'0': (1, '0', R), '1': (0, '1', R), '_': (2, '_', R)},
+        }
+    return TuringMachine(set(range(4)), 0, 2, 3, transition)
+
+
+def is_even_machine():
+    """Returns a Turing machine that accepts exactly the binary strings that
+    represent even numbers.
+
+    """
+    transition = {
+        0: {'0': (0, '0', R), '1': (0, '1', R), '_': (1, '_', L)},
+        1: {'0': (2, '0', L), '1': (3, '1', L), '_': (3, '_', R)},
+        }
+    return TuringMachine(set(range(4)), 0, 2, 3, transition)
+
+
+def palindrome_machine():
+    """Returns a Turing machine that accepts exactly the binary strings that
+    are palindromes.
+
+    This machine takes a number of steps quadratic in the length of its
+    input, most of them sweeping back and forth across the input.
+
+    """
+    transition = {
+        0: {'0': (6, '_', R), '1': (7, '_', R), '_': (8, '_', R)},
+        1: {'0': (1, '0', R), '1': (1, '1', R), '_': (3, '_', L)},
+        2: {'0': (2, '0', R), '1': (2, '1', R), '_': (4, '_', L)},
+        3: {'0': (5, '_', L), '1': (9, '1', L), '_': (9, '_', L)},
+        4: {'0': (9, '0', L), '1': (5, '_', L), '_': (9, '_', L)},
+        5: {'0': (5, '0', L), '1': (5, '1', L), '_': (0, '_', R)},
+        6: {'0': (1, '0', R), '1': (1, '1', R), '_': (8, '_', L)},
+        7: {'0': (2, '0', R), '1': (2, '1', R), '_': (8, '_', L)},
+        }
+    return TuringMachine(set(range(10)), 0, 8, 9, transition)
+
+
+def move_left_right_machine():
+    """Returns a Turing machine that moves left five cells, then right ten
+    cells, then accepts.
+
+    """
+    transition = defaultdict(dict)
+    for state in range(5):
+        for symbol in '0', '1', '_':
+            transition[state][symbol] = (state + 1, symbol, L)
+    for state in range(5, 15):
+        for symbol in '0', '1', '_':
+            transition[state][symbol] = (state + 1, symbol, R)
+    return TuringMachine(set(range(17)), 0, 15, 16, transition)
+
+
+def busy_beaver_machine(table):
+    """Returns the Turing machine on the binary alphabet ``'_'`` and ``'1'``
+    described by `table`, in the standard notation for busy beavers.
+
+    `table` is a list of strings, one for each state, each of which consists
+    of the transition on reading a blank followed by the transition on
+    reading a one. Each transition is the symbol to write (``0`` or ``1``),
+    the direction in which to move (``L`` or ``R``), and the next state (a
+    letter, where ``H`` is the halting state). For example, the two-state
+    busy beaver is ``['1RB1LB', '1LA1RH']``.
+
+    The halting state is the accept state of the returned machine; it never
+    rejects.
+
+    """
+    symbols = {'0': '_', '1': '1'}
+    directions = {'L': L, 'R': R}
+    transition = {}
+    for i, row in enumerate(table):
+        state = chr(ord('A') + i)
+        transition[state] = {}
+        for symbol, entry in zip('_1', (row[:3], row[3:])):
+            write, direction, new_state = entry
+            transition[state][symbol] = (new_state, symbols[write],
+                                         directions[direction])
+    states = set(transition) | {'H', 'X'}
+    return TuringMachine(states, 'A', 'H', 'X', transition)
+
+
+#: The champion two-, three-, four-, and five-state busy beavers, which halt
+#: after 6, 21, 107, and 47,176,870 steps, respectively.
+BUSY_BEAVERS = {
+    2: ['1RB1LB', '1LA1RH'],
+    3: ['1RB1RH', '1LB0RC', '1LC1LA'],
+    4: ['1RB1LB', '1LA0LC', '1RH1LD', '1RD0RA'],
+    5: ['1RB1LC', '1RC1RB', '1RD0LE', '1LA1LD', '1RH0LA'],
+    }
+
+
+def binary_counter_machine():
+    """Returns a Turing machine that counts in binary on its tape.
+
+    On input *k* zeros, the machine repeatedly increments the binary number
+    on its tape until it overflows, then accepts. It increments the number
+    2 ** *k* times, so it takes a number of steps exponential in *k*.
+
+    """
+    transition = {
+        # move right to the least significant bit
+        0: {'0': (0, '0', R), '1': (0, '1', R), '_': (1, '_', L)},
+        # add one, carrying to the left; a carry past the most significant
+        # bit means the counter has overflowed
+        1: {'0': (2, '1', L), '1': (1, '0', L), '_': (3, '_', R)},
+        # move left to the most significant bit
+        2: {'0': (2, '0', L), '1': (2, '1', L), '_': (0, '_', R)},
+        }
+    return TuringMachine(set(range(5)), 0, 3, 4, transition)
+
+
+def unary_multiplication_machine():
+    """Returns a Turing machine that multiplies two numbers in unary.
+
+    On input ``'1' * a + 'x' + '1' * b``, the machine writes ``'=' + '1' * (a
+    * b)`` to the right of its input, then accepts. For each one in the first
+    factor (marked as ``'A'`` once it has been used), it marks each one of
+    the second factor in turn as ``'B'`` and copies it to the end of the
+    tape, then restores the second factor.
+
+    """
+    transition = {
+        # move right past the input and write the equals sign
+        0: {'1': (0, '1', R), 'x': (0, 'x', R), '_': (1, '=', L)},
+        # move left to the beginning of the input
+        1: {'1': (1, '1', L), 'x': (1, 'x', L), 'A': (1, 'A', L),
+            'B': (1, 'B', L), '=': (1, '=', L), '_': (2, '_', R)},
+        # find the next unused one in the first factor
+        2: {'A': (2, 'A', R), '1': (3, 'A', R), 'x': (8, 'x', R)},
+        # move right to the second factor
+        3: {'1': (3, '1', R), 'x': (4, 'x', R)},
+        # find the next unused one in the second factor
+        4: {'B': (4, 'B', R), '1': (5, 'B', R), '=': (7, '=', L)},
+        # move right to the end of the product and append a one
+        5: {'1': (5, '1', R), '=': (5, '=', R), '_': (6, '1', L)},
+        # move left to the beginning of the second factor
+        6: {'1': (6, '1', L), '=': (6, '=', L), 'B': (6, 'B', L),
+            'x': (4, 'x', R)},
+        # restore the second factor, then start over
+        7: {'B': (7, '1', L), 'x': (1, 'x', L)},
+        }
+    return TuringMachine(set(range(10)), 0, 8, 9, transition)
@@ -18,19 +18,71 @@
 # turingmachine.  If not, see <http://www.gnu.org/licenses/>.
 """Provides tests for :mod:`turingmachine`."""
 
+import asyncio
 from collections import defaultdict
+import contextlib
+import io
+import json
 import logging
+import os
+import tempfile
 import unittest
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from benchmark_turingmachine import compare
+from example_machines import move_left_right_machine
+from example_machines import palindrome_machine
+from example_machines import parity_machine
+from turingmachine import ACCEPT
 from turingmachine import BadSymbol
+from turingmachine import CompiledMachine
+from turingmachine import ENGINES
 from turingmachine import L
 from turingmachine import logger
+from turingmachine import LOOPS
+from turingmachine import load_machine
+from turingmachine import LoggingObserver
+from turingmachine import main
+from turingmachine import MappedTape
+from turingmachine import MultiTapeTuringMachine
+from turingmachine import NondeterministicTuringMachine
+from turingmachine import NTM
+from turingmachine import Observer
+from turingmachine import PagedTape
+from turingmachine import Profile
 from turingmachine import R
+from turingmachine import REJECT
+from turingmachine import Result
+from turingmachine import ResultCache
+from turingmachine import run_many_async
+from turingmachine import S
+from turingmachine import Tape
+from turingmachine import TIMEOUT
 from turingmachine import TuringMachine
 from turingmachine import UnknownSymbol
 from turingmachine import UnknownState
 
 
+def binary_strings(length):
+    """Returns a list of all binary strings of at most `length` bits, each
+    surrounded by blanks.
+
+    """
+    strings = ['']
+    for i in range(length):
+        strings += [s + b for s in strings if len(s) == i for b in '01']
+    return ['_' + s + '_' for s in strings]
+
+
 class TestTuringMachine(unittest.TestCase):
     """Unit tests for the :class:`turingmachine.TuringMachine` class."""
 
@@ -313,3 +365,1675 @@ class TestTuringMachine(unittest.TestCase):
             assert is_palindrome('_' + s + '_')
         for s in '01', '110', '111100001':
             assert not is_palindrome('_' + s + '_')
+
+
+class TestCompiledMachine(unittest.TestCase):
+    """Unit tests for the :class:`turingmachine.CompiledMachine` class."""
+
+    def setUp(self):
+        """Disable verbose logging for tests."""
+        self.level = logger.getEffectiveLevel()
+        logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        """Restore the original logging level for the :mod:`turingmachine`
+        module.
+
+        """
+        logger.setLevel(self.level)
+
+    def test_compile(self):
+        """Tests that a compiled Turing machine computes the same function as
+        the Turing machine from which it was compiled.
+
+        """
+        parity = parity_machine()
+        compiled = parity.compile()
+        assert isinstance(compiled, CompiledMachine)
+        for s in '011010', '1', '1101011':
+            assert compiled('_' + s + '_')
+        for s in '1001', '0', '', '001001':
+            assert not compiled('_' + s + '_')
+
+    def test_errors_are_lazy(self):
+        """Tests that errors in the transition table are raised only when the
+        erroneous transition is taken, as in the uncompiled machine.
+
+        """
+        transition = {
+            0: {
+                '0': (0, '0', R),
+                '1': (0, 'xx', R),
+                '_': (1, '_', R),
+                }
+            }
+        machine = TuringMachine(set(range(4)), 0, 2, 3, transition)
+        compiled = machine.compile()
+        self.assertRaises(UnknownState, compiled, '_00_')
+        self.assertRaises(BadSymbol, compiled, '_01_')
+        self.assertRaises(UnknownSymbol, compiled, '_0?_')
+
+    def test_alphabet_limit(self):
+        """Tests that characters of input strings that do not appear in the
+        transition dictionary count toward the limit of 256 symbols, and that
+        recompiling the machine forgets them.
+
+        """
+        parity = parity_machine()
+        compiled = parity.compile()
+        unknown = [chr(c) for c in range(0x100, 0x100 + 256)]
+        room = 256 - len(compiled.symbols)
+        for c in unknown[:room]:
+            self.assertRaises(UnknownSymbol, parity, '_' + c + '_')
+        assert len(compiled.symbols) == 256
+        self.assertRaises(ValueError, parity, '_' + unknown[room] + '_')
+        # The known symbols are still usable.
+        assert parity('_1_')
+        parity.compile()
+        self.assertRaises(UnknownSymbol, parity, '_' + unknown[room] + '_')
+
+    def test_return_tape(self):
+        """Tests that the final contents of the tape are returned when
+        requested.
+
+        """
+        parity = parity_machine()
+        assert parity('_0101_', return_tape=True) == (False, '_0101_')
+        assert parity('_01011_', return_tape=True) == (True, '_01011__')
+        transition = {0: {'_': (0, '_', L), '1': (1, '1', L)}}
+        machine = TuringMachine({0, 1, 2}, 0, 1, 2, transition)
+        assert machine('1__', return_tape=True) == (True, '_1__')
+
+
+class TestTape(unittest.TestCase):
+    """Unit tests for the :class:`turingmachine.Tape` class."""
+
+    def test_reach(self):
+        """Tests that the tape grows in both directions and that the visited
+        portion of the tape is tracked exactly.
+
+        """
+        tape = Tape(b'\x00\x01\x00', ['_', '1'])
+        assert str(tape) == '_1_'
+        tape.reach(-3)
+        assert str(tape) == '____1_'
+        assert tape[-3] == '_'
+        assert tape[1] == '1'
+        tape.reach(100)
+        assert len(tape) == 104
+        assert str(tape).strip('_') == '1'
+        assert tape[1000] == '_'
+
+
+class RecordingObserver(Observer):
+    """Records the notifications it receives, for testing."""
+
+    def __init__(self):
+        self.steps = []
+        self.halts = []
+        self.grows = []
+
+    def on_step(self, state, tape, head):
+        self.steps.append((state, head))
+
+    def on_halt(self, state, tape, head):
+        self.halts.append((state, str(tape), head))
+
+    def on_tape_grow(self, tape, head):
+        self.grows.append(head)
+
+
+class TestObserver(unittest.TestCase):
+    """Unit tests for the :class:`turingmachine.Observer` class and its
+    subclasses.
+
+    """
+
+    def test_observer(self):
+        """Tests that an observer is notified of each step, of the halting
+        configuration, and of the growth of the tape.
+
+        """
+        parity = parity_machine()
+        observer = RecordingObserver()
+        parity.observers.append(observer)
+        assert not parity('_11_')
+        assert parity('_1_')
+        assert observer.steps == [(0, 1), (1, 2), (0, 3), (0, 1), (1, 2)]
+        assert observer.halts == [(3, '_11_', 2), (2, '_1__', 3)]
+        assert observer.grows == [3]
+
+    def test_logging_observer(self):
+        """Tests that the logging observer draws the head location and state
+        beneath the tape.
+
+        """
+        parity = parity_machine()
+        parity.observers.append(LoggingObserver())
+        with self.assertLogs(logger, logging.DEBUG) as context:
+            assert parity('_1_')
+        messages = [record.getMessage() for record in context.records]
+        assert messages[:4] == ['', '_1_', ' ^', ' 0']
+        assert messages[-3:] == ['_1__', '   ^', '   2']
+
+    def test_logging_observer_disabled(self):
+        """Tests that the logging observer does not render the tape when its
+        logger does not have the debug level enabled.
+
+        """
+
+        class Unprintable(object):
+            start = 0
+
+            def __str__(self):
+                raise AssertionError('tape rendered')
+
+        log = logging.getLogger(__name__ + '.disabled')
+        log.setLevel(logging.INFO)
+        observer = LoggingObserver(log)
+        observer.on_step(0, Unprintable(), 1)
+        observer.on_halt(0, Unprintable(), 1)
+
+
+class TestConfiguration(unittest.TestCase):
+    """Unit tests for running Turing machines with a budget of steps and
+    resuming them from a :class:`turingmachine.Configuration`.
+
+    """
+
+    def test_run(self):
+        """Tests that running a Turing machine returns its halting
+        configuration.
+
+        """
+        parity = parity_machine()
+        configuration = parity.run('_0101_')
+        assert configuration.status == REJECT
+        assert configuration.halted
+        assert configuration.state == 3
+        assert configuration.steps == 5
+        assert configuration.head == 4
+        assert str(configuration.tape) == '_0101_'
+        assert parity.run('_1_').status == ACCEPT
+
+    def test_resume(self):
+        """Tests that a computation stopped after a number of steps can be
+        resumed and reaches the same halting configuration.
+
+        """
+        parity = parity_machine()
+        configuration = parity.run('_0111_', max_steps=2)
+        assert configuration.status == TIMEOUT
+        assert not configuration.halted
+        assert configuration.steps == 2
+        assert configuration.state == 1
+        assert configuration.head == 3
+        for i in range(2):
+            parity.resume(configuration, max_steps=1)
+        assert configuration.status == TIMEOUT
+        assert configuration.steps == 4
+        parity.resume(configuration)
+        assert configuration.status == ACCEPT
+        assert configuration.steps == 5
+        assert configuration.head == 6
+        # resuming a halted configuration takes no steps
+        parity.resume(configuration)
+        assert configuration.steps == 5
+        assert configuration.status == ACCEPT
+
+    def test_infinite_loop(self):
+        """Tests that a machine that never halts can be stopped."""
+        transition = {0: {'_': (0, '1', R)}}
+        machine = TuringMachine({0, 1, 2}, 0, 1, 2, transition)
+        configuration = machine.run('__', max_steps=1000)
+        assert configuration.status == TIMEOUT
+        assert configuration.steps == 1000
+        assert str(configuration.tape) == '_' + '1' * 1000 + '_'
+
+    def test_error(self):
+        """Tests that a configuration is left before the erroneous step if the
+        machine raises an error.
+
+        """
+        parity = parity_machine()
+        configuration = parity.initial_configuration('_01?_')
+        self.assertRaises(UnknownSymbol, parity.resume, configuration)
+        assert configuration.state == 1
+        assert configuration.head == 3
+        assert configuration.steps == 2
+
+
+class TestMap(unittest.TestCase):
+    """Unit tests for the :meth:`turingmachine.TuringMachine.map` method."""
+
+    def setUp(self):
+        """Creates inputs for the parity machine and the expected results."""
+        self.parity = parity_machine()
+        strings = ['0' * i + '1' * j for i in range(10) for j in range(10)]
+        self.inputs = ['_' + s + '_' for s in strings]
+        self.expected = [self.parity.run(s).result() for s in self.inputs]
+
+    def test_map_in_process(self):
+        """Tests evaluating many strings without a pool of processes."""
+        results = list(self.parity.map(self.inputs, workers=1))
+        assert results == self.expected
+        results = list(self.parity.map(self.inputs, workers=1, max_steps=3))
+        for result, string in zip(results, self.inputs):
+            if len(string) > 4:
+                assert result == Result(TIMEOUT, 3, None)
+
+    def test_map(self):
+        """Tests evaluating many strings in a pool of processes, in order."""
+        results = self.parity.map(iter(self.inputs), workers=2, chunksize=7,
+                                  return_tape=True)
+        expected = [self.parity.run(s).result(return_tape=True)
+                    for s in self.inputs]
+        assert list(results) == expected
+
+    def test_map_unordered(self):
+        """Tests evaluating many strings in a pool of processes, in the order
+        in which they finish.
+
+        """
+        results = dict(self.parity.map(self.inputs, workers=2,
+                                       ordered=False))
+        assert [results[i] for i in range(len(self.inputs))] == self.expected
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestLockstep(unittest.TestCase):
+    """Unit tests for the
+    :meth:`turingmachine.TuringMachine.run_lockstep` method.
+
+    """
+
+    def test_lockstep(self):
+        """Tests that the lockstep simulator produces the same results as
+        running each computation individually.
+
+        """
+        inputs = binary_strings(6)
+        for machine in (parity_machine(), palindrome_machine(),
+                        move_left_right_machine()):
+            for return_tape in False, True:
+                expected = [machine.run(s).result(return_tape)
+                            for s in inputs]
+                results = machine.run_lockstep(inputs,
+                                               return_tape=return_tape)
+                assert results == expected
+
+    def test_timeout(self):
+        """Tests that computations that exceed their budget of steps are
+        stopped.
+
+        """
+        palindrome = palindrome_machine()
+        inputs = binary_strings(4)
+        for max_steps in 0, 1, 5, 17:
+            expected = [palindrome.run(s, max_steps).result(True)
+                        for s in inputs]
+            results = palindrome.run_lockstep(inputs, max_steps, True)
+            assert results == expected
+
+    def test_growth(self):
+        """Tests that the tapes grow when the heads move far beyond the ends
+        of the input strings.
+
+        """
+        transition = {0: {'_': (0, '1', L)}}
+        machine = TuringMachine({0, 1, 2}, 0, 1, 2, transition)
+        results = machine.run_lockstep(['__', '___'], 1000, True)
+        assert results[0] == Result(TIMEOUT, 1000, '_' + '1' * 1000)
+        assert results[1] == Result(TIMEOUT, 1000, '_' + '1' * 1000 + '_')
+
+    def test_alphabet(self):
+        """Tests that strings of equal length and symbols outside of
+        Latin-1 are encoded correctly.
+
+        """
+        transition = {0: {'\u03b1': (0, '\u03b2', R),
+                          '\u03b2': (0, '\u03b1', R), '_': (1, '_', R)}}
+        machine = TuringMachine({0, 1, 2}, 0, 1, 2, transition)
+        for inputs in (['_\u03b1\u03b2_', '_\u03b2\u03b1_', '____'],
+                       ['_\u03b1\u03b2\u03b1_', '_\u03b2_', '__']):
+            expected = [machine.run(s).result(True) for s in inputs]
+            assert machine.run_lockstep(inputs, return_tape=True) == expected
+        assert machine.run_lockstep([]) == []
+
+    def test_error(self):
+        """Tests that errors are raised by the lockstep simulator."""
+        parity = parity_machine()
+        self.assertRaises(UnknownSymbol, parity.run_lockstep,
+                          ['_0_', '_0?_'])
+
+
+class TestRunLengthEngine(unittest.TestCase):
+    """Unit tests for the run-length encoded engine, ``'rle'``."""
+
+    def assertSameConfiguration(self, machine, string, max_steps=None):
+        """Asserts that running `machine` on `string` with the run-length
+        encoded engine produces the same configuration as the default
+        engine.
+
+        """
+        expected = machine.run(string, max_steps)
+        configuration = machine.run(string, max_steps, engine='rle')
+        assert configuration.status == expected.status
+        assert configuration.state == expected.state
+        assert configuration.steps == expected.steps
+        assert configuration.head == expected.head
+        assert str(configuration.tape) == str(expected.tape)
+
+    def test_rle(self):
+        """Tests that the run-length encoded engine computes the same
+        configurations as the default engine.
+
+        """
+        for machine in (parity_machine(), palindrome_machine(),
+                        move_left_right_machine()):
+            for string in binary_strings(6):
+                self.assertSameConfiguration(machine, string)
+        palindrome = palindrome_machine()
+        for max_steps in range(40):
+            self.assertSameConfiguration(palindrome, '_0110110_', max_steps)
+            self.assertSameConfiguration(palindrome, '_0011100_', max_steps)
+
+    def test_sweep(self):
+        """Tests that a sweep across a long run of symbols is counted
+        correctly.
+
+        """
+        palindrome = palindrome_machine()
+        string = '_' + '1' * 100000 + '_'
+        configuration = palindrome.run(string, 600000, engine='rle')
+        assert configuration.status == TIMEOUT
+        self.assertSameConfiguration(palindrome, string, 600000)
+
+    def test_sweep_across_runs(self):
+        """Tests that a sweep continues across consecutive runs of different
+        symbols over which the state sweeps.
+
+        """
+        palindrome = palindrome_machine()
+        for string in '_' + '01' * 500 + '0_', '_' + '0110' * 250 + '_':
+            self.assertSameConfiguration(palindrome, string)
+            for max_steps in range(0, 5000, 37):
+                self.assertSameConfiguration(palindrome, string, max_steps)
+        # A state that sweeps over every symbol never stops.
+        transition = {0: {'_': (0, '_', R), '1': (0, '1', R)}}
+        machine = TuringMachine({0, 1, 2}, 0, 1, 2, transition)
+        for max_steps in 0, 1, 2, 3, 10:
+            self.assertSameConfiguration(machine, '_1_11_', max_steps)
+
+    def test_sweep_beyond_end(self):
+        """Tests that sweeping across the blanks beyond the end of the tape
+        extends the tape.
+
+        """
+        transition = {0: {'_': (0, '_', L), '1': (0, '1', L)}}
+        machine = TuringMachine({0, 1, 2}, 0, 1, 2, transition)
+        for max_steps in 0, 1, 2, 3, 10:
+            self.assertSameConfiguration(machine, '_11_', max_steps)
+            self.assertSameConfiguration(machine, '1', max_steps)
+
+    def test_resume(self):
+        """Tests that a computation can be resumed with a different engine."""
+        palindrome = palindrome_machine()
+        expected = palindrome.run('_0111001110_')
+        configuration = palindrome.run('_0111001110_', 7, engine='rle')
+        while not configuration.halted:
+            palindrome.resume(configuration, 5, engine='table')
+            palindrome.resume(configuration, 3, engine='rle')
+        assert configuration.steps == expected.steps
+        assert str(configuration.tape) == str(expected.tape)
+
+    def test_error(self):
+        """Tests that errors are raised by the run-length encoded engine."""
+        parity = parity_machine()
+        configuration = parity.initial_configuration('_01?_')
+        self.assertRaises(UnknownSymbol, parity.resume, configuration,
+                          engine='rle')
+        assert configuration.head == 3
+        self.assertRaises(ValueError, parity.run, '_0_', engine='bogus')
+
+
+class TestLoopDetection(unittest.TestCase):
+    """Unit tests for detecting Turing machines that never halt."""
+
+    def test_cycle(self):
+        """Tests that a machine that repeats a configuration is stopped."""
+        # move back and forth between the two ends of the input forever,
+        # flipping the bits along the way
+        transition = {
+            0: {'0': (0, '1', R), '1': (0, '0', R), '_': (1, '_', L)},
+            1: {'0': (1, '0', L), '1': (1, '1', L), '_': (0, '_', R)},
+            }
+        machine = TuringMachine(set(range(4)), 0, 2, 3, transition)
+        configuration = machine.run('_0110_', detect_loops=True)
+        assert configuration.status == LOOPS
+        assert not configuration.halted
+        # the cycle has length 20, so it is detected within a few cycles
+        assert configuration.steps < 100
+
+    def test_sweep_forever(self):
+        """Tests that a machine that moves across blanks forever is
+        stopped.
+
+        """
+        transition = {0: {'0': (0, '0', L), '1': (0, '1', L),
+                          '_': (0, '_', L)}}
+        machine = TuringMachine(set(range(3)), 0, 1, 2, transition)
+        configuration = machine.run('_0110_', detect_loops=True)
+        assert configuration.status == LOOPS
+        assert configuration.steps == 2
+
+    def test_halting(self):
+        """Tests that loop detection does not change the result of a
+        computation that halts.
+
+        """
+        for machine in (parity_machine(), palindrome_machine(),
+                        move_left_right_machine()):
+            for string in binary_strings(5):
+                expected = machine.run(string).result(return_tape=True)
+                configuration = machine.run(string, detect_loops=True)
+                assert configuration.result(return_tape=True) == expected
+        palindrome = palindrome_machine()
+        configuration = palindrome.run('_0110_', 5, detect_loops=True)
+        assert configuration.status == TIMEOUT
+        self.assertRaises(ValueError, palindrome.run, '_0_', engine='rle',
+                          detect_loops=True)
+
+
+class TestResultCache(unittest.TestCase):
+    """Unit tests for the :class:`turingmachine.ResultCache` class."""
+
+    def test_cache(self):
+        """Tests that a cached result is returned without repeating the
+        computation.
+
+        """
+        parity = parity_machine()
+        parity.cache = ResultCache()
+        assert parity('_0111_')
+        observer = RecordingObserver()
+        parity.observers.append(observer)
+        assert parity('_0111_')
+        assert parity('_0111_', return_tape=True) == (True, '_0111__')
+        assert parity.evaluate('_0111_', max_steps=5) == Result(ACCEPT, 5,
+                                                                None)
+        assert observer.steps == [(0, 1), (0, 2), (1, 3), (0, 4), (1, 5)]
+        # these results cannot be answered by the cache
+        del observer.steps[:]
+        result = parity.evaluate('_0111_', max_steps=2)
+        assert result == Result(TIMEOUT, 2, None)
+        assert len(observer.steps) == 2
+
+    def test_fingerprint(self):
+        """Tests that equivalent machines have equal fingerprints."""
+        assert parity_machine().fingerprint() == parity_machine().fingerprint()
+        parity = parity_machine()
+        parity.transition[0]['0'] = (1, '0', R)
+        parity.compile()
+        assert parity.fingerprint() != parity_machine().fingerprint()
+
+    def test_eviction(self):
+        """Tests that the least recently used result is evicted."""
+        cache = ResultCache(maxsize=2)
+        for key in 'abc':
+            cache.put(key, Result(ACCEPT, 1, None))
+            cache.get('a')
+        assert len(cache) == 2
+        assert cache.get('a') is not None
+        assert cache.get('b') is None
+        assert cache.get('c') is not None
+
+    def test_persistence(self):
+        """Tests that results are stored in a database file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.sqlite')
+            parity = parity_machine()
+            parity.cache = ResultCache(path=path)
+            parity('_0111_', return_tape=True)
+            parity.cache.close()
+            cache = ResultCache(maxsize=0, path=path)
+            key = ResultCache.key(parity_machine().fingerprint(), '_0111_')
+            assert cache.get(key) == Result(ACCEPT, 5, '_0111__')
+            cache.clear()
+            assert cache.get(key) is None
+            cache.close()
+
+    def test_map(self):
+        """Tests that a process pool uses the cache of the machine."""
+        parity = parity_machine()
+        parity.cache = ResultCache()
+        inputs = binary_strings(4)
+        expected = [parity.run(s).result() for s in inputs]
+        for ordered in True, False:
+            for i in range(2):
+                results = parity.map(inputs, workers=2, chunksize=3,
+                                     ordered=ordered)
+                if not ordered:
+                    results = [r for i, r in sorted(results)]
+                assert list(results) == expected
+        assert len(parity.cache) == len(inputs)
+
+
+class TestCodegen(unittest.TestCase):
+    """Unit tests for the code generation engine, ``'codegen'``."""
+
+    def test_codegen(self):
+        """Tests that the generated code computes the same function as the
+        Turing machine.
+
+        """
+        for machine in (parity_machine(), palindrome_machine(),
+                        move_left_right_machine()):
+            generated = machine.codegen()
+            for string in binary_strings(6):
+                expected = machine(string, return_tape=True)
+                assert generated(string, return_tape=True) == expected
+
+    def test_configurations(self):
+        """Tests that the generated code computes the same configurations as
+        the default engine, including when it runs out of steps.
+
+        """
+        palindrome = palindrome_machine()
+        for string in '_0110110_', '_' + '10' * 20 + '_':
+            for max_steps in range(0, 200, 7):
+                expected = palindrome.run(string, max_steps)
+                configuration = palindrome.run(string, max_steps,
+                                               engine='codegen')
+                assert configuration.steps == expected.steps
+                assert configuration.state == expected.state
+                assert configuration.head == expected.head
+                assert str(configuration.tape) == str(expected.tape)
+        transition = {0: {'_': (0, '_', L), 'a': (0, 'a', L),
+                          'b': (0, 'b', L), 'c': (0, 'c', R)}}
+        machine = TuringMachine({0, 1, 2}, 0, 1, 2, transition)
+        for max_steps in 0, 1, 3, 10:
+            expected = machine.run('_abaa_', max_steps)
+            configuration = machine.run('_abaa_', max_steps,
+                                        engine='codegen')
+            assert configuration.head == expected.head
+            assert str(configuration.tape) == str(expected.tape)
+
+    def test_sweeps(self):
+        """Tests that sweeps that stop at one of several symbols, in either
+        direction and after runs of any length, are counted correctly.
+
+        """
+        transition = {0: {'a': (0, 'a', R), 'b': (0, 'b', R),
+                          'c': (1, 'c', L), 'd': (1, 'd', L),
+                          '_': (2, '_', R)},
+                      1: {'a': (1, 'a', L), 'b': (1, 'b', L),
+                          'c': (0, 'a', R), 'd': (0, 'b', R),
+                          '_': (3, '_', R)}}
+        machine = TuringMachine(set(range(4)), 0, 2, 3, transition)
+        string = '_' + 'abc' + 'a' * 100 + 'dab' + 'b' * 1000 + 'c_'
+        for max_steps in list(range(0, 40)) + [None]:
+            expected = machine.run(string, max_steps)
+            configuration = machine.run(string, max_steps, engine='codegen')
+            assert configuration.status == expected.status
+            assert configuration.steps == expected.steps
+            assert configuration.head == expected.head
+            assert str(configuration.tape) == str(expected.tape)
+
+    def test_many_states(self):
+        """Tests that code is generated for a machine with many states."""
+        transition = {q: {'_': (q + 1, '_', R), '1': (q + 1, '1', R)}
+                      for q in range(5000)}
+        machine = TuringMachine(set(range(5002)), 0, 5000, 5001, transition)
+        configuration = machine.run('_1_', engine='codegen')
+        assert configuration.status == ACCEPT
+        assert configuration.steps == 5000
+
+    def test_errors(self):
+        """Tests that errors are raised by the generated code."""
+        parity = parity_machine()
+        generated = parity.codegen()
+        self.assertRaises(UnknownSymbol, generated, '_01?_')
+        bad_state = TuringMachine(set(range(3)), 0, 1, 2, {})
+        self.assertRaises(UnknownState, bad_state.codegen(), '__')
+
+    def test_directory(self):
+        """Tests that the generated module is cached in a directory."""
+        with tempfile.TemporaryDirectory() as directory:
+            palindrome_machine().codegen(directory)
+            filenames = os.listdir(directory)
+            assert len([f for f in filenames if f.endswith('.py')]) == 1
+            generated = palindrome_machine().codegen(directory)
+            assert os.listdir(directory) == filenames
+            assert generated('_0110_')
+
+
+def infinite_machine():
+    """Returns a Turing machine that moves right forever, writing ones."""
+    transition = {0: {'_': (0, '1', R)}}
+    return TuringMachine(set(range(3)), 0, 1, 2, transition)
+
+
+class TestAsync(unittest.TestCase):
+    """Unit tests for running Turing machines with :mod:`asyncio`."""
+
+    def test_run_async(self):
+        """Tests that running a machine asynchronously produces the same
+        configuration as running it synchronously.
+
+        """
+        palindrome = palindrome_machine()
+        string = '_' + '0110' * 10 + '_'
+        expected = palindrome.run(string)
+        configuration = asyncio.run(palindrome.run_async(string,
+                                                         slice_steps=7))
+        assert configuration.status == expected.status
+        assert configuration.steps == expected.steps
+        configuration = asyncio.run(palindrome.run_async(string, 100,
+                                                         slice_steps=7))
+        assert configuration.status == TIMEOUT
+        assert configuration.steps == 100
+
+    def test_cancel(self):
+        """Tests that cancelling an asynchronous computation leaves a
+        configuration from which it can be resumed.
+
+        """
+        machine = infinite_machine()
+        configuration = machine.initial_configuration('__')
+
+        async def cancel():
+            task = asyncio.ensure_future(
+                machine.resume_async(configuration, slice_steps=10))
+            for i in range(5):
+                await asyncio.sleep(0)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        asyncio.run(cancel())
+        steps = configuration.steps
+        assert steps > 0 and steps % 10 == 0
+        machine.resume(configuration, max_steps=5)
+        assert configuration.steps == steps + 5
+        assert str(configuration.tape) == '_' + '1' * (steps + 5) + '_'
+
+    def test_cancel_run_async(self):
+        """Tests that cancelling :meth:`TuringMachine.run_async` attaches a
+        configuration from which the computation can be resumed to the
+        :exc:`asyncio.CancelledError`.
+
+        """
+        machine = infinite_machine()
+
+        async def cancel():
+            task = asyncio.ensure_future(
+                machine.run_async('__', slice_steps=10))
+            for i in range(5):
+                await asyncio.sleep(0)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError as error:
+                return error.configuration
+
+        configuration = asyncio.run(cancel())
+        steps = configuration.steps
+        assert steps > 0 and steps % 10 == 0
+        configuration = asyncio.run(machine.resume_async(configuration, 5))
+        assert configuration.steps == steps + 5
+        assert str(configuration.tape) == '_' + '1' * (steps + 5) + '_'
+
+    def test_cancel_run_many_async(self):
+        """Tests that computations started from configurations by
+        :func:`turingmachine.run_many_async` can be resumed after it is
+        cancelled.
+
+        """
+        machine = infinite_machine()
+        configurations = [machine.initial_configuration('__')
+                          for i in range(3)]
+
+        async def cancel():
+            task = asyncio.ensure_future(run_many_async(
+                [(machine, c) for c in configurations], concurrency=2,
+                slice_steps=10))
+            for i in range(5):
+                await asyncio.sleep(0)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        asyncio.run(cancel())
+        assert configurations[0].steps > 0
+        assert configurations[2].steps == 0
+        for configuration in configurations:
+            steps = configuration.steps
+            machine.resume(configuration, max_steps=5)
+            assert configuration.steps == steps + 5
+            assert str(configuration.tape) == '_' + '1' * (steps + 5) + '_'
+
+    def test_run_many_async(self):
+        """Tests that many computations run concurrently and that a short
+        computation is not delayed until a long one finishes.
+
+        """
+        palindrome = palindrome_machine()
+        finished = []
+
+        class FinishObserver(Observer):
+
+            def __init__(self, name):
+                self.name = name
+
+            def on_halt(self, state, tape, head):
+                finished.append(self.name)
+
+        long = palindrome_machine()
+        long.observers.append(FinishObserver('long'))
+        short = palindrome_machine()
+        short.observers.append(FinishObserver('short'))
+        jobs = [(long, '_' + '0' * 200 + '_'), (short, '_010_'),
+                (palindrome, '_011_')]
+        configurations = asyncio.run(run_many_async(jobs, concurrency=2,
+                                                    slice_steps=10))
+        assert [c.status for c in configurations] == [ACCEPT, ACCEPT, REJECT]
+        assert configurations[0].steps == palindrome.run(jobs[0][1]).steps
+        assert finished == ['short', 'long']
+
+
+class TestProfile(unittest.TestCase):
+    """Unit tests for the :class:`turingmachine.Profile` class."""
+
+    def test_profile(self):
+        """Tests that each transition, the steps in each state, the
+        reversals of the head, and the extent of the tape are counted.
+
+        """
+        parity = parity_machine()
+        parity.profile = Profile()
+        assert not parity('_11_')
+        profile = parity.profile
+        assert profile.hits == {(0, '1'): 1, (1, '1'): 1, (0, '_'): 1}
+        assert profile.dwell == {0: 2, 1: 1}
+        assert profile.entries == {0: 2, 1: 1, 3: 1}
+        assert profile.reversals == 1
+        assert (profile.leftmost, profile.rightmost) == (1, 3)
+        assert (profile.runs, profile.steps) == (1, 3)
+
+    def test_engines(self):
+        """Tests that the profile is the same regardless of the requested
+        engine and that the results are unchanged.
+
+        """
+        palindrome = palindrome_machine()
+        expected = palindrome.run('_0110_')
+        profiles = []
+        for engine in 'table', 'rle', 'codegen':
+            palindrome.profile = Profile()
+            configuration = palindrome.run('_0110_', engine=engine)
+            assert configuration.status == expected.status
+            assert configuration.steps == expected.steps
+            assert palindrome.profile.steps == expected.steps
+            profiles.append(palindrome.profile.as_dict())
+        assert profiles[0] == profiles[1] == profiles[2]
+
+    def test_aggregate(self):
+        """Tests that a profile aggregates many computations, and that
+        profiles can be added together.
+
+        """
+        parity = parity_machine()
+        parity.profile = Profile()
+        for string in binary_strings(3):
+            parity.run(string)
+        first = parity.profile
+        parity.profile = Profile()
+        for string in binary_strings(3):
+            parity.resume(parity.run(string, max_steps=2))
+        second = parity.profile
+        assert second.runs == 2 * first.runs
+        assert second.hits == first.hits
+        assert second.steps == first.steps
+        total = Profile()
+        total.update(first)
+        total.update(second)
+        assert total.runs == 3 * first.runs
+        assert total.hits == {key: 2 * count
+                              for key, count in first.hits.items()}
+        assert total.dwell == {state: 2 * count
+                               for state, count in first.dwell.items()}
+        assert total.steps == 2 * first.steps
+
+    def test_map(self):
+        """Tests that the computations in the worker processes of
+        :meth:`TuringMachine.map` are added to the profile of the machine.
+
+        """
+        strings = list(binary_strings(6))
+        parity = parity_machine()
+        parity.profile = Profile()
+        for string in strings:
+            parity.run(string)
+        expected = vars(parity.profile)
+        for ordered in (True, False):
+            parity.profile = Profile()
+            results = list(parity.map(strings, workers=2, chunksize=7,
+                                      ordered=ordered))
+            assert len(results) == len(strings)
+            assert vars(parity.profile) == expected
+
+    def test_error(self):
+        """Tests that reading an unknown symbol is not counted as a step."""
+        parity = parity_machine()
+        parity.profile = Profile()
+        with self.assertRaises(UnknownSymbol):
+            parity.run('_1x_')
+        assert parity.profile.hits == {(0, '1'): 1}
+        assert parity.profile.steps == 1
+
+    def test_report(self):
+        """Tests that the report and the JSON export list the transitions
+        in decreasing order of the number of steps taken.
+
+        """
+        palindrome = palindrome_machine()
+        palindrome.profile = Profile()
+        palindrome.run('_' + '0' * 20 + '_')
+        data = json.loads(palindrome.profile.to_json())
+        counts = [entry['hits'] for entry in data['transitions']]
+        assert counts == sorted(counts, reverse=True)
+        assert sum(counts) == data['steps']
+        report = palindrome.profile.report(limit=2).splitlines()
+        assert report[0].startswith('{} steps in 1 runs'.format(
+            data['steps']))
+        assert report[3].split()[0] == str(counts[0])
+        assert report[3].split()[2:] == ['1', "'0'"]
+
+    def test_unsupported(self):
+        """Tests that profiling cannot be combined with loop detection."""
+        parity = parity_machine()
+        parity.profile = Profile()
+        with self.assertRaises(ValueError):
+            parity.run('_1_', detect_loops=True)
+
+
+def two_tape_palindrome_machine():
+    """Returns a two-tape Turing machine that accepts exactly the binary
+    strings that are palindromes in a number of steps linear in the length
+    of its input.
+
+    The machine copies its input to the second tape, moves the head of the
+    first tape back to the beginning of the input, then compares the input
+    from left to right with the copy from right to left.
+
+    """
+    transition = defaultdict(dict)
+    for c in '01':
+        transition['copy'][(c, '_')] = ('copy', (c, c), (R, R))
+        transition['rewind'][(c, '_')] = ('rewind', (c, '_'), (L, S))
+        transition['rewind'][('_', c)] = ('compare', ('_', c), (R, S))
+        for d in '01':
+            transition['rewind'][(c, d)] = ('rewind', (c, d), (L, S))
+            if c == d:
+                transition['compare'][(c, d)] = ('compare', (c, d), (R, L))
+            else:
+                transition['compare'][(c, d)] = ('reject', (c, d), (S, S))
+    transition['copy'][('_', '_')] = ('rewind', ('_', '_'), (L, L))
+    transition['rewind'][('_', '_')] = ('compare', ('_', '_'), (R, S))
+    transition['compare'][('_', '_')] = ('accept', ('_', '_'), (S, S))
+    states = {'copy', 'rewind', 'compare', 'accept', 'reject'}
+    return MultiTapeTuringMachine(states, 'copy', 'accept', 'reject',
+                                  transition, 2)
+
+
+class TestMultiTape(unittest.TestCase):
+    """Unit tests for the :class:`turingmachine.MultiTapeTuringMachine`
+    class.
+
+    """
+
+    def test_palindrome(self):
+        """Tests that the two-tape palindrome machine decides the same
+        language as the single-tape machine.
+
+        """
+        palindrome = palindrome_machine()
+        two_tape = two_tape_palindrome_machine()
+        for string in binary_strings(6):
+            assert two_tape(string) == palindrome(string)
+
+    def test_linear(self):
+        """Tests that the two-tape palindrome machine takes a number of
+        steps linear in the length of its input.
+
+        """
+        two_tape = two_tape_palindrome_machine()
+        for n in 10, 100, 1000:
+            string = '_' + '01' * n + '10' * n + '_'
+            configuration = two_tape.run(string)
+            assert configuration.status == ACCEPT
+            assert configuration.steps == 3 * (4 * n + 1)
+        result, tapes = two_tape('_0110_', return_tape=True)
+        assert result
+        assert tapes == ('_0110_', '_0110_')
+
+    def test_resume(self):
+        """Tests that a computation stopped after a budget of steps can be
+        resumed.
+
+        """
+        two_tape = two_tape_palindrome_machine()
+        configuration = two_tape.run('_0110_', max_steps=7)
+        assert configuration.status == TIMEOUT
+        assert configuration.state == 'rewind'
+        assert configuration.head == [2, 4]
+        two_tape.resume(configuration)
+        assert configuration.status == ACCEPT
+        assert configuration.steps == 15
+        assert configuration.result() == Result(ACCEPT, 15, None)
+
+    def test_errors(self):
+        """Tests that unknown tuples of symbols and unknown states raise
+        exceptions, leaving the configuration before the erroneous step.
+
+        """
+        two_tape = two_tape_palindrome_machine()
+        configuration = two_tape.initial_configuration('_01x_')
+        with self.assertRaises(UnknownSymbol):
+            two_tape.resume(configuration)
+        assert configuration.steps == 2
+        assert configuration.head == [3, 3]
+        two_tape.transition['copy'][('x', '_')] = ('unknown', ('x', 'x'),
+                                                   (S, S))
+        two_tape.compile()
+        with self.assertRaises(UnknownState):
+            two_tape('_01x_')
+
+
+class TestMappedTape(unittest.TestCase):
+    """Unit tests for running Turing machines on memory-mapped files."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'input')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, contents):
+        """Writes the string `contents` to the input file."""
+        with open(self.filename, 'wb') as f:
+            f.write(contents.encode('latin-1'))
+
+    def test_run_file(self):
+        """Tests that running on a file is the same as running on its
+        contents surrounded by blanks.
+
+        """
+        palindrome = palindrome_machine()
+        for string in binary_strings(5):
+            self.write(string[1:-1])
+            expected = palindrome.run(string)
+            configuration = palindrome.run_file(self.filename)
+            with configuration.tape:
+                assert configuration.status == expected.status
+                assert configuration.steps == expected.steps
+                assert configuration.head == expected.head
+                assert str(configuration.tape) == str(expected.tape)
+
+    def test_overlay(self):
+        """Tests that only the cells written are stored in memory and that
+        the file is not modified.
+
+        """
+        self.write('0' * 1000 + '1')
+        parity = parity_machine()
+        configuration = parity.run_file(self.filename)
+        with configuration.tape as tape:
+            assert configuration.status == ACCEPT
+            assert configuration.steps == 1002
+            assert tape.overlay == {}
+        self.write('0110')
+        configuration = palindrome_machine().run_file(self.filename)
+        with configuration.tape as tape:
+            assert configuration.status == ACCEPT
+            assert len(tape.overlay) == 4
+            assert tape[1] == '_'
+        with open(self.filename, 'rb') as f:
+            assert f.read() == b'0110'
+
+    def test_resume(self):
+        """Tests that a computation on a file can be resumed."""
+        self.write('0110')
+        palindrome = palindrome_machine()
+        configuration = palindrome.run_file(self.filename, max_steps=5)
+        with configuration.tape:
+            assert configuration.status == TIMEOUT
+            palindrome.resume(configuration)
+            assert configuration.status == ACCEPT
+            assert configuration.steps == palindrome.run('_0110_').steps
+            with self.assertRaises(ValueError):
+                palindrome.resume(configuration, engine='rle')
+
+    def test_errors(self):
+        """Tests that reading a byte that is not in the alphabet raises an
+        exception, and that an empty file is all blanks.
+
+        """
+        self.write('01x1')
+        parity = parity_machine()
+        with self.assertRaises(UnknownSymbol):
+            parity.run_file(self.filename)
+        self.write('')
+        configuration = parity.run_file(self.filename)
+        assert configuration.status == REJECT
+        assert isinstance(configuration.tape, MappedTape)
+        assert str(configuration.tape) == '__'
+
+
+class TestPagedTape(unittest.TestCase):
+    """Unit tests for the paged tape engine, ``'paged'``."""
+
+    def assertSameConfiguration(self, machine, string, max_steps=None):
+        """Asserts that running `machine` on `string` with the paged engine
+        produces the same configuration as the default engine.
+
+        """
+        expected = machine.run(string, max_steps)
+        configuration = machine.run(string, max_steps, engine='paged')
+        assert isinstance(configuration.tape, PagedTape)
+        assert configuration.status == expected.status
+        assert configuration.state == expected.state
+        assert configuration.steps == expected.steps
+        assert configuration.head == expected.head
+        assert str(configuration.tape) == str(expected.tape)
+
+    def test_paged(self):
+        """Tests that the paged engine computes the same configurations as
+        the default engine.
+
+        """
+        for machine in (parity_machine(), palindrome_machine(),
+                        move_left_right_machine()):
+            for string in binary_strings(6):
+                self.assertSameConfiguration(machine, string)
+        palindrome = palindrome_machine()
+        for max_steps in range(40):
+            self.assertSameConfiguration(palindrome, '_0110110_', max_steps)
+
+    def test_pages(self):
+        """Tests that pages are created only when written and that the tape
+        grows in both directions across page boundaries.
+
+        """
+        tape = PagedTape(b'\0\1\0', ['_', '1'], start=-1, page_size=2)
+        assert sorted(tape.pages) == [0]
+        assert str(tape) == '_1_'
+        assert tape[-1] == tape[100] == '_'
+        # pages of the initial contents that are entirely blank are skipped
+        cells = b'\1\0\0\0\0\0\0\1\1\1\0'
+        tape = PagedTape(cells, ['_', '1'], start=-3, page_size=4)
+        assert sorted(tape.pages) == [-1, 1]
+        assert tape.pages[1] == bytearray(b'\1\1\1\0')
+        assert str(tape) == '1______111_'
+        # sweep left across blanks forever, without writing anything
+        transition = {0: {'_': (0, '_', L), '1': (0, '1', L)}}
+        machine = TuringMachine({0, 1, 2}, 0, 1, 2, transition)
+        configuration = machine.run('_11_', 100000, engine='paged')
+        tape = configuration.tape
+        assert configuration.head == -99999
+        assert len(tape) == 100003
+        assert sorted(tape.pages) == [0]
+        # write a one on every cell to the right
+        transition = {0: {'_': (0, '1', R), '1': (0, '1', R)}}
+        machine = TuringMachine({0, 1, 2}, 0, 1, 2, transition)
+        configuration = machine.run('_', 10000, engine='paged')
+        assert str(configuration.tape) == '_' + '1' * 10000 + '_'
+        assert len(configuration.tape.pages) == 3
+
+    def test_resume(self):
+        """Tests that a computation on a paged tape can be resumed."""
+        palindrome = palindrome_machine()
+        expected = palindrome.run('_0111001110_')
+        configuration = palindrome.run('_0111001110_', 7, engine='paged')
+        while not configuration.halted:
+            palindrome.resume(configuration, 5)
+        assert configuration.steps == expected.steps
+        assert str(configuration.tape) == str(expected.tape)
+        with self.assertRaises(ValueError):
+            palindrome.resume(configuration, engine='rle')
+
+    def test_error(self):
+        """Tests that errors are raised by the paged engine."""
+        parity = parity_machine()
+        configuration = parity.initial_configuration('_01?_')
+        self.assertRaises(UnknownSymbol, parity.resume, configuration,
+                          engine='paged')
+        assert configuration.head == 3
+        assert str(configuration.tape) == '_01?_'
+
+
+class TestOptimize(unittest.TestCase):
+    """Unit tests for :meth:`turingmachine.TuringMachine.optimize`."""
+
+    def assertEquivalent(self, machine, optimized, strings):
+        """Asserts that `machine` and `optimized` halt in the same way on
+        each of `strings`, in every engine, without `optimized` taking more
+        steps.
+
+        """
+        for string in strings:
+            expected = machine.run(string)
+            for engine in ENGINES:
+                configuration = optimized.run(string, engine=engine)
+                assert configuration.status == expected.status
+                assert configuration.head == expected.head
+                assert configuration.steps <= expected.steps
+                assert (str(configuration.tape).strip('_')
+                        == str(expected.tape).strip('_'))
+
+    def test_unreachable(self):
+        """Tests that unreachable states and the transitions of the halting
+        states are removed.
+
+        """
+        palindrome = palindrome_machine()
+        palindrome.transition[8] = {'_': (0, '_', R)}
+        palindrome.transition[10] = {'0': (11, '1', R)}
+        palindrome.transition[11] = {'1': (10, '0', L)}
+        palindrome.states |= {10, 11}
+        optimized = palindrome.optimize()
+        assert set(optimized.transition) == set(range(8))
+        assert optimized.states == set(range(10))
+        self.assertEquivalent(palindrome, optimized, binary_strings(6))
+
+    def test_merge(self):
+        """Tests that equivalent states are merged."""
+        # states 0 and 4 both represent having read an even number of ones,
+        # as do states 1 and 5 for an odd number
+        transition = {
+            0: {'0': (4, '0', R), '1': (1, '1', R), '_': (3, '_', L)},
+            1: {'0': (5, '0', R), '1': (4, '1', R), '_': (2, '_', R)},
+            4: {'0': (0, '0', R), '1': (5, '1', R), '_': (3, '_', L)},
+            5: {'0': (1, '0', R), '1': (0, '1', R), '_': (2, '_', R)},
+            }
+        machine = TuringMachine(set(range(6)), 0, 2, 3, transition)
+        optimized = machine.optimize()
+        assert optimized.transition == parity_machine().transition
+        self.assertEquivalent(machine, optimized, binary_strings(6))
+        # states that read different symbols are not merged
+        del transition[4]['_']
+        optimized = machine.optimize()
+        assert len(optimized.transition) == 4
+        with self.assertRaises(UnknownSymbol):
+            optimized('_0_')
+
+    def test_alphabet(self):
+        """Tests that transitions reading symbols that can never be on the
+        tape are removed when the input alphabet is known.
+
+        """
+        parity = parity_machine()
+        parity.transition[0]['x'] = (4, 'y', R)
+        parity.transition[4] = {'y': (2, 'y', R)}
+        assert parity.optimize().transition == parity.transition
+        optimized = parity.optimize('01')
+        assert optimized.transition == parity_machine().transition
+        self.assertEquivalent(parity, optimized, binary_strings(6))
+
+    def test_collapse(self):
+        """Tests that chains of moves are collapsed."""
+        machine = move_left_right_machine()
+        assert len(machine.optimize().transition) == 15
+        optimized = machine.optimize('01')
+        # the right move of state 5 cancels the left move into it, and the
+        # right move of state 6 follows immediately
+        assert len(optimized.transition) == 13
+        assert optimized.transition[4]['1'] == (7, '1', R)
+        self.assertEquivalent(machine, optimized, binary_strings(4))
+        assert optimized.run('_0_').steps == machine.run('_0_').steps - 2
+        # a move that leaves the head in place is combined with the next
+        # transition, even without an alphabet
+        transition = {
+            0: {'0': (1, '1', S), '1': (0, '1', R), '_': (2, '_', R)},
+            1: {'0': (3, '0', R), '1': (0, '0', R)},
+            }
+        machine = TuringMachine(set(range(4)), 0, 2, 3, transition)
+        optimized = machine.optimize()
+        assert optimized.transition == {
+            0: {'0': (0, '0', R), '1': (0, '1', R), '_': (2, '_', R)}}
+        self.assertEquivalent(machine, optimized, binary_strings(5))
+        # a chain that never halts is left as it is
+        transition = {0: {'_': (1, '_', S)}, 1: {'_': (0, '_', S)}}
+        machine = TuringMachine(set(range(4)), 0, 2, 3, transition)
+        optimized = machine.optimize('')
+        assert optimized.run('_', 100).status == TIMEOUT
+
+
+def contains_11_machine():
+    """Returns a nondeterministic Turing machine that accepts exactly the
+    binary strings that contain two consecutive ones, by guessing where
+    they begin.
+
+    """
+    transition = {
+        0: {
+            '0': {(0, '0', R)},
+            '1': {(0, '1', R), (1, '1', R)},
+            '_': {(3, '_', R)},
+            },
+        1: {'0': set(), '1': {(2, '1', R)}, '_': set()},
+        }
+    return NondeterministicTuringMachine(set(range(4)), 0, 2, 3, transition)
+
+
+class TestNondeterministic(unittest.TestCase):
+    """Unit tests for the
+    :class:`turingmachine.NondeterministicTuringMachine` class.
+
+    """
+
+    def test_guess(self):
+        """Tests that a string is accepted if and only if some computation
+        accepts it, with either search.
+
+        """
+        machine = contains_11_machine()
+        for string in binary_strings(6):
+            assert machine(string) == ('11' in string)
+            result = machine.evaluate(string, search='depth')
+            assert (result.status == ACCEPT) == ('11' in string)
+        result = machine.evaluate('_01101_', return_tape=True)
+        assert result == Result(ACCEPT, 3, '_01101_')
+        assert machine.evaluate('_01101_', search='depth') == Result(
+            ACCEPT, 3, None)
+        assert machine('_0101_', return_tape=True) == (False, None)
+        self.assertRaises(ValueError, machine.evaluate, '_0_',
+                          search='bogus')
+
+    def test_deterministic(self):
+        """Tests that a deterministic machine gives the same results as a
+        nondeterministic machine with a single move for each symbol.
+
+        """
+        parity = parity_machine()
+        transition = {state: {symbol: {entry} for symbol, entry
+                              in row.items()}
+                      for state, row in parity.transition.items()}
+        machine = NTM(parity.states, 0, 2, 3, transition)
+        for string in binary_strings(5):
+            expected = parity.evaluate(string)
+            for search in 'breadth', 'depth':
+                result = machine.evaluate(string, search=search)
+                assert result.status == expected.status
+                assert result.steps == expected.steps
+
+    def test_repeated(self):
+        """Tests that computations that repeat a configuration are not
+        explored forever.
+
+        """
+        transition = {0: {'_': {(1, '_', R)}}, 1: {'_': {(0, '_', L)}}}
+        machine = NTM(set(range(4)), 0, 2, 3, transition)
+        for search in 'breadth', 'depth':
+            assert machine.evaluate('__', search=search).status == REJECT
+            result = machine.evaluate('__', max_steps=1, search=search)
+            assert result == Result(TIMEOUT, 1, None)
+
+    def test_bounds(self):
+        """Tests that a search that never ends is stopped by the bounds on
+        the number of steps and of configurations.
+
+        """
+        # write every binary string, forever
+        transition = {0: {'_': {(0, '0', R), (0, '1', R)}}}
+        machine = NTM(set(range(3)), 0, 1, 2, transition)
+        for search in 'breadth', 'depth':
+            result = machine.evaluate('_', max_steps=8, search=search)
+            assert result == Result(TIMEOUT, 8, None)
+        result = machine.evaluate('_', max_configurations=100)
+        assert result.status == TIMEOUT
+        assert result.steps == 6
+
+    def test_workers(self):
+        """Tests that the search may be spread across a process pool."""
+        machine = contains_11_machine()
+        for string in binary_strings(4):
+            assert (machine.evaluate(string, workers=2)
+                    == machine.evaluate(string))
+
+    def test_errors(self):
+        """Tests that errors in any computation are raised."""
+        machine = contains_11_machine()
+        self.assertRaises(UnknownSymbol, machine, '_01x_')
+        machine.transition[1]['1'].add((4, '1', R))
+        machine.compile()
+        self.assertRaises(UnknownState, machine, '_011_')
+        machine.transition[0]['0'] = {(0, '00', R)}
+        machine.compile()
+        self.assertRaises(BadSymbol, machine, '_0_')
+        self.assertRaises(BadSymbol, machine.evaluate, '_0_',
+                          search='depth')
+
+
+class Crash(Exception):
+    """Raised by :class:`CrashingObserver` to simulate a crash."""
+    pass
+
+
+class CrashingObserver(Observer):
+    """Raises :exc:`Crash` after a given number of steps."""
+
+    def __init__(self, steps):
+        self.steps = steps
+
+    def on_step(self, state, tape, head):
+        self.steps -= 1
+        if self.steps < 0:
+            raise Crash
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Unit tests for checkpointing computations to disk."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'checkpoint')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_restore(self):
+        """Tests that a restored configuration continues exactly where the
+        computation left off.
+
+        """
+        palindrome = palindrome_machine()
+        expected = palindrome.run('_0111001110_')
+        for engine in 'table', 'rle', 'codegen':
+            configuration = palindrome.run('_0111001110_', 17, engine)
+            palindrome.checkpoint(configuration, self.path)
+            restored = palindrome_machine().restore(self.path)
+            assert repr(restored) == repr(configuration)
+            palindrome.resume(restored, engine=engine)
+            assert repr(restored) == repr(expected)
+
+    def test_state_order(self):
+        """Tests that a checkpoint is restored into an equivalent Turing
+        machine whose transition dictionary lists the states in a different
+        order.
+
+        """
+        palindrome = palindrome_machine()
+        expected = palindrome.run('_0111001110_')
+        configuration = palindrome.run('_0111001110_', 17)
+        palindrome.checkpoint(configuration, self.path)
+        transition = dict(reversed(list(palindrome.transition.items())))
+        reordered = TuringMachine(palindrome.states, palindrome.initial_state,
+                                  palindrome.accept_state,
+                                  palindrome.reject_state, transition)
+        assert reordered.fingerprint() == palindrome.fingerprint()
+        assert (reordered.compile().states[:-2]
+                != palindrome.compile().states[:-2])
+        restored = reordered.restore(self.path)
+        assert restored.state == configuration.state
+        reordered.resume(restored)
+        assert repr(restored) == repr(expected)
+
+    def test_alphabet(self):
+        """Tests that symbols interned from the input are restored."""
+        parity = parity_machine()
+        configuration = parity.run('_01x10_', 2)
+        parity.checkpoint(configuration, self.path)
+        restored = parity_machine().restore(self.path)
+        assert str(restored.tape) == '_01x10_'
+        with self.assertRaises(UnknownSymbol):
+            parity.resume(restored)
+        assert restored.head == 3
+
+    def test_crash(self):
+        """Tests that a computation interrupted by a crash is continued from
+        its last checkpoint, and that the checkpoint is deleted once the
+        machine halts.
+
+        """
+        palindrome = palindrome_machine()
+        string = '_' + '01' * 10 + '1' + '10' * 10 + '_'
+        expected = palindrome.run(string)
+        palindrome.observers.append(CrashingObserver(200))
+        with self.assertRaises(Crash):
+            palindrome.run_checkpointed(string, self.path, every_steps=50)
+        # a checkpoint is postponed while the previous one is being
+        # written, so the last one may have been taken before step 150
+        restored = palindrome.restore(self.path, string)
+        assert restored.steps in (50, 100, 150)
+        palindrome.observers.clear()
+        configuration = palindrome.run_checkpointed(string, self.path,
+                                                    every_steps=50)
+        assert repr(configuration) == repr(expected)
+        assert not os.path.exists(self.path)
+
+    def test_different_input(self):
+        """Tests that a checkpoint is not used for a different input string,
+        and that a finished computation does not answer later calls.
+
+        """
+        parity = parity_machine()
+        assert parity.run_checkpointed('_1_', self.path).status == ACCEPT
+        assert parity.run_checkpointed('_11_', self.path).status == REJECT
+        configuration = parity.run_checkpointed('_1011_', self.path,
+                                                max_steps=2)
+        assert configuration.status == TIMEOUT
+        with self.assertRaises(ValueError):
+            parity.run_checkpointed('_11_', self.path)
+        with self.assertRaises(ValueError):
+            parity.restore(self.path, '_11_')
+        # a checkpoint written without its input string can be restored
+        # for any input string
+        parity.checkpoint(configuration, self.path)
+        assert repr(parity.restore(self.path, '_11_')) == repr(configuration)
+        configuration = parity.run_checkpointed('_1011_', self.path)
+        assert configuration.status == ACCEPT
+        assert configuration.steps == parity.run('_1011_').steps
+
+    def test_max_steps(self):
+        """Tests that the budget of steps includes the steps taken before
+        the checkpoint.
+
+        """
+        palindrome = palindrome_machine()
+        configuration = palindrome.run_checkpointed(
+            '_0110_', self.path, max_steps=5, every_seconds=0)
+        assert configuration.status == TIMEOUT
+        assert configuration.steps == 5
+        configuration = palindrome.run_checkpointed(
+            '_0110_', self.path, max_steps=8, every_seconds=0)
+        assert configuration.steps == 8
+        assert not [name for name in os.listdir(self.directory.name)
+                    if name.endswith('.tmp')]
+
+    def test_errors(self):
+        """Tests that invalid checkpoints are not restored."""
+        palindrome = palindrome_machine()
+        palindrome.checkpoint(palindrome.run('_0110_', 3), self.path)
+        with self.assertRaises(ValueError):
+            parity_machine().restore(self.path)
+        with open(self.path, 'r+b') as f:
+            f.truncate(40)
+        with self.assertRaises(ValueError):
+            palindrome.restore(self.path)
+        with self.assertRaises(ValueError):
+            palindrome.run_checkpointed('_0110_', self.path, engine='paged')
+        configuration = palindrome.run('_0110_', 3, engine='paged')
+        with self.assertRaises(ValueError):
+            palindrome.checkpoint(configuration, self.path)
+
+
+#: The definition of the machine returned by :func:`parity_machine`, as read
+#: by :func:`turingmachine.load_machine`.
+PARITY_DEFINITION = {
+    'initial_state': 0,
+    'accept_state': 2,
+    'reject_state': 3,
+    'transition': {
+        0: {'0': [0, '0', 'R'], '1': [1, '1', 'R'], '_': [3, '_', 'L']},
+        1: {'0': [1, '0', 'R'], '1': [0, '1', 'R'], '_': [2, '_', 1]},
+        },
+    }
+
+
+class TestCommandLine(unittest.TestCase):
+    """Unit tests for the command-line interface, ``python -m
+    turingmachine``.
+
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        """Returns the path of the file named `name` in the temporary
+        directory.
+
+        """
+        return os.path.join(self.directory.name, name)
+
+    def test_load_json(self):
+        """Tests that a machine is loaded from a JSON file."""
+        with open(self.path('parity.json'), 'w') as f:
+            json.dump(PARITY_DEFINITION, f)
+        machine = load_machine(self.path('parity.json'))
+        assert machine.states == {'0', '1', '2', '3'}
+        assert machine.transition['1']['_'] == ('2', '_', R)
+        for string in binary_strings(5):
+            assert machine(string) == parity_machine()(string)
+
+    @unittest.skipIf(yaml is None, 'PyYAML is not installed')
+    def test_load_yaml(self):
+        """Tests that a machine is loaded from a YAML file."""
+        definition = dict(PARITY_DEFINITION, states=[0, 1, 2, 3, 4])
+        with open(self.path('parity.yaml'), 'w') as f:
+            yaml.safe_dump(definition, f)
+        machine = load_machine(self.path('parity.yaml'))
+        assert machine.states == {'0', '1', '2', '3', '4'}
+        for string in binary_strings(5):
+            assert machine(string) == parity_machine()(string)
+
+    def run_main(self, *arguments):
+        """Runs :func:`turingmachine.main` with `arguments` and returns the
+        two-tuple of its exit status and the lines it writes to standard
+        error.
+
+        """
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = main(list(arguments))
+        return status, stderr.getvalue().splitlines()
+
+    def test_main(self):
+        """Tests that the results of each input are written as JSON lines,
+        followed by the throughput.
+
+        """
+        with open(self.path('parity.json'), 'w') as f:
+            json.dump(PARITY_DEFINITION, f)
+        with open(self.path('inputs'), 'w') as f:
+            f.write('01\n0110\n\n111\n')
+        for workers in '1', '2':
+            status, errors = self.run_main(
+                self.path('parity.json'), self.path('inputs'), '-o',
+                self.path('results'), '--pad', '--tape', '-w', workers)
+            assert status == 0
+            assert len(errors) == 1
+            assert errors[0].startswith('4 inputs, ')
+            with open(self.path('results')) as f:
+                results = [json.loads(line) for line in f]
+            expected = [parity_machine().evaluate(string, return_tape=True)
+                        for string in ('_01_', '_0110_', '__', '_111_')]
+            assert [result['input'] for result in results] == [
+                '_01_', '_0110_', '__', '_111_']
+            assert [Result(r['status'], r['steps'], r['tape'])
+                    for r in results] == expected
+
+    def test_options(self):
+        """Tests the step limit and the handling of errors, which do not stop
+        the remaining inputs from being evaluated.
+
+        """
+        with open(self.path('parity.json'), 'w') as f:
+            json.dump(PARITY_DEFINITION, f)
+        many = ''.join(chr(0x100 + i) for i in range(300))
+        with open(self.path('inputs'), 'w', encoding='utf-8') as f:
+            f.write('_0101_\n_0x_\n_1_\n{}\n_11_\n'.format(many))
+        for workers in '1', '2':
+            status, errors = self.run_main(
+                self.path('parity.json'), self.path('inputs'), '-o',
+                self.path('results'), '--max-steps', '3', '--engine',
+                'codegen', '-w', workers, '-c', '2')
+            assert status == 1
+            assert errors[0] == ('error: input 2: UnknownSymbol: "x" not in'
+                                 ' transition dictionary')
+            assert errors[1].startswith('error: input 4: ValueError:')
+            assert len(errors) == 3
+            with open(self.path('results')) as f:
+                results = [json.loads(line) for line in f]
+            assert results == [dict(input='_0101_', status=TIMEOUT, steps=3),
+                               dict(input='_1_', status=ACCEPT, steps=2),
+                               dict(input='_11_', status=REJECT, steps=3)]
+
+    def test_bad_machine(self):
+        """Tests that a machine file that cannot be read is a usage error."""
+        with open(self.path('broken.json'), 'w') as f:
+            f.write('{"initial_state": ')
+        with open(self.path('incomplete.json'), 'w') as f:
+            json.dump(dict(PARITY_DEFINITION, transition=None), f)
+        for name in 'broken.json', 'incomplete.json', 'missing.json':
+            with self.assertRaises(SystemExit) as context:
+                self.run_main(self.path(name), self.path('inputs'))
+            assert context.exception.code == 2
+
+    def test_unsupported_options(self):
+        """Tests that combinations of options that the engines do not
+        support are usage errors.
+
+        """
+        with open(self.path('parity.json'), 'w') as f:
+            json.dump(PARITY_DEFINITION, f)
+        for options in (['-e', 'rle', '-l'], ['-e', 'paged', '-l'],
+                        ['-w', '-1'], ['-c', '0']):
+            with self.assertRaises(SystemExit) as context:
+                self.run_main(self.path('parity.json'), self.path('inputs'),
+                              *options)
+            assert context.exception.code == 2
+
+
+class TestBenchmark(unittest.TestCase):
+    """Unit tests for :mod:`benchmark_turingmachine`."""
+
+    def test_compare(self):
+        """Tests that a workload whose throughput drops, or whose status or
+        number of steps changes, is reported as a regression.
+
+        """
+        measurement = dict(workload='parity', size=10, status=ACCEPT,
+                           steps=11, steps_per_second=1000.0,
+                           peak_memory=100)
+        baseline = dict(measurements=[measurement])
+        assert compare(baseline, baseline) == []
+        slower = dict(measurement, steps_per_second=500.0)
+        regressions = compare(baseline, dict(measurements=[slower]))
+        assert [r['metric'] for r in regressions] == ['steps_per_second']
+        assert regressions[0]['change'] == -0.5
+        changed = dict(measurement, status=REJECT, steps=12)
+        regressions = compare(baseline, dict(measurements=[changed]))
+        assert [(r['metric'], r['baseline'], r['current'], r['change'])
+                for r in regressions] == [('status', ACCEPT, REJECT, None),
+                                          ('steps', 11, 12, None)]
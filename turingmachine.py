@@ -17,9 +17,38 @@
 # You should have received a copy of the GNU General Public License along with
 # turingmachine.  If not, see <http://www.gnu.org/licenses/>.
 """Provides an implementation of the Turing machine model."""
+import argparse
+import asyncio
+from collections import deque
+from collections import namedtuple
+from collections import OrderedDict
+import concurrent.futures
+import hashlib
+import importlib.util
+import itertools
+import json
 import logging
+import mmap
+import multiprocessing
+import os
+import re
+import sqlite3
+import struct
+import sys
+import time
 
-# Create and configure the logger which logs debugging information by default.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Create and configure the logger to which LoggingObserver writes debugging
+# information by default.
 logger = logging.getLogger(__name__)
 handler = logging.StreamHandler()
 formatter = logging.Formatter('[%(levelname)s] %(message)s')
@@ -35,6 +64,89 @@ L = -1
 #: right.
 R = +1
 
+#: Represents the read/write head of a tape of a
+#: :class:`MultiTapeTuringMachine` staying where it is.
+S = 0
+
+#: The symbol representing a blank cell on the tape of the Turing machine.
+BLANK = '_'
+
+#: The status of a computation in which the Turing machine halted and
+#: accepted.
+ACCEPT = 'accept'
+
+#: The status of a computation in which the Turing machine halted and
+#: rejected.
+REJECT = 'reject'
+
+#: The status of a computation that was stopped because it exceeded its
+#: budget of steps before the Turing machine halted.
+TIMEOUT = 'timeout'
+
+#: The status of a computation that was stopped because the Turing machine
+#: was found to loop forever; see :meth:`TuringMachine.run`.
+LOOPS = 'loops'
+
+#: The default number of input strings sent to a worker process at a time by
+#: :meth:`TuringMachine.map`, when the number of inputs is not known.
+DEFAULT_CHUNKSIZE = 256
+
+#: The names of the engines that can execute a compiled Turing machine; see
+#: :meth:`TuringMachine.run`.
+ENGINES = ('table', 'rle', 'codegen', 'paged')
+
+#: The number of cells in each page of a :class:`PagedTape`.
+PAGE_SIZE = 4096
+
+#: The modulus and base of the polynomial hash of the contents of a tape used
+#: to detect repeated configurations.
+_HASH_MODULUS = (1 << 61) - 1
+_HASH_BASE = 1000003
+
+#: Matches a maximal run of equal bytes.
+_RUN = re.compile(rb'(.)\1*', re.DOTALL)
+
+#: The default number of steps that :meth:`TuringMachine.resume_async` takes
+#: before yielding control to the event loop.
+DEFAULT_SLICE_STEPS = 10000
+
+#: The default number of seconds between the checkpoints written by
+#: :meth:`TuringMachine.run_checkpointed`.
+DEFAULT_CHECKPOINT_SECONDS = 60
+
+#: The default number of seconds between the reports of throughput written
+#: to standard error by the command-line interface; see :func:`main`.
+DEFAULT_PROGRESS_SECONDS = 5
+
+#: The directions of movement of a read/write head, by name, in the machine
+#: definitions read by :func:`load_machine`.
+_DIRECTIONS = {'L': L, 'R': R, 'S': S}
+
+#: The header of a checkpoint file written by :meth:`TuringMachine.checkpoint`:
+#: the magic number, the version of the format, the SHA-256 digest of the
+#: fingerprint of the machine, the SHA-256 digest of the input string (or
+#: zeros, if the input string is not known), the index of the status in
+#: :data:`_CHECKPOINT_STATUSES`, the length of the encoded :func:`repr` of
+#: the state, the position of the head, the number of steps, the position of
+#: the first visited cell, the number of visited cells, and the length of the
+#: encoded alphabet. The header is followed by the encoded :func:`repr` of the
+#: state, the encoded alphabet, and the visited cells.
+_CHECKPOINT_HEADER = struct.Struct('<4sB32s32sBIqQqQI')
+_CHECKPOINT_MAGIC = b'TMCK'
+_CHECKPOINT_VERSION = 3
+_CHECKPOINT_NO_INPUT = bytes(32)
+_CHECKPOINT_STATUSES = (None, ACCEPT, REJECT, TIMEOUT, LOOPS)
+
+#: The number of steps that the lockstep simulator takes between checks that
+#: every read/write head is far enough from the ends of the array of tapes.
+LOCKSTEP_BLOCK = 64
+
+#: A compact summary of a computation, as produced by
+#: :meth:`TuringMachine.map`: its status (:data:`ACCEPT`, :data:`REJECT`,
+#: :data:`TIMEOUT`, or :data:`LOOPS`), the number of steps taken, and the
+#: contents of the tape as a string (or ``None`` if it was not requested).
+Result = namedtuple('Result', ['status', 'steps', 'tape'])
+
 
 class UnknownSymbol(Exception):
     """This exception is raised when the Turing machine encounters a symbol
@@ -60,6 +172,11 @@ class BadSymbol(Exception):
     pass
 
 
+#: The exceptions raised by a computation on an input string that
+#: :meth:`TuringMachine.map` produces in place of its result if requested.
+_COMPUTATION_ERRORS = (UnknownSymbol, UnknownState, BadSymbol, ValueError)
+
+
 class TuringMachine(object):
     """An implementation of the Turing machine model.
 
@@ -100,42 +217,286 @@ class TuringMachine(object):
     definition of a Turing machine, this class requires the user to specify
     neither the input alphabet nor the tape alphabet.
 
+    `observers` is an iterable of :class:`Observer` instances that will be
+    notified as the Turing machine executes. For example, to log each step of
+    the computation, specify ``observers=[LoggingObserver()]``.
+
+    `cache` is an optional :class:`ResultCache` in which the results of
+    :meth:`evaluate` (and therefore of :meth:`__call__` and :meth:`map`) are
+    stored, so that evaluating the Turing machine on the same string again
+    does not repeat the computation.
+
+    `profile` is an optional :class:`Profile` in which the transitions taken
+    by each computation of :meth:`run` and :meth:`resume` (and of the methods
+    that use them) are counted.
+
+    The cells of the tape store symbol indices in single bytes, so a Turing
+    machine supports at most 256 distinct symbols. This includes every
+    character that has appeared in any input string, since a character that
+    does not appear in the transition dictionary is added to the alphabet the
+    first time it is seen, and remains there until :meth:`compile` is called
+    again. Running the machine on a string that would take the alphabet past
+    this limit raises :exc:`ValueError`.
+
     """
 
     def __init__(self, states, initial_state, accept_state, reject_state,
-                 transition, *args, **kw):
+                 transition, *args, observers=(), cache=None, profile=None,
+                 **kw):
         self.states = states
         self.accept_state = accept_state
         self.reject_state = reject_state
         self.initial_state = initial_state
         self.transition = transition
+        #: The list of :class:`Observer` instances notified as this machine
+        #: executes. If this list is empty, the machine executes without
+        #: calling any observer methods at all.
+        self.observers = list(observers)
+        #: The :class:`ResultCache` used by :meth:`evaluate`, if any.
+        self.cache = cache
+        #: The :class:`Profile` updated by each computation, if any. If this
+        #: is ``None``, the machine executes without counting anything.
+        self.profile = profile
+        self._compiled = None
+
+    def compile(self):
+        """Returns a :class:`CompiledMachine` equivalent to this Turing
+        machine.
+
+        Compiling interns every state and every symbol appearing in
+        :attr:`transition` to a small integer and builds a flat transition
+        table from the result, so that each step of the computation costs a
+        single list lookup. The compiled machine is cached and used by
+        :meth:`__call__`, so this method must be called again if
+        :attr:`transition` (or any of the distinguished states) is modified
+        after the first call.
+
+        """
+        self._compiled = CompiledMachine(self)
+        return self._compiled
+
+    def codegen(self, directory=None):
+        """Generates Python code specialized to this Turing machine and
+        returns a function that runs it, with the same arguments and return
+        value as :meth:`__call__`.
+
+        In the generated code, each state of this Turing machine is a branch
+        in which the symbols it reads, the symbols it writes, the movements
+        of the head, and the next states are all constants, so there are no
+        dictionary or table lookups and no error checks at run time (see
+        :meth:`CompiledMachine.generate_source`). Transitions from a state to
+        itself run in a tight inner loop.
 
-    def _log_state(self, string, head_location, current_state):
-        """Logs a visual representation of the current head location, state,
-        and contents of the tape of this Turing machine.
+        The generated code is compiled once and also used by :meth:`run`
+        and :meth:`resume` with ``engine='codegen'``. If `directory` is not
+        ``None``, the generated module is cached in that directory and
+        reused by later calls, even in other processes.
 
-        For example, if the Turing machine has ``'_010_'`` on its input tape
-        (that is, if `string` is ``'_010_'``), is in state ``4``, and has
-        read/write head at the location of the ``1`` symbol, this method would
-        log the following messages, one line at a time.
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        compiled.generate(directory)
+
+        def run(string, return_tape=False):
+            configuration = self.run(string, engine='codegen')
+            result = configuration.status == ACCEPT
+            if return_tape:
+                return result, str(configuration.tape)
+            return result
+
+        return run
+
+    def fingerprint(self):
+        """Returns a string that identifies the behavior of this Turing
+        machine.
+
+        The fingerprint is a cryptographic hash of the states, the
+        distinguished states, and the transition dictionary, so two Turing
+        machines with the same fingerprint compute the same function. It is
+        stable across processes (and Python versions) as long as the
+        :func:`repr` of each state and symbol is. Like the compiled machine,
+        the fingerprint is cached; see :meth:`compile`.
+
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        if compiled.fingerprint is None:
+            transition = sorted(
+                (repr(state), sorted((repr(symbol), repr(entry))
+                                     for symbol, entry in row.items()))
+                for state, row in self.transition.items())
+            description = repr((sorted(repr(state) for state in self.states),
+                                repr(self.initial_state),
+                                repr(self.accept_state),
+                                repr(self.reject_state), transition))
+            compiled.fingerprint = hashlib.sha256(
+                description.encode('utf-8')).hexdigest()
+        return compiled.fingerprint
+
+    def optimize(self, alphabet=None):
+        """Returns a Turing machine, usually with fewer states and
+        transitions, that accepts and rejects exactly the same strings as
+        this one.
 
-            _010_
-              ^
-              4
+        The optimized machine is built in three passes:
 
-        The caret represents the current location of the read/write head, and
-        the number beneath it represents the current state of the machine.
+        1. States that cannot be reached from the initial state, and every
+           transition of the accept and reject states, are removed. If
+           `alphabet` is not ``None``, it is the set of symbols that may
+           appear in input strings; the symbols that can then appear on the
+           tape are these, the blank, and the symbols written by reachable
+           transitions, and the transitions that read any other symbol are
+           removed as well.
+        2. Chains of moves are collapsed. A transition that leaves the head
+           where it is (:data:`S`) is combined with the transition taken from
+           the next state on the symbol just written. If `alphabet` is not
+           ``None``, a transition into a state that, whatever it reads,
+           leaves the symbol unchanged, moves the head in one fixed direction
+           and enters one fixed state is also combined with that move, when
+           the head does not move or the two moves cancel each other out.
+        3. Equivalent states are merged. The states are partitioned into
+           blocks of states that read the same symbols, write the same
+           symbols, and move in the same directions, and the blocks are
+           refined until every transition from a block leads into a single
+           block; each block then becomes one state.
 
-        This method should be called from :meth:`__call__`, during the
-        execution of the Turing machine on a particular string.
+        Each collapsed chain is a single step of the optimized machine, so it
+        may take fewer steps than this one (and report fewer steps to its
+        observers). On every string whose symbols are all in `alphabet`, it
+        halts in the same way, with the head at the same position, and
+        raises the same errors as this machine; it writes the same symbols
+        on the tape, although the visited portion of the tape may lack blank
+        cells at its ends that this machine visited only in the middle of a
+        collapsed chain. The optimized machine may use the direction
+        :data:`S`, which all the engines of :meth:`run` support. It shares
+        the observers, cache, and profile of this machine.
 
         """
-        logger.debug('')
-        logger.debug(string)
-        logger.debug(' ' * head_location + '^')
-        logger.debug(' ' * head_location + str(current_state))
+        transition = self.transition
+        accept_state = self.accept_state
+        reject_state = self.reject_state
+        initial_state = self.initial_state
+        readable = None
+        if alphabet is not None:
+            readable = set(alphabet) | {BLANK}
+        # Find the reachable states and, if the input alphabet is known, the
+        # symbols that can be read, which depend on each other.
+        order = [initial_state]
+        reachable = {initial_state}
+        changed = True
+        while changed:
+            changed = False
+            for q in order:
+                if q in (accept_state, reject_state) or q not in transition:
+                    continue
+                for symbol, entry in transition[q].items():
+                    new_state, new_symbol, direction = entry
+                    if readable is not None:
+                        if symbol not in readable:
+                            continue
+                        if len(new_symbol) == 1 and new_symbol not in readable:
+                            readable.add(new_symbol)
+                            changed = True
+                    if new_state not in reachable:
+                        reachable.add(new_state)
+                        order.append(new_state)
+                        changed = True
+        rows = {q: {symbol: entry for symbol, entry in transition[q].items()
+                    if readable is None or symbol in readable}
+                for q in order
+                if q not in (accept_state, reject_state) and q in transition}
 
-    def __call__(self, string):
+        def move(q):
+            # Returns the two-tuple (new_state, direction) if state q leaves
+            # every symbol it can read unchanged and always moves in the same
+            # direction to the same state.
+            if readable is None or q not in rows:
+                return None
+            moves = set()
+            for symbol in readable:
+                entry = rows[q].get(symbol)
+                if entry is None or entry[1] != symbol:
+                    return None
+                moves.add((entry[0], entry[2]))
+            return moves.pop() if len(moves) == 1 else None
+
+        # Each combination below replaces a transition by one with the same
+        # effect, so it remains correct however the others have been
+        # combined; following each chain at most once per state ensures that
+        # a chain that loops forever is left as it is.
+        for row in rows.values():
+            for symbol, (new_state, new_symbol, direction) in row.items():
+                seen = set()
+                while (new_state in rows and new_state not in seen
+                       and len(new_symbol) == 1):
+                    seen.add(new_state)
+                    if direction == S:
+                        entry = rows[new_state].get(new_symbol)
+                        if entry is None or len(entry[1]) != 1:
+                            break
+                        new_state, new_symbol, direction = entry
+                        continue
+                    following = move(new_state)
+                    if following is None:
+                        break
+                    following_state, following_direction = following
+                    if following_direction == S:
+                        new_state = following_state
+                    elif following_direction == -direction:
+                        new_state, direction = following_state, S
+                    else:
+                        break
+                row[symbol] = (new_state, new_symbol, direction)
+        # Collapsing chains may leave some states unreachable.
+        order = [initial_state]
+        reachable = {initial_state}
+        for q in order:
+            for new_state, new_symbol, direction in rows.get(q, {}).values():
+                if new_state not in reachable:
+                    reachable.add(new_state)
+                    order.append(new_state)
+        # Refine the partition of the states into blocks until it is stable.
+        # Every state without a row halts, in its own way, so it is a block
+        # by itself.
+        block = {q: () if q in rows else (q,) for q in order}
+        while True:
+            signatures = {}
+            for q in order:
+                signature = block[q]
+                if q in rows:
+                    signature = (signature, frozenset(
+                        (symbol, (block[new_state], new_symbol, direction))
+                        for symbol, (new_state, new_symbol, direction)
+                        in rows[q].items()))
+                signatures[q] = signature
+            numbers = {}
+            refined = {q: numbers.setdefault(signatures[q], len(numbers))
+                       for q in order}
+            if len(numbers) == len(set(block.values())):
+                break
+            block = refined
+        # The first state of each block in breadth-first order represents
+        # the block, so the initial state represents itself.
+        representatives = {}
+        for q in order:
+            representatives.setdefault(block[q], q)
+        representative = {q: representatives[block[q]] for q in order}
+        optimized = {}
+        for q in order:
+            if q in rows and representative[q] == q:
+                optimized[q] = {
+                    symbol: (representative[new_state], new_symbol, direction)
+                    for symbol, (new_state, new_symbol, direction)
+                    in rows[q].items()}
+        states = set(representatives.values()) | {accept_state, reject_state}
+        return TuringMachine(states, initial_state, accept_state,
+                             reject_state, optimized,
+                             observers=self.observers, cache=self.cache,
+                             profile=self.profile)
+
+    def __call__(self, string, return_tape=False):
         """Runs the computer program specified by this Turing machine on
         `string`.
 
@@ -153,52 +514,3495 @@ class TuringMachine(object):
         method may never terminate if the transition function indicates that
         the Turing machine should loop forever.
 
+        If `return_tape` is ``True``, this method instead returns a two-tuple
+        whose first element is the result described above and whose second
+        element is the contents of the tape when the machine halted, as a
+        string. The returned tape includes every cell that the head visited.
+
+        If any observers are attached to this Turing machine (see
+        :attr:`observers`), they are notified of each step of the
+        computation. Otherwise the computation runs without any tracing
+        overhead.
+
+        """
+        result = self.evaluate(string, return_tape=return_tape)
+        if return_tape:
+            return result.status == ACCEPT, result.tape
+        return result.status == ACCEPT
+
+    def evaluate(self, string, max_steps=None, engine=None,
+                 detect_loops=False, return_tape=False):
+        """Runs this Turing machine on `string` and returns the
+        :class:`Result` of the computation.
+
+        `max_steps`, `engine`, and `detect_loops` are as in :meth:`run`. If
+        `return_tape` is ``True``, the final contents of the tape are
+        included in the result.
+
+        If this Turing machine has a :attr:`cache` that contains the result
+        of a previous computation on `string`, that result is returned
+        without repeating the computation (and without notifying any
+        observers). Results of computations that were stopped after
+        `max_steps` steps are not cached, since they depend on `max_steps`.
+
+        """
+        options = dict(max_steps=max_steps, engine=engine,
+                       detect_loops=detect_loops)
+        result = self._cached(string, options, return_tape)
+        if result is None:
+            result = self.run(string, **options).result(return_tape)
+            self._store(string, result)
+        return result
+
+    def _cached(self, string, options, return_tape):
+        """Returns the cached :class:`Result` of running this Turing machine
+        on `string` with the keyword arguments `options` to :meth:`run`, or
+        ``None`` if there is no such result.
+
+        """
+        if self.cache is None:
+            return None
+        result = self.cache.get(ResultCache.key(self.fingerprint(), string))
+        if result is None:
+            return None
+        # A computation that halts after more than the allowed number of
+        # steps must be repeated to find the configuration in which it
+        # stops, as must one that was found to loop forever if loops are not
+        # being detected.
+        max_steps = options['max_steps']
+        if max_steps is not None and result.steps > max_steps:
+            return None
+        if result.status == LOOPS and not options['detect_loops']:
+            return None
+        if return_tape:
+            return result if result.tape is not None else None
+        return result._replace(tape=None)
+
+    def _store(self, string, result):
+        """Stores the :class:`Result` of running this Turing machine on
+        `string` in the cache, if there is one and if the result does not
+        depend on the budget of steps.
+
+        """
+        if self.cache is not None and result.status != TIMEOUT:
+            self.cache.put(ResultCache.key(self.fingerprint(), string),
+                           result)
+
+    def run(self, string, max_steps=None, engine=None, detect_loops=False):
+        """Runs this Turing machine on `string` for at most `max_steps` steps
+        and returns the resulting :class:`Configuration`.
+
+        `string` is as described in :meth:`__call__`. If `max_steps` is
+        ``None``, the machine runs until it halts (which may be never).
+
+        `engine` is the name of the engine that executes the compiled form of
+        this Turing machine (see :meth:`compile`), one of :data:`ENGINES`:
+
+        * ``'table'`` (the default) stores the tape as a :class:`Tape` and
+          looks up each step in the flat transition table.
+        * ``'rle'`` stores the tape as runs of equal symbols and crosses an
+          entire run in a single operation when the machine sweeps across it
+          (see :meth:`CompiledMachine.execute_runs`). This is faster for
+          machines that spend most of their steps moving back and forth
+          across long runs of symbols.
+        * ``'codegen'`` executes Python code generated specifically for this
+          Turing machine; see :meth:`codegen`.
+        * ``'paged'`` replaces the tape by a :class:`PagedTape`, which stores
+          only the fixed-size pages of cells that have been written (see
+          :meth:`CompiledMachine.execute_paged`). This uses much less memory
+          for machines whose head ranges far across a mostly blank tape. The
+          tape of the returned configuration remains a :class:`PagedTape`.
+
+        If observers are attached to this Turing machine, the computation is
+        traced step by step regardless of `engine`. Similarly, if a
+        :class:`Profile` is attached, the computation is profiled (see
+        :meth:`CompiledMachine.execute_profiling`) regardless of `engine`;
+        profiling is not supported together with observers or loop
+        detection.
+
+        If `detect_loops` is ``True``, the machine is stopped with status
+        :data:`LOOPS` as soon as it repeats a configuration (or sweeps
+        forever across the blanks beyond an end of the tape), since it will
+        then never halt. This is done cheaply enough to use for long
+        computations (see :meth:`CompiledMachine.execute_detecting_loops`),
+        but some machines that never halt also never repeat a
+        configuration; `max_steps` should still be used to stop those. Loop
+        detection is only supported by the ``'table'`` engine, without
+        observers.
+
+        The :attr:`~Configuration.status` of the returned configuration is
+        :data:`ACCEPT` or :data:`REJECT` if the machine halted and
+        :data:`TIMEOUT` if it was stopped after `max_steps` steps. In the
+        latter case, the computation can be continued by passing the
+        configuration to :meth:`resume`.
+
+        """
+        return self.resume(self.initial_configuration(string), max_steps,
+                           engine, detect_loops)
+
+    def run_file(self, filename, max_steps=None):
+        """Runs this Turing machine on the contents of the file named
+        `filename` for at most `max_steps` steps and returns the resulting
+        :class:`Configuration`, whose tape is a :class:`MappedTape`.
+
+        Unlike the strings passed to :meth:`run`, the file contains only the
+        input itself, without surrounding blanks; its bytes are read as
+        Latin-1 characters. The file is memory-mapped rather than read, and
+        the cells written by the machine are stored separately, so the
+        memory used is proportional to the number of cells written, however
+        large the file is. The computation can be continued by passing the
+        configuration to :meth:`resume`, as usual, with the ``'table'``
+        engine and without observers, profiling, or loop detection.
+
+        The file remains open until the :meth:`MappedTape.close` method of
+        the tape of the configuration is called.
+
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        tape = MappedTape(filename, compiled.symbols)
+        return self.resume(Configuration(self.initial_state, tape),
+                           max_steps)
+
+    def initial_configuration(self, string):
+        """Returns the :class:`Configuration` of this Turing machine before it
+        begins executing on `string`.
+
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        return Configuration(self.initial_state, compiled.encode(string))
+
+    def resume(self, configuration, max_steps=None, engine=None,
+               detect_loops=False):
+        """Continues the computation of this Turing machine from
+        `configuration` for at most `max_steps` more steps, using `engine`
+        and `detect_loops` as described in :meth:`run`.
+
+        `configuration` is updated in place and returned. Resuming a
+        configuration in which the machine has already halted takes no
+        steps. This makes it possible to time-slice many computations
+        without threads or processes, for example::
+
+            configurations = [machine.run(s, max_steps=1000) for s in inputs]
+            while not all(c.halted for c in configurations):
+                for c in configurations:
+                    machine.resume(c, max_steps=1000)
+
+        If the machine raises an error, such as :exc:`UnknownSymbol`,
+        `configuration` is left in the configuration immediately before the
+        erroneous step.
+
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        return compiled.resume(configuration, max_steps, engine,
+                               detect_loops)
+
+    async def run_async(self, string, max_steps=None, engine=None,
+                        slice_steps=DEFAULT_SLICE_STEPS):
+        """Runs this Turing machine on `string` without blocking the
+        :mod:`asyncio` event loop, and returns the resulting
+        :class:`Configuration`.
+
+        This coroutine is equivalent to :meth:`run`, except that it takes at
+        most `slice_steps` steps at a time and yields control to the event
+        loop between these slices. See :meth:`resume_async`; in particular,
+        if the task running this coroutine is cancelled, the configuration
+        from which the computation can be resumed is the ``configuration``
+        attribute of the :exc:`asyncio.CancelledError` that is raised.
+
+        """
+        configuration = self.initial_configuration(string)
+        return await self.resume_async(configuration, max_steps, engine,
+                                       slice_steps)
+
+    async def resume_async(self, configuration, max_steps=None, engine=None,
+                           slice_steps=DEFAULT_SLICE_STEPS):
+        """Continues the computation from `configuration` without blocking
+        the :mod:`asyncio` event loop, and returns `configuration`.
+
+        This coroutine is equivalent to :meth:`resume`, except that it takes
+        at most `slice_steps` steps at a time and yields control to the
+        event loop between these slices, so the event loop is never blocked
+        for longer than it takes to run `slice_steps` steps.
+
+        If the task running this coroutine is cancelled, the cancellation
+        takes effect between two slices, so `configuration` is left in a
+        consistent state from which the computation can be resumed later.
+        It is also attached to the :exc:`asyncio.CancelledError` as its
+        ``configuration`` attribute.
+
+        """
+        remaining = sys.maxsize if max_steps is None else max_steps
+        while True:
+            steps = configuration.steps
+            self.resume(configuration, min(slice_steps, remaining), engine)
+            remaining -= configuration.steps - steps
+            if configuration.status != TIMEOUT or not remaining:
+                return configuration
+            try:
+                await asyncio.sleep(0)
+            except asyncio.CancelledError as error:
+                error.configuration = configuration
+                raise
+
+    def checkpoint(self, configuration, path, string=None):
+        """Writes `configuration` to the file named `path` in a compact
+        binary format, from which it can be read by :meth:`restore`.
+
+        The file is written atomically: it is written to a temporary file,
+        flushed to disk, and then renamed to `path`, so `path` always
+        contains a complete checkpoint, even if the process crashes while
+        writing it. Only configurations whose tape is a :class:`Tape` can be
+        written.
+
+        If `string` is not ``None``, it is the input string of the
+        computation, a digest of which is recorded in the checkpoint so that
+        :meth:`restore` can check it.
+
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        _write_atomically(path, compiled.dumps(configuration,
+                                               _input_digest(string)))
+
+    def restore(self, path, string=None):
+        """Reads the configuration written to the file named `path` by
+        :meth:`checkpoint` (or :meth:`run_checkpointed`) and returns it.
+
+        The computation continues exactly where it left off when the
+        returned configuration is passed to :meth:`resume`. The checkpoint
+        must have been written by a Turing machine with the same
+        :meth:`fingerprint`, in any process, whatever the order of its
+        states; otherwise :exc:`ValueError` is raised. If `string` is not
+        ``None`` and the checkpoint records a different input string,
+        :exc:`ValueError` is raised as well.
+
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        with open(path, 'rb') as f:
+            return compiled.loads(f.read(), _input_digest(string))
+
+    def run_checkpointed(self, string, path, max_steps=None, engine=None,
+                         every_steps=None, every_seconds=None):
+        """Runs this Turing machine on `string` as :meth:`run` does, writing
+        a checkpoint of the computation to the file named `path` every
+        `every_steps` steps or `every_seconds` seconds, whichever comes
+        first.
+
+        If neither interval is given, a checkpoint is written every
+        :data:`DEFAULT_CHECKPOINT_SECONDS` seconds. If `path` already
+        exists, the computation is restored from it (see :meth:`restore`)
+        instead of starting over, so a run that was interrupted by a crash
+        can be continued by calling this method again with the same
+        arguments. If the checkpoint was written for a different input
+        string, :exc:`ValueError` is raised. `max_steps` counts the steps
+        taken before the checkpoint as well, and `engine` is as in
+        :meth:`run`, except that the ``'paged'`` engine is not supported.
+
+        When the machine halts, the checkpoint is deleted, so a later call
+        with the same `path` starts a new computation. If the computation
+        is stopped by `max_steps` instead, a final checkpoint is written,
+        from which it can be continued with a larger budget.
+
+        The computation runs in slices of at most :data:`DEFAULT_SLICE_STEPS`
+        steps (or `every_steps`, if it is given) between which the elapsed
+        time is checked. Each checkpoint is a copy of the configuration that
+        is written to disk by a background thread while the computation
+        continues; if the previous checkpoint is still being written, the
+        next one is postponed to the end of the following slice.
+
+        """
+        if engine == 'paged':
+            raise ValueError('checkpoints are not supported by the paged'
+                             ' engine')
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        if every_steps is None and every_seconds is None:
+            every_seconds = DEFAULT_CHECKPOINT_SECONDS
+        slice_steps = DEFAULT_SLICE_STEPS
+        if every_steps is not None:
+            slice_steps = every_steps
+            if every_seconds is not None:
+                slice_steps = min(slice_steps, DEFAULT_SLICE_STEPS)
+        digest = _input_digest(string)
+        if os.path.exists(path):
+            configuration = self.restore(path, string)
+        else:
+            configuration = self.initial_configuration(string)
+        remaining = sys.maxsize
+        if max_steps is not None:
+            remaining = max(max_steps - configuration.steps, 0)
+        written_steps = configuration.steps
+        written_time = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            writing = None
+            while remaining and not configuration.halted:
+                steps = configuration.steps
+                self.resume(configuration, min(slice_steps, remaining),
+                            engine)
+                remaining -= configuration.steps - steps
+                if configuration.status != TIMEOUT or not remaining:
+                    break
+                now = time.monotonic()
+                due = ((every_steps is not None
+                        and configuration.steps - written_steps >= every_steps)
+                       or (every_seconds is not None
+                           and now - written_time >= every_seconds))
+                if due and (writing is None or writing.done()):
+                    if writing is not None:
+                        # Raise any error from writing the last checkpoint.
+                        writing.result()
+                    writing = executor.submit(
+                        _write_atomically, path,
+                        compiled.dumps(configuration, digest))
+                    written_steps = configuration.steps
+                    written_time = now
+            if writing is not None:
+                writing.result()
+        if configuration.halted:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        else:
+            _write_atomically(path, compiled.dumps(configuration, digest))
+        return configuration
+
+    def map(self, inputs, workers=None, chunksize=None, max_steps=None,
+            ordered=True, return_tape=False, engine=None,
+            detect_loops=False, return_errors=False):
+        """Runs this Turing machine on each string in the iterable `inputs`
+        and returns an iterator over the :class:`Result` of each
+        computation.
+
+        The strings are distributed among a pool of `workers` processes
+        (by default, one per CPU). The Turing machine is sent to each worker
+        once, when the worker starts, and the input strings are sent in
+        chunks of `chunksize` strings; larger chunks reduce the overhead of
+        communicating with the workers when each computation is short. If
+        `workers` is ``1``, no processes are created and the computations
+        run in the calling process.
+
+        `max_steps`, `engine`, and `detect_loops` are as in :meth:`run`. If
+        `return_tape` is ``True``, the final contents of the tape are
+        included in each result.
+
+        If `ordered` is ``True``, the results are produced in the order of
+        `inputs`. Otherwise, the iterator produces two-tuples *(index,
+        result)*, where *index* is the position of the input string in
+        `inputs`, in the order in which the computations finish.
+
+        If `return_errors` is ``True``, an :exc:`UnknownSymbol`,
+        :exc:`UnknownState`, :exc:`BadSymbol`, or :exc:`ValueError` raised by
+        the computation on an input string is produced in place of its
+        result, and the remaining strings are still evaluated. Otherwise,
+        the first such exception is raised by the iterator.
+
+        If a :class:`Profile` is attached to this machine, each worker
+        profiles the computations of each chunk separately and the profiles
+        are added to :attr:`profile` as the results of the chunk are
+        produced, so the profile is complete once the iterator is exhausted.
+
         """
-        current_state = self.initial_state
-        # We assume that all strings will be input with one blank on the left
-        # and one blank on the right, so the head is initially at position 1.
-        head_location = 1
-        # may loop forever if accept or reject state are never found
+        options = dict(max_steps=max_steps, engine=engine,
+                       detect_loops=detect_loops)
+        if workers == 1:
+            results = (_evaluate(self, string, options, return_tape,
+                                 return_errors)
+                       for string in inputs)
+            if not ordered:
+                results = enumerate(results)
+            yield from results
+            return
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if chunksize is None:
+            if hasattr(inputs, '__len__'):
+                # This is the heuristic used by multiprocessing.Pool.map.
+                chunksize, extra = divmod(len(inputs), workers * 4)
+                chunksize = max(chunksize + bool(extra), 1)
+            else:
+                chunksize = DEFAULT_CHUNKSIZE
+        arguments = (self, options, return_tape, return_errors,
+                     self.profile is not None)
+        with multiprocessing.Pool(workers, _initialize_worker,
+                                  arguments) as pool:
+            if self.cache is not None:
+                yield from self._map_cached(pool, inputs, chunksize,
+                                            workers * chunksize * 4, options,
+                                            ordered, return_tape)
+                return
+            results = self._map_pool(pool, enumerate(inputs), chunksize,
+                                     ordered)
+            if ordered:
+                results = (result for _, result in results)
+            yield from results
+
+    def run_lockstep(self, inputs, max_steps=None, return_tape=False):
+        """Runs this Turing machine on each string in `inputs` simultaneously
+        and returns the list of the :class:`Result` of each computation.
+
+        This method requires NumPy. The tapes of all the computations are
+        stored as the rows of a two-dimensional array, and each step of
+        every computation is performed at once by indexing into arrays
+        representing the compiled transition table (see :meth:`compile`).
+        Computations that have halted are removed from the array of active
+        rows. This is much faster than :meth:`run` for a large number of
+        short inputs of similar length, since the cost of interpreting each
+        step is shared by all the computations.
+
+        `max_steps` and `return_tape` are as in :meth:`map`. The results are
+        the same as those produced by :meth:`run`, except that observers are
+        not notified and the computations are not profiled. If any
+        computation raises an error, the error for the first such input
+        string is raised.
+
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        return compiled.lockstep(inputs, max_steps, return_tape)
+
+    def _map_pool(self, pool, items, chunksize, ordered):
+        """Runs this Turing machine on the string in each two-tuple *(index,
+        string)* in the iterable `items` using the process pool `pool`, and
+        returns an iterator over the two-tuples *(index, result)*.
+
+        The strings are sent to the pool in chunks of `chunksize` strings,
+        and the results are produced in the order of `items` if `ordered` is
+        ``True``, or in the order in which the chunks finish otherwise. The
+        profile of the computations of each chunk, if any, is added to
+        :attr:`profile`.
+
+        """
+        items = iter(items)
+        chunks = iter(lambda: list(itertools.islice(items, chunksize)), [])
+        method = pool.imap if ordered else pool.imap_unordered
+        for results, profile in method(_evaluate_chunk, chunks):
+            if profile is not None:
+                self.profile.update(profile)
+            yield from results
+
+    def _map_cached(self, pool, inputs, chunksize, batch_size, options,
+                    ordered, return_tape):
+        """Implements :meth:`map` using the process pool `pool` when this
+        Turing machine has a cache.
+
+        The cache is only accessed from the calling process, so the inputs
+        are read in batches of `batch_size` strings. The results for the
+        strings in each batch that are not in the cache are computed by the
+        pool and then stored in the cache.
+
+        """
+        inputs = iter(inputs)
+        start = 0
         while True:
-            # If the head has moved too far to the left or right, add a blank
-            # to the current string in the appropriate location. If a blank is
-            # added to the left, the head location must be incremented, since
-            # the string has now essentially been shifted right by one cell.
-            if head_location < 0:
-                string = '_' + string
-                head_location += 1
-            elif head_location >= len(string):
-                string += '_'
-            self._log_state(string, head_location, current_state)
-            # check for accepting or rejecting configurations
-            if current_state == self.accept_state:
-                return True
-            if current_state == self.reject_state:
-                return False
-            # for the sake of brevity, rename some verbose variables
-            h = head_location
-            q = current_state
-            s = string[h]
-            # if the current_state is not in the transition table, raise error
-            if q not in self.transition:
-                raise UnknownState('{} is not in transition'
-                                   ' dictionary'.format(q))
-            # check if the transition table has an entry for the current symbol
-            if s not in self.transition[q]:
-                raise UnknownSymbol('"{}" not in transition'
-                                    ' dictionary'.format(s))
-            # compute the new configuration from the transition function
-            new_state, new_symbol, direction = self.transition[q][s]
-            # assert that the symbol to write is a string of length one
-            if len(new_symbol) != 1:
-                raise BadSymbol('tape alphabet must only include symbols of'
-                                ' length 1 ({})'.format(new_symbol))
-            # write the specified new symbol to the string; Python strings are
-            # immutable, so we must create a new one
-            string = string[:h] + new_symbol + string[h + 1:]
-            # set the new state and head location
-            current_state = new_state
-            # direction is either L or R, which are defined to be -1 and +1
-            head_location += direction
-        raise Exception('Turing machine somehow halted without accepting or'
-                        ' rejecting.')
+            batch = list(itertools.islice(inputs, batch_size))
+            if not batch:
+                break
+            results = [self._cached(string, options, return_tape)
+                       for string in batch]
+            misses = [(i, batch[i])
+                      for i, result in enumerate(results) if result is None]
+            computed = self._map_pool(pool, misses, chunksize, ordered)
+            if ordered:
+                for i, result in computed:
+                    if not isinstance(result, Exception):
+                        self._store(batch[i], result)
+                    results[i] = result
+                yield from results
+            else:
+                for i, result in enumerate(results):
+                    if result is not None:
+                        yield start + i, result
+                for i, result in computed:
+                    if not isinstance(result, Exception):
+                        self._store(batch[i], result)
+                    yield start + i, result
+            start += len(batch)
+
+    def __getstate__(self):
+        # The compiled machine is cheaper to rebuild than to pickle, and the
+        # cache and the profile belong to the process that created them;
+        # the workers of map profile into profiles of their own.
+        state = self.__dict__.copy()
+        state['_compiled'] = None
+        state['cache'] = None
+        state['profile'] = None
+        return state
+
+
+def _write_atomically(path, data):
+    """Replaces the contents of the file named `path` by the :class:`bytes`
+    object `data`, so that the file contains either its old contents or
+    `data` in its entirety, even if the process crashes.
+
+    """
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+#: The arguments with which the current worker process of
+#: :meth:`TuringMachine.map` was initialized.
+_worker_arguments = None
+
+
+def _input_digest(string):
+    """Returns the SHA-256 digest of `string`, as recorded in a checkpoint,
+    or zeros if `string` is ``None``.
+
+    """
+    if string is None:
+        return _CHECKPOINT_NO_INPUT
+    return hashlib.sha256(string.encode('utf-8', 'surrogatepass')).digest()
+
+
+def _initialize_worker(machine, options, return_tape, return_errors=False,
+                       profile=False):
+    """Stores the Turing machine and the keyword arguments to
+    :meth:`TuringMachine.run` for the worker processes of
+    :meth:`TuringMachine.map`, along with its `return_tape` and
+    `return_errors` arguments.
+
+    If `profile` is ``True``, the computations of the worker are profiled.
+
+    """
+    global _worker_arguments
+    if profile:
+        machine.profile = Profile()
+    _worker_arguments = (machine, options, return_tape, return_errors)
+
+
+def _evaluate(machine, string, options, return_tape, return_errors):
+    """Returns the result of :meth:`TuringMachine.evaluate` for `machine`,
+    `string`, and the keyword arguments `options` and `return_tape`.
+
+    If `return_errors` is ``True``, an exception in
+    :data:`_COMPUTATION_ERRORS` is returned instead of being raised.
+
+    """
+    try:
+        return machine.evaluate(string, return_tape=return_tape, **options)
+    except _COMPUTATION_ERRORS as error:
+        if not return_errors:
+            raise
+        return error
+
+
+def _evaluate_chunk(items):
+    """Runs the Turing machine of the current worker process on the string in
+    each two-tuple *(index, string)* in the list `items`.
+
+    Returns the list of two-tuples *(index, result)*, where *result* may be
+    an exception as described in :func:`_evaluate`, along with the
+    :class:`Profile` of these computations, or ``None`` if the computations
+    are not profiled.
+
+    """
+    machine, options, return_tape, return_errors = _worker_arguments
+    if machine.profile is not None:
+        machine.profile = Profile()
+    results = [(index, _evaluate(machine, string, options, return_tape,
+                                 return_errors))
+               for index, string in items]
+    return results, machine.profile
+
+
+def _successors(configuration):
+    """Returns the list of configurations that the
+    :class:`NondeterministicTuringMachine` of the current worker process of
+    :meth:`CompiledNondeterministicMachine.search_breadth` may enter in one
+    step from `configuration`.
+
+    """
+    machine = _worker_arguments[0]
+    compiled = machine._compiled
+    if compiled is None:
+        compiled = machine.compile()
+    return compiled.successors(configuration)
+
+
+async def run_many_async(jobs, concurrency=None, max_steps=None,
+                         engine=None, slice_steps=DEFAULT_SLICE_STEPS):
+    """Runs many Turing machines concurrently without blocking the
+    :mod:`asyncio` event loop, and returns the list of their resulting
+    :class:`Configuration` objects.
+
+    `jobs` is an iterable of two-tuples *(machine, string)*, where *machine*
+    is a :class:`TuringMachine` and *string* is the input on which to run it.
+    *string* may instead be a :class:`Configuration` of *machine* (see
+    :meth:`TuringMachine.initial_configuration`), which is resumed and
+    updated in place, so that if this coroutine is cancelled, every
+    computation can be resumed later from its configuration. The results
+    are in the same order as `jobs`.
+
+    At most `concurrency` computations are in progress at once (or all of
+    them, if `concurrency` is ``None``); the others wait for one of these to
+    finish and start in the order in which they appear in `jobs`. The
+    computations in progress take turns running slices of `slice_steps`
+    steps (see :meth:`TuringMachine.resume_async`), so a long computation
+    delays a short one by at most one slice per turn, no matter how long it
+    runs. `max_steps` and `engine` are as in :meth:`TuringMachine.run`.
+
+    """
+    semaphore = None if concurrency is None else asyncio.Semaphore(
+        concurrency)
+
+    async def run(machine, string):
+        if isinstance(string, Configuration):
+            configuration = string
+        else:
+            configuration = machine.initial_configuration(string)
+        if semaphore is None:
+            return await machine.resume_async(configuration, max_steps,
+                                              engine, slice_steps)
+        async with semaphore:
+            return await machine.resume_async(configuration, max_steps,
+                                              engine, slice_steps)
+
+    return await asyncio.gather(*[run(machine, string)
+                                  for machine, string in jobs])
+
+
+class MultiTapeTuringMachine(object):
+    """A Turing machine with several tapes, each with its own read/write
+    head.
+
+    `states`, `initial_state`, `accept_state`, and `reject_state` are as in
+    :class:`TuringMachine`, and `tapes` is the number of tapes.
+
+    `transition` is a two-dimensional dictionary indexed first by state,
+    then by a tuple of the symbols under the heads, one for each tape. Each
+    entry is a three-tuple *(new_state, new_symbols, directions)*, where
+    *new_symbols* is the tuple of symbols to write on the tapes and
+    *directions* is the tuple of movements of the heads, each of which is
+    :data:`L`, :data:`R`, or :data:`S` (stay). For example, in a two-tape
+    machine, the entry ::
+
+        transition['copy'][('1', '_')] = ('copy', ('1', '1'), (R, R))
+
+    copies a ``'1'`` from the first tape to the second.
+
+    The input string is written on the first tape, as for
+    :class:`TuringMachine`; each other tape is initially blank. Every head
+    starts at position ``1``.
+
+    """
+
+    def __init__(self, states, initial_state, accept_state, reject_state,
+                 transition, tapes):
+        self.states = states
+        self.accept_state = accept_state
+        self.reject_state = reject_state
+        self.initial_state = initial_state
+        self.transition = transition
+        self.tapes = tapes
+        self._compiled = None
+
+    def compile(self):
+        """Returns a :class:`CompiledMultiTapeMachine` equivalent to this
+        Turing machine.
+
+        As with :meth:`TuringMachine.compile`, this must be called again if
+        :attr:`transition` is modified after the first computation.
+
+        """
+        self._compiled = CompiledMultiTapeMachine(self)
+        return self._compiled
+
+    def __call__(self, string, return_tape=False):
+        """Runs this Turing machine on `string` and returns ``True`` if it
+        halts and accepts and ``False`` if it halts and rejects, as described
+        in :meth:`TuringMachine.__call__`.
+
+        If `return_tape` is ``True``, this method instead returns a two-tuple
+        whose second element is the tuple of the contents of each tape.
+
+        """
+        configuration = self.run(string)
+        result = configuration.status == ACCEPT
+        if return_tape:
+            return result, tuple(str(tape) for tape in configuration.tape)
+        return result
+
+    def run(self, string, max_steps=None):
+        """Runs this Turing machine on `string` for at most `max_steps`
+        steps and returns the resulting :class:`MultiTapeConfiguration`, as
+        described in :meth:`TuringMachine.run`.
+
+        """
+        return self.resume(self.initial_configuration(string), max_steps)
+
+    def initial_configuration(self, string):
+        """Returns the :class:`MultiTapeConfiguration` of this Turing
+        machine before it begins executing on `string`.
+
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        tapes = [compiled.encode(string)]
+        for i in range(1, self.tapes):
+            tapes.append(Tape(bytes(2), compiled.symbols))
+        return MultiTapeConfiguration(self.initial_state, tapes,
+                                      [1] * self.tapes)
+
+    def resume(self, configuration, max_steps=None):
+        """Continues the computation of this Turing machine from
+        `configuration` for at most `max_steps` more steps, as described in
+        :meth:`TuringMachine.resume`.
+
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        return compiled.resume(configuration, max_steps)
+
+
+class NondeterministicTuringMachine(object):
+    """A nondeterministic Turing machine, which accepts a string if and only
+    if some computation on it halts and accepts.
+
+    `states`, `initial_state`, `accept_state`, and `reject_state` are as in
+    :class:`TuringMachine`. `transition` is a two-dimensional dictionary
+    indexed first by state, then by symbol, as in :class:`TuringMachine`,
+    except that each entry is a set of three-tuples *(new_state,
+    new_symbol, direction)*, one for each of the moves the machine may make.
+    A computation that reads a symbol for which the entry is the empty set
+    halts and rejects. As for a deterministic machine, reading a symbol
+    that has no entry at all raises :exc:`UnknownSymbol`.
+
+    """
+
+    def __init__(self, states, initial_state, accept_state, reject_state,
+                 transition):
+        self.states = states
+        self.accept_state = accept_state
+        self.reject_state = reject_state
+        self.initial_state = initial_state
+        self.transition = transition
+        self._compiled = None
+
+    def compile(self):
+        """Returns a :class:`CompiledNondeterministicMachine` equivalent to
+        this Turing machine.
+
+        As with :meth:`TuringMachine.compile`, this must be called again if
+        :attr:`transition` is modified after the first computation.
+
+        """
+        self._compiled = CompiledNondeterministicMachine(self)
+        return self._compiled
+
+    def __call__(self, string, return_tape=False):
+        """Runs this Turing machine on `string` and returns ``True`` if some
+        computation halts and accepts and ``False`` otherwise, as described
+        in :meth:`evaluate`.
+
+        If `return_tape` is ``True``, this method instead returns a two-tuple
+        whose second element is the contents of the tape when the first
+        accepting computation found halted, or ``None`` if there is none.
+
+        """
+        result = self.evaluate(string, return_tape=return_tape)
+        if return_tape:
+            return result.status == ACCEPT, result.tape
+        return result.status == ACCEPT
+
+    def evaluate(self, string, max_steps=None, max_configurations=None,
+                 search='breadth', workers=1, return_tape=False):
+        """Searches the computations of this Turing machine on `string` for
+        one that accepts and returns the :class:`Result` of the search.
+
+        The configurations of the machine (its state, the position of its
+        head, and the non-blank cells of its tape) are explored in order of
+        the number of steps needed to reach them, so the first accepting
+        computation found is a shortest one. The search stops as soon as
+        any computation halts and accepts. The status of the result is
+
+        * :data:`ACCEPT` if some computation accepts, in which case the
+          number of steps is the length of the shortest such computation,
+        * :data:`REJECT` if no computation accepts, because every
+          computation halts and rejects or repeats a configuration that has
+          already been explored, or
+        * :data:`TIMEOUT` if the search was stopped before finding out,
+          because the computations were followed for `max_steps` steps or
+          because more than `max_configurations` configurations had to be
+          stored at once.
+
+        If `return_tape` is ``True`` and some computation accepts, the
+        result includes the contents of its tape, from the leftmost to the
+        rightmost of the cells of the input, the non-blank cells, and the
+        cell under the head.
+
+        If `search` is ``'breadth'``, the search is breadth-first. Each
+        configuration is stored in a set of the configurations explored so
+        far, so a configuration reached by many computations is explored
+        only once, but that set may grow exponentially with the number of
+        steps. If `workers` is greater than ``1``, the configurations at each
+        depth are expanded by a pool of `workers` processes, as in
+        :meth:`TuringMachine.map`, and if it is ``None``, by a pool of one
+        process per CPU. By default, `workers` is ``1`` and no processes are
+        created, since starting a pool only pays off when the frontier of
+        the search grows large.
+
+        If `search` is ``'depth'``, the search is an iterative deepening
+        depth-first search, which explores the computations of at most 0, 1,
+        2, ... steps one at a time. It stores only the configurations of the
+        computation currently being explored, and skips a configuration
+        only if it repeats one of these, so it uses memory proportional to
+        the number of steps but may explore a configuration many times.
+        `max_configurations` and `workers` are ignored.
+
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self.compile()
+        if max_steps is None:
+            max_steps = sys.maxsize
+        if max_configurations is None:
+            max_configurations = sys.maxsize
+        if search == 'breadth':
+            status, steps, configuration = compiled.search_breadth(
+                string, max_steps, max_configurations, workers)
+        elif search == 'depth':
+            status, steps, configuration = compiled.search_depth(
+                string, max_steps)
+        else:
+            raise ValueError('unknown search: {}'.format(search))
+        tape = None
+        if return_tape and configuration is not None:
+            tape = compiled.decode(configuration, len(string))
+        return Result(status, steps, tape)
+
+    def __getstate__(self):
+        # As for TuringMachine, the compiled machine is rebuilt by each
+        # process.
+        state = self.__dict__.copy()
+        state['_compiled'] = None
+        return state
+
+
+#: An abbreviation for :class:`NondeterministicTuringMachine`.
+NTM = NondeterministicTuringMachine
+
+
+class CompiledMachine(object):
+    """A :class:`TuringMachine` whose states and symbols have been interned to
+    small integers.
+
+    Instances of this class should be created by calling
+    :meth:`TuringMachine.compile`. Calling an instance of this class on a
+    string has the same result as calling the Turing machine from which it
+    was compiled on that string.
+
+    The non-halting states of `machine` (that is, the states that have an
+    entry in the transition dictionary) are numbered from zero. The
+    transition table, :attr:`table`, is a flat list with one entry for each
+    pair of non-halting state and symbol; the entry for state index *q* and
+    symbol index *s* is at position ``q * width + s``, where ``width`` is the
+    number of symbols in :attr:`symbols`. Each entry is a three-tuple
+    *(new_state, new_symbol, direction)* of integers.
+
+    Every other state index represents a halting configuration: the accept
+    state, the reject state, or an error. Errors that would otherwise be
+    checked on each step of the computation are instead encoded as entries of
+    the table that lead to a distinct halting state index, so the main loop
+    of the computation only needs to check whether the state index is less
+    than the number of non-halting states.
+
+    """
+
+    def __init__(self, machine):
+        self.machine = machine
+        #: The value of :meth:`TuringMachine.fingerprint`, once computed.
+        self.fingerprint = None
+        #: The list of symbols, indexed by symbol index. The blank symbol
+        #: always has index zero.
+        self.symbols = [BLANK]
+        #: Maps each symbol to its index in :attr:`symbols`.
+        self.symbol_index = {BLANK: 0}
+        transition = machine.transition
+        # Intern the symbols that the transition function can read or write.
+        # Keys that are not strings of length one can never be read from the
+        # tape, so they are ignored.
+        for row in transition.values():
+            for symbol, (new_state, new_symbol, direction) in row.items():
+                if isinstance(symbol, str) and len(symbol) == 1:
+                    self._add_symbol(symbol)
+                if len(new_symbol) == 1:
+                    self._add_symbol(new_symbol)
+        self._build()
+
+    def _add_symbol(self, symbol):
+        """Adds `symbol` to the alphabet, if it is not already present, and
+        returns its index.
+
+        This does not update the transition table; see :meth:`intern`.
+
+        """
+        index = self.symbol_index.get(symbol)
+        if index is None:
+            index = len(self.symbols)
+            # Symbol indices are stored in the bytes of a Tape.
+            if index == 256:
+                raise ValueError('compiled machines support at most 256'
+                                 ' symbols, including the characters of'
+                                 ' every input string seen since the machine'
+                                 ' was compiled ({!r})'.format(symbol))
+            self.symbols.append(symbol)
+            self.symbol_index[symbol] = index
+        return index
+
+    def intern(self, symbol):
+        """Returns the index of `symbol`, adding it to the alphabet (and
+        rebuilding the transition table) if necessary.
+
+        This is used for symbols that appear in an input string but nowhere in
+        the transition dictionary. Reading such a symbol always raises
+        :exc:`UnknownSymbol`, but the symbol must still be representable on
+        the tape.
+
+        """
+        index = self.symbol_index.get(symbol)
+        if index is None:
+            index = self._add_symbol(symbol)
+            self._build()
+        return index
+
+    def _build(self):
+        """Interns the states of the machine and builds the flat transition
+        table for the current alphabet.
+
+        """
+        machine = self.machine
+        transition = machine.transition
+        accept_state = machine.accept_state
+        reject_state = machine.reject_state
+        width = len(self.symbols)
+        #: The list of states, indexed by state index.
+        self.states = [q for q in transition
+                       if q != accept_state and q != reject_state]
+        #: The number of non-halting states; a state index greater than or
+        #: equal to this number represents a halting configuration.
+        self.running = running = len(self.states)
+        self.accept_index = running
+        self.states.append(accept_state)
+        self.reject_index = running + 1
+        self.states.append(reject_state)
+        #: Maps each state to its index in :attr:`states`.
+        self.state_index = index = {}
+        # Iterate in reverse so that the accept state takes precedence over
+        # the reject state, as in :meth:`TuringMachine.__call__`.
+        for i in reversed(range(len(self.states))):
+            index[self.states[i]] = i
+        #: Maps each error state index to a three-tuple *(exception,
+        #: message, previous_state)*. If *message* is ``None``, the message
+        #: is computed from the symbol under the head. If *previous_state* is
+        #: not ``None``, it is the index of the state in which the machine
+        #: was before the erroneous step.
+        self.errors = {}
+
+        def unknown_state(q):
+            # States that are neither halting states nor in the transition
+            # dictionary are halting states that raise UnknownState.
+            if q not in index:
+                i = len(self.states)
+                self.states.append(q)
+                index[q] = i
+                message = '{} is not in transition dictionary'.format(q)
+                self.errors[i] = (UnknownState, message, None)
+            return index[q]
+
+        def error(exception, message, previous_state):
+            i = len(self.states)
+            # Error states have no corresponding state of the machine.
+            self.states.append(None)
+            self.errors[i] = (exception, message, previous_state)
+            return i
+
+        unknown_state(machine.initial_state)
+        for q in machine.states:
+            unknown_state(q)
+        #: The flat transition table.
+        self.table = table = []
+        for q in range(running):
+            row = transition[self.states[q]]
+            unknown_symbol = None
+            for s in range(width):
+                symbol = self.symbols[s]
+                if symbol not in row:
+                    # Reading an unknown symbol halts without moving the head
+                    # or modifying the tape.
+                    if unknown_symbol is None:
+                        unknown_symbol = error(UnknownSymbol, None, q)
+                    table.append((unknown_symbol, s, 0))
+                    continue
+                new_state, new_symbol, direction = row[symbol]
+                new_state = unknown_state(new_state)
+                if len(new_symbol) != 1:
+                    message = ('tape alphabet must only include symbols of'
+                               ' length 1 ({})'.format(new_symbol))
+                    table.append((error(BadSymbol, message, q), s, 0))
+                    continue
+                table.append((new_state, self.symbol_index[new_symbol],
+                              direction))
+        #: For each entry of :attr:`table`, the direction of the head if the
+        #: entry is a sweep (see :meth:`execute_runs`), and zero otherwise.
+        self.sweeps = [
+            direction if (new_state == i // width
+                          and new_symbol == i % width
+                          and (direction == 1 or direction == -1)) else 0
+            for i, (new_state, new_symbol, direction) in enumerate(table)]
+        #: For each non-halting state index *q*, the entries at positions
+        #: ``2 * q`` and ``2 * q + 1`` are regular expressions that find the
+        #: run of symbols at which a sweep to the left or right,
+        #: respectively, stops (see :meth:`execute_runs`).
+        self.sweep_stops = []
+        for q in range(running):
+            for direction in -1, 1:
+                stops = re.escape(bytes(
+                    s for s in range(width)
+                    if self.sweeps[q * width + s] != direction))
+                if direction == 1:
+                    pattern = b'[' + stops + b']'
+                else:
+                    pattern = b'.*[' + stops + b']'
+                if not stops:
+                    # A state that sweeps over every symbol never stops.
+                    pattern = b'(?!)'
+                self.sweep_stops.append(re.compile(pattern, re.DOTALL))
+        self.width = width
+        #: The function generated by :meth:`generate`, once generated for
+        #: the current alphabet.
+        self.generated = None
+
+    def encode(self, string):
+        """Returns a :class:`Tape` containing `string`.
+
+        Characters of `string` that are not in the alphabet of this machine
+        are interned (see :meth:`intern`).
+
+        """
+        index = self.symbol_index
+        for c in set(string):
+            if c not in index:
+                self.intern(c)
+        symbols = self.symbols
+        # If every symbol is a single byte in Latin-1, the string can be
+        # translated to symbol indices without a Python-level loop.
+        if all(isinstance(symbol, str) and ord(symbol) < 256
+               for symbol in symbols):
+            translation = bytearray(256)
+            for i, symbol in enumerate(symbols):
+                translation[ord(symbol)] = i
+            cells = string.encode('latin-1').translate(translation)
+        else:
+            cells = [index[c] for c in string]
+        return Tape(cells, symbols)
+
+    def execute(self, tape, head, state, budget):
+        """Runs the machine on `tape` (a :class:`Tape`), beginning with the
+        read/write head at position `head` in state index `state`, until the
+        machine halts or `budget` steps have been taken.
+
+        Returns the three-tuple *(state, head, steps)* representing the
+        configuration in which the machine stopped and the number of steps
+        taken. The tape is modified in place.
+
+        """
+        table = self.table
+        width = self.width
+        running = self.running
+        cells = tape.cells
+        # Work with physical indices into the cells of the tape. The head may
+        # move freely within the visited portion of the tape, [low, high);
+        # beyond that the tape must be extended first.
+        offset = tape.offset
+        low = offset + tape.start
+        high = offset + tape.stop
+        head += offset
+        # Iterating over a range is cheaper than maintaining a step counter.
+        steps = budget
+        for i in range(budget):
+            if state >= running:
+                steps = i
+                break
+            if not low <= head < high:
+                head -= offset
+                tape.reach(head)
+                offset = tape.offset
+                low = offset + tape.start
+                high = offset + tape.stop
+                head += offset
+            state, cells[head], direction = table[state * width + cells[head]]
+            head += direction
+        head -= offset
+        # As in the uncompiled machine, the tape is extended to include the
+        # cell under the head in the halting configuration.
+        tape.reach(head)
+        return state, head, steps
+
+    def trace(self, tape, head, state, budget, observers):
+        """Runs the machine as in :meth:`execute`, notifying each of the
+        :class:`Observer` instances in `observers` of each step of the
+        computation.
+
+        """
+        table = self.table
+        width = self.width
+        running = self.running
+        states = self.states
+        cells = tape.cells
+        steps = 0
+        while True:
+            if not tape.start <= head < tape.stop:
+                tape.reach(head)
+                for observer in observers:
+                    observer.on_tape_grow(tape, head)
+            if state >= running or steps == budget:
+                break
+            for observer in observers:
+                observer.on_step(states[state], tape, head)
+            physical = tape.offset + head
+            state, cells[physical], direction = \
+                table[state * width + cells[physical]]
+            head += direction
+            steps += 1
+        if state == self.accept_index or state == self.reject_index:
+            for observer in observers:
+                observer.on_halt(states[state], tape, head)
+        return state, head, steps
+
+    def execute_profiling(self, tape, head, state, budget, profile):
+        """Runs the machine as in :meth:`execute`, adding the number of
+        times each transition is taken, and the other counters described in
+        :class:`Profile`, to `profile`.
+
+        The counters are kept in flat lists indexed in the same way as
+        :attr:`table` and :attr:`states` during the computation, and are
+        added to `profile` only once it stops.
+
+        """
+        table = self.table
+        width = self.width
+        running = self.running
+        cells = tape.cells
+        hits = [0] * len(table)
+        entries = [0] * len(self.states)
+        entries[state] += 1
+        reversals = 0
+        last = 0
+        offset = tape.offset
+        low = offset + tape.start
+        high = offset + tape.stop
+        head += offset
+        leftmost = rightmost = head
+        steps = budget
+        for i in range(budget):
+            if state >= running:
+                steps = i
+                break
+            if not low <= head < high:
+                head -= offset
+                leftmost -= offset
+                rightmost -= offset
+                tape.reach(head)
+                offset = tape.offset
+                low = offset + tape.start
+                high = offset + tape.stop
+                head += offset
+                leftmost += offset
+                rightmost += offset
+            index = state * width + cells[head]
+            hits[index] += 1
+            new_state, cells[head], direction = table[index]
+            if new_state != state:
+                entries[new_state] += 1
+                state = new_state
+            if direction != last and direction:
+                if last:
+                    reversals += 1
+                last = direction
+            head += direction
+            if head < leftmost:
+                leftmost = head
+            elif head > rightmost:
+                rightmost = head
+        head -= offset
+        tape.reach(head)
+        profile.add(self, hits, entries, reversals, leftmost - offset,
+                    rightmost - offset)
+        return state, head, steps
+
+    def finish(self, configuration, state, head, steps, loops=False):
+        """Updates `configuration` after the machine has taken `steps` steps
+        and stopped in state index `state` with the head at `head`.
+
+        If `state` represents an error, `configuration` is left in the
+        configuration immediately before the erroneous step and the error is
+        raised. If `loops` is ``True``, the machine has been found to never
+        halt.
+
+        """
+        if state in self.errors:
+            exception, message, previous_state = self.errors[state]
+            # The erroneous step does not modify the tape, so restoring the
+            # previous state restores the configuration before that step.
+            if previous_state is not None:
+                state = previous_state
+                steps -= 1
+            configuration.update(self.states[state], head, steps)
+            if message is None:
+                message = '"{}" not in transition dictionary'.format(
+                    configuration.tape[head])
+            raise exception(message)
+        if state == self.accept_index:
+            status = ACCEPT
+        elif state == self.reject_index:
+            status = REJECT
+        elif loops:
+            status = LOOPS
+        else:
+            status = TIMEOUT
+        configuration.update(self.states[state], head, steps, status)
+        return configuration
+
+    def dumps(self, configuration, digest=_CHECKPOINT_NO_INPUT):
+        """Returns `configuration` encoded in the binary format described in
+        :data:`_CHECKPOINT_HEADER`, as written by
+        :meth:`TuringMachine.checkpoint`.
+
+        `digest` is the digest of the input string of the computation, as
+        returned by :func:`_input_digest`.
+
+        """
+        tape = configuration.tape
+        if not isinstance(tape, Tape):
+            raise ValueError('checkpoints are only supported for tapes of'
+                             ' type Tape')
+        # The state is recorded by its representation rather than its index,
+        # which depends on the order of the transition dictionary.
+        state = repr(configuration.state).encode('utf-8', 'surrogatepass')
+        alphabet = ''.join(tape.symbols).encode('utf-8')
+        cells = tape.cells[tape.offset + tape.start:tape.offset + tape.stop]
+        header = _CHECKPOINT_HEADER.pack(
+            _CHECKPOINT_MAGIC, _CHECKPOINT_VERSION,
+            bytes.fromhex(self.machine.fingerprint()), digest,
+            _CHECKPOINT_STATUSES.index(configuration.status), len(state),
+            configuration.head, configuration.steps, tape.start, len(cells),
+            len(alphabet))
+        return b''.join((header, state, alphabet, cells))
+
+    def loads(self, data, digest=_CHECKPOINT_NO_INPUT):
+        """Returns the :class:`Configuration` encoded in the :class:`bytes`
+        object `data` by :meth:`dumps`.
+
+        If both `digest` and the digest recorded in `data` are those of an
+        input string, they must be equal.
+
+        """
+        size = _CHECKPOINT_HEADER.size
+        if len(data) < size:
+            raise ValueError('truncated checkpoint')
+        (magic, version, fingerprint, recorded, status, state_length, head,
+         steps, start, length, alphabet_length) = (
+             _CHECKPOINT_HEADER.unpack_from(data))
+        if magic != _CHECKPOINT_MAGIC or version != _CHECKPOINT_VERSION:
+            raise ValueError('not a checkpoint of a Turing machine')
+        if fingerprint.hex() != self.machine.fingerprint():
+            raise ValueError('checkpoint of a different Turing machine')
+        if _CHECKPOINT_NO_INPUT not in (digest, recorded) \
+                and digest != recorded:
+            raise ValueError('checkpoint of a different input string')
+        if len(data) != size + state_length + alphabet_length + length:
+            raise ValueError('truncated checkpoint')
+        state = data[size:size + state_length]
+        state = state.decode('utf-8', 'surrogatepass')
+        states = {repr(q): q for q in self.states if q is not None}
+        if state not in states:
+            raise ValueError('checkpoint of an unknown state')
+        size += state_length
+        alphabet = data[size:size + alphabet_length].decode('utf-8')
+        # The alphabet of the checkpoint may include symbols of its input
+        # that have not been interned by this machine, or have been interned
+        # in a different order.
+        translation = bytearray(256)
+        for i, symbol in enumerate(alphabet):
+            translation[i] = self.intern(symbol)
+        cells = data[size + alphabet_length:].translate(translation)
+        tape = Tape(cells, self.symbols)
+        tape.offset = -start
+        tape.start = start
+        tape.stop = start + length
+        return Configuration(states[state], tape, head, steps,
+                             _CHECKPOINT_STATUSES[status])
+
+    def execute_detecting_loops(self, tape, head, state, budget):
+        """Runs the machine as in :meth:`execute`, but stops if the machine
+        enters a configuration that it has been in before.
+
+        Returns the four-tuple *(state, head, steps, loops)*, where *loops*
+        is ``True`` if and only if the machine was stopped because it will
+        never halt.
+
+        A deterministic machine that repeats a configuration repeats it
+        forever. Repetitions are found with Brent's cycle detection
+        algorithm: the configuration after 1, 2, 4, 8, ... steps is saved,
+        and each subsequent configuration is compared with the most recently
+        saved one. If the machine first repeats a configuration after *m*
+        steps, with a cycle of *n* steps, the repetition is detected within
+        *O(m + n)* steps.
+
+        To make the comparison cheap, a hash of the tape is updated on each
+        step that modifies the tape, so configurations are compared by their
+        state, head position, and hash; the tapes themselves are compared
+        only if all three are equal. The tapes compared include only the
+        non-blank cells, since blank cells beyond the ends of the visited
+        portion of the tape are indistinguishable from unvisited cells.
+
+        In addition, a machine that visits a new cell beyond either end of
+        the tape in a state that, on reading a blank, writes a blank and
+        moves further in the same direction will never halt, even though it
+        never repeats a configuration; this is detected too.
+
+        """
+        table = self.table
+        width = self.width
+        running = self.running
+        cells = tape.cells
+        modulus = _HASH_MODULUS
+        base = _HASH_BASE
+        # The weight of the symbol at each position in the hash of the tape.
+        weights = {}
+        fingerprint = 0
+        for position in range(tape.start, tape.stop):
+            symbol = cells[tape.offset + position]
+            if symbol:
+                weight = weights[position] = pow(base, position, modulus)
+                fingerprint = (fingerprint + symbol * weight) % modulus
+        # The configuration most recently saved by Brent's algorithm.
+        saved_state = state
+        saved_head = head
+        saved_fingerprint = fingerprint
+        saved_tape = tape.nonblank()
+        power = 1
+        length = 0
+        steps = 0
+        loops = False
+        # As in execute(), work with physical indices into the cells.
+        offset = tape.offset
+        low = offset + tape.start
+        high = offset + tape.stop
+        head += offset
+        while state < running and steps < budget:
+            if not low <= head < high:
+                direction = 1 if head >= high else -1
+                if table[state * width] == (state, 0, direction):
+                    loops = True
+                    break
+                head -= offset
+                tape.reach(head)
+                offset = tape.offset
+                low = offset + tape.start
+                high = offset + tape.stop
+                head += offset
+            symbol = cells[head]
+            state, new_symbol, direction = table[state * width + symbol]
+            if new_symbol != symbol:
+                cells[head] = new_symbol
+                position = head - offset
+                weight = weights.get(position)
+                if weight is None:
+                    weight = weights[position] = pow(base, position, modulus)
+                fingerprint = (fingerprint
+                               + (new_symbol - symbol) * weight) % modulus
+            head += direction
+            steps += 1
+            length += 1
+            if (head - offset == saved_head and state == saved_state
+                    and fingerprint == saved_fingerprint
+                    and tape.nonblank() == saved_tape):
+                loops = True
+                break
+            if length == power:
+                saved_state = state
+                saved_head = head - offset
+                saved_fingerprint = fingerprint
+                saved_tape = tape.nonblank()
+                power *= 2
+                length = 0
+        head -= offset
+        tape.reach(head)
+        return state, head, steps, loops
+
+    def generate_source(self):
+        """Returns the source code of a Python module that defines a function
+        ``execute(tape, head, state, budget)`` equivalent to :meth:`execute`
+        for this machine and its current alphabet.
+
+        Each non-halting state becomes a loop in the generated function in
+        which the symbol under the head is compared with constants, and the
+        symbol written, the movement of the head, and the next state are
+        constants as well. The loop runs until the machine enters another
+        state. The loops are the leaves of a binary search on the state
+        index, so entering a state takes a number of comparisons logarithmic
+        in the number of states, and the nesting of the generated code stays
+        shallow however many states there are.
+
+        A transition from a state to itself that does not modify the tape
+        and moves the head by one cell is repeated until the head reaches a
+        symbol for which the state has some other transition. The generated
+        code checks whether the next cell holds such a symbol, and if it
+        does not, finds the next one with a single call to a
+        :class:`bytearray` method (or a regular expression), so each sweep
+        across the tape runs at the speed of C code, while each of its steps
+        is still counted.
+
+        """
+        table = self.table
+        width = self.width
+        running = self.running
+        header = [
+            '# Generated by turingmachine.CompiledMachine.generate_source;'
+            ' do not edit.',
+            '# fingerprint: {}'.format(self.machine.fingerprint()),
+            '# symbols: {!r}'.format(self.symbols),
+            'import re',
+        ]
+        lines = [
+            '',
+            '',
+            'def _rsearch(pattern, cells, low, high):',
+            '    # Returns the position of the last match of the single-byte',
+            '    # pattern in cells[low:high], or low - 1, scanning backward',
+            '    # in windows of increasing size.',
+            '    size = 64',
+            '    while high > low:',
+            '        start = max(high - size, low)',
+            '        match = pattern.match(cells, start, high)',
+            '        if match:',
+            '            return match.end() - 1',
+            '        high = start',
+            '        size *= 2',
+            '    return low - 1',
+        ]
+
+        def test(position, stops, sweep):
+            # Returns an expression that is true if the cell at `position`
+            # holds one of the symbols at which a sweep stops.
+            if len(stops) == 1:
+                return 'cells[{}] == {}'.format(position, stops[0])
+            if len(sweep) == 1:
+                return 'cells[{}] != {}'.format(position, sweep[0])
+            if len(stops) <= len(sweep):
+                return 'cells[{}] in {!r}'.format(position, tuple(stops))
+            return 'cells[{}] not in {!r}'.format(position, tuple(sweep))
+
+        def branch(q):
+            # Returns the lines of the loop that runs state q until the
+            # machine enters another state or the budget is exhausted.
+            entries = table[q * width:(q + 1) * width]
+            body = [
+                'while True:',
+                '    if not low <= head < high:',
+                '        head -= offset',
+                '        tape.reach(head)',
+                '        offset = tape.offset',
+                '        low = offset + tape.start',
+                '        high = offset + tape.stop',
+                '        head += offset',
+                '    symbol = cells[head]',
+            ]
+            indent = ' ' * 8
+            for s in range(width):
+                # The last symbol needs no comparison, since the symbol under
+                # the head is always in the alphabet.
+                if s == width - 1 and s > 0:
+                    body.append('    else:')
+                else:
+                    keyword = 'if' if s == 0 else 'elif'
+                    body.append('    {} symbol == {}:'.format(keyword, s))
+                new_state, new_symbol, direction = entries[s]
+                if (new_state == q and new_symbol == s
+                        and direction in (1, -1)):
+                    # The symbols across which this state sweeps in this
+                    # direction, and the other symbols, at which it stops.
+                    sweep = [t for t, entry in enumerate(entries)
+                             if entry == (q, t, direction)]
+                    stops = [t for t in range(width) if t not in sweep]
+                    pattern = b'[' + b''.join(b'\\x%02x' % stop
+                                              for stop in stops) + b']'
+                    if direction == 1:
+                        if not stops:
+                            find = ['position = high']
+                        elif len(stops) == 1:
+                            find = [
+                                'position = cells.find({!r}, head,'
+                                ' high)'.format(bytes(stops)),
+                                'if position < 0:',
+                                '    position = high',
+                            ]
+                        else:
+                            name = '_STOPS_{}'.format(q)
+                            header.append('{} = re.compile({!r})'.format(
+                                name, pattern))
+                            find = [
+                                'match = {}.search(cells, head,'
+                                ' high)'.format(name),
+                                'position = match.start() if match else'
+                                ' high',
+                            ]
+                        find += [
+                            'distance = min(position - head,'
+                            ' budget - steps)',
+                            'head += distance',
+                        ]
+                        near = ['head + 2 < high', 'head + 1',
+                                'head + 2']
+                    else:
+                        if not stops:
+                            find = ['position = low - 1']
+                        elif len(stops) == 1:
+                            find = [
+                                'position = cells.rfind({!r}, low,'
+                                ' head)'.format(bytes(stops)),
+                                'if position < 0:',
+                                '    position = low - 1',
+                            ]
+                        else:
+                            name = '_RSTOPS_{}'.format(q)
+                            header.append(
+                                '{} = re.compile({!r}, re.DOTALL)'.format(
+                                    name, b'.*' + pattern))
+                            find = ['position = _rsearch({}, cells, low,'
+                                    ' head)'.format(name)]
+                        find += [
+                            'distance = min(head - position,'
+                            ' budget - steps)',
+                            'head -= distance',
+                        ]
+                        near = ['head - 2 >= low', 'head - 1',
+                                'head - 2']
+                    if stops:
+                        # A sweep of one or two steps needs no search; a
+                        # sweep near either end of the visited portion of
+                        # the tape always searches.
+                        sign = '+' if direction == 1 else '-'
+                        bound, first, second = near
+                        body += [
+                            indent + 'if {} and {}:'.format(
+                                bound, test(first, stops, sweep)),
+                            indent + '    head {}= 1'.format(sign),
+                            indent + '    steps += 1',
+                            indent + 'elif {} and {} and steps + 1 < budget:'
+                            .format(bound, test(second, stops, sweep)),
+                            indent + '    head {}= 2'.format(sign),
+                            indent + '    steps += 2',
+                            indent + 'else:',
+                        ]
+                        body += [indent + '    ' + line for line in find]
+                        body.append(indent + '    steps += distance')
+                    else:
+                        body += [indent + line for line in find]
+                        body.append(indent + 'steps += distance')
+                    body += [
+                        indent + 'if steps == budget:',
+                        indent + '    break',
+                    ]
+                    continue
+                if new_symbol != s:
+                    body.append(indent + 'cells[head] = {}'.format(
+                        new_symbol))
+                if direction > 0:
+                    body.append(indent + 'head += {}'.format(direction))
+                elif direction < 0:
+                    body.append(indent + 'head -= {}'.format(-direction))
+                body.append(indent + 'steps += 1')
+                if new_state == q:
+                    body += [
+                        indent + 'if steps == budget:',
+                        indent + '    break',
+                    ]
+                else:
+                    body += [
+                        indent + 'state = {}'.format(new_state),
+                        indent + 'break',
+                    ]
+            return body
+
+        def dispatch(low, high):
+            # Returns the lines that run the state in the half-open interval
+            # [low, high) whose index is `state`, by binary search, so that
+            # entering a state takes a number of comparisons logarithmic in
+            # the number of states.
+            if high - low == 1:
+                if low == running:
+                    # Every halting state index is at least `running`.
+                    return ['break']
+                return branch(low)
+            middle = (low + high) // 2
+            return (['if state < {}:'.format(middle)]
+                    + ['    ' + line for line in dispatch(low, middle)]
+                    + ['else:']
+                    + ['    ' + line for line in dispatch(middle, high)])
+
+        lines += [
+            '',
+            '',
+            'def execute(tape, head, state, budget):',
+            '    cells = tape.cells',
+            '    offset = tape.offset',
+            '    low = offset + tape.start',
+            '    high = offset + tape.stop',
+            '    head += offset',
+            '    steps = 0',
+            '    while steps < budget:',
+        ]
+        lines += [' ' * 8 + line for line in dispatch(0, running + 1)]
+        lines += [
+            '    head -= offset',
+            '    tape.reach(head)',
+            '    return state, head, steps',
+            '',
+        ]
+        return '\n'.join(header + lines)
+
+    def generate(self, directory=None):
+        """Returns the function defined by the source code returned by
+        :meth:`generate_source`, compiling it if necessary.
+
+        If `directory` is not ``None``, the generated module is stored in
+        that directory, in a file whose name is determined by the
+        fingerprint of the machine and its alphabet, and is imported from
+        there, so that a later call (from any process) can reuse the module
+        and its cached bytecode instead of generating it again.
+
+        """
+        if self.generated is not None:
+            return self.generated
+        if directory is None:
+            source = self.generate_source()
+            namespace = {}
+            exec(compile(source, '<turingmachine>', 'exec'), namespace)
+            self.generated = namespace['execute']
+            return self.generated
+        identity = repr((self.machine.fingerprint(), self.symbols))
+        name = 'turingmachine_{}'.format(
+            hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32])
+        filename = os.path.join(directory, name + '.py')
+        if not os.path.exists(filename):
+            # Write the module atomically so that concurrent processes never
+            # import a partially written file.
+            temporary = '{}.{}.tmp'.format(filename, os.getpid())
+            with open(temporary, 'w') as f:
+                f.write(self.generate_source())
+            os.replace(temporary, filename)
+        spec = importlib.util.spec_from_file_location(name, filename)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self.generated = module.execute
+        return self.generated
+
+    def execute_runs(self, tape, head, state, budget):
+        """Runs the machine as in :meth:`execute`, but with the tape stored as
+        a list of runs of equal symbols.
+
+        A transition from a state to itself that rewrites the symbol it reads
+        and moves the head by one cell is a "sweep": the machine repeats it
+        until it reads a symbol on which the state does not sweep in the same
+        direction. On a run-length encoded tape, a sweep across an entire run
+        is performed in a single operation, while still counting each of the
+        steps it represents. A sweep continues across consecutive runs of
+        different symbols as long as the state sweeps over each of them (as
+        the states of a machine that moves to the end of a binary string do),
+        and the run at which it stops is found by a regular expression
+        search over the symbols of the runs (see :attr:`sweep_stops`), so a
+        computation that spends most of its time sweeping across the tape
+        takes Python-level time proportional to the number of sweeps, not
+        the number of cells.
+
+        """
+        table = self.table
+        width = self.width
+        running = self.running
+        sweeps = self.sweeps
+        sweep_stops = self.sweep_stops
+        # The tape is represented by the parallel sequences `symbols` and
+        # `lengths`, and the head is at cell `k` of run `r`. The runs cover
+        # exactly the visited portion of the tape, beginning at `start`.
+        tape.reach(head)
+        start = tape.start
+        symbols, lengths = tape.runs()
+        r = 0
+        k = head - start
+        while k >= lengths[r]:
+            k -= lengths[r]
+            r += 1
+        steps = 0
+        while state < running and steps < budget:
+            symbol = symbols[r]
+            new_state, new_symbol, direction = table[state * width + symbol]
+            if sweeps[state * width + symbol]:
+                # Find the run at which the sweep stops: the nearest run in
+                # the direction of motion whose symbol this state does not
+                # sweep over in the same direction. The head sweeps to the
+                # last cell before it; the step from that cell is taken
+                # below.
+                if direction == 1:
+                    match = sweep_stops[2 * state + 1].search(symbols, r + 1)
+                    stop = match.start() if match else len(symbols)
+                    last = stop - 1
+                    edge = stop == len(symbols)
+                    distance = lengths[r] - 1 - k + sum(lengths[r + 1:stop])
+                else:
+                    match = sweep_stops[2 * state].match(symbols, 0, r)
+                    stop = match.end() - 1 if match else -1
+                    last = stop + 1
+                    edge = stop == -1
+                    distance = k + sum(lengths[last:r])
+                symbol = symbols[last]
+                remaining = budget - steps
+                if (distance >= remaining
+                        or edge and symbol == 0 and budget != sys.maxsize):
+                    # The budget runs out during the sweep. Sweeping outward
+                    # across the blanks beyond the end of the tape never
+                    # ends, so in that case the whole budget is taken at
+                    # once, extending the tape by the cells the head visits.
+                    position = sum(lengths[:r]) + k + direction * remaining
+                    total = sum(lengths)
+                    if position < 0:
+                        lengths[0] -= position
+                        start += position
+                        position = 0
+                    elif position >= total:
+                        lengths[-1] += position - total + 1
+                    r = 0
+                    while position >= lengths[r]:
+                        position -= lengths[r]
+                        r += 1
+                    k = position
+                    steps = budget
+                    break
+                steps += distance
+                r = last
+                k = lengths[r] - 1 if direction == 1 else 0
+                new_symbol = symbol
+            elif new_symbol != symbol:
+                # Replace the cell under the head by a run of length one,
+                # merging it with the neighboring runs if they are equal.
+                length = lengths[r]
+                pieces_symbols = [new_symbol]
+                pieces_lengths = [1]
+                if k:
+                    pieces_symbols.insert(0, symbol)
+                    pieces_lengths.insert(0, k)
+                if length - k - 1:
+                    pieces_symbols.append(symbol)
+                    pieces_lengths.append(length - k - 1)
+                symbols[r:r + 1] = pieces_symbols
+                lengths[r:r + 1] = pieces_lengths
+                if k:
+                    r += 1
+                k = 0
+                if r > 0 and symbols[r - 1] == new_symbol:
+                    r -= 1
+                    k = lengths[r]
+                    lengths[r] += 1
+                    del symbols[r + 1], lengths[r + 1]
+                if r + 1 < len(symbols) and symbols[r + 1] == new_symbol:
+                    lengths[r] += lengths[r + 1]
+                    del symbols[r + 1], lengths[r + 1]
+            state = new_state
+            steps += 1
+            # Move the head one cell at a time, adding a blank to the tape
+            # if the head moves beyond either end of it.
+            for i in range(abs(direction)):
+                if direction > 0:
+                    k += 1
+                    if k == lengths[r]:
+                        if r + 1 < len(lengths):
+                            r += 1
+                            k = 0
+                        elif symbols[r] == 0:
+                            lengths[r] += 1
+                        else:
+                            symbols.append(0)
+                            lengths.append(1)
+                            r += 1
+                            k = 0
+                else:
+                    k -= 1
+                    if k < 0:
+                        if r > 0:
+                            r -= 1
+                            k = lengths[r] - 1
+                            continue
+                        start -= 1
+                        k = 0
+                        if symbols[0] == 0:
+                            lengths[0] += 1
+                        else:
+                            symbols.insert(0, 0)
+                            lengths.insert(0, 1)
+        head = start + sum(lengths[:r]) + k
+        tape.set_runs(start, symbols, lengths)
+        return state, head, steps
+
+    def execute_mapped(self, tape, head, state, budget):
+        """Runs the machine as in :meth:`execute` on the
+        :class:`MappedTape` `tape`.
+
+        Each cell is read from the overlay of written cells if it has been
+        written, and from the memory-mapped file otherwise. A byte of the
+        file is translated to a symbol index by a table that is filled in
+        the first time the byte is read, so characters that are not in the
+        alphabet of the machine are interned (see :meth:`intern`) only if
+        they are actually read.
+
+        """
+        table = self.table
+        width = self.width
+        running = self.running
+        base = tape.base
+        size = tape.size
+        overlay = tape.overlay
+        translation = tape.translation
+        low = tape.start
+        high = tape.stop
+        steps = 0
+        while state < running and steps < budget:
+            if not low <= head < high:
+                if head < low:
+                    low = head
+                else:
+                    high = head + 1
+            symbol = overlay.get(head)
+            if symbol is None:
+                if 0 < head <= size:
+                    symbol = translation[base[head - 1]]
+                    if symbol < 0:
+                        byte = base[head - 1]
+                        symbol = translation[byte] = self.intern(chr(byte))
+                        table = self.table
+                        width = self.width
+                else:
+                    symbol = 0
+            state, new_symbol, direction = table[state * width + symbol]
+            if new_symbol != symbol:
+                overlay[head] = new_symbol
+            head += direction
+            steps += 1
+        tape.start = min(low, head)
+        tape.stop = max(high, head + 1)
+        return state, head, steps
+
+    def execute_paged(self, tape, head, state, budget):
+        """Runs the machine as in :meth:`execute` on the :class:`PagedTape`
+        `tape`.
+
+        The page under the head is kept in a local variable, along with the
+        range of indices within it that the head can reach without leaving
+        the page or the visited portion of the tape, so the dictionary of
+        pages is only consulted when the head crosses into another page.
+        Until a cell of a page is written, the page is represented by a
+        shared page of blanks.
+
+        """
+        table = self.table
+        width = self.width
+        running = self.running
+        pages = tape.pages
+        size = tape.page_size
+        blank = tape.blank
+        start = tape.start
+        stop = tape.stop
+        number, i = divmod(head, size)
+        base = number * size
+        page = pages.get(number, blank)
+        low = max(start - base, 0)
+        high = min(stop - base, size)
+        steps = budget
+        for n in range(budget):
+            if state >= running:
+                steps = n
+                break
+            if not low <= i < high:
+                head = base + i
+                if head < start:
+                    start = head
+                elif head >= stop:
+                    stop = head + 1
+                number, i = divmod(head, size)
+                base = number * size
+                page = pages.get(number, blank)
+                low = max(start - base, 0)
+                high = min(stop - base, size)
+            symbol = page[i]
+            state, new_symbol, direction = table[state * width + symbol]
+            if new_symbol != symbol:
+                if page is blank:
+                    page = pages[number] = bytearray(size)
+                page[i] = new_symbol
+            i += direction
+        head = base + i
+        # As in the other engines, the cell under the head in the halting
+        # configuration has been visited.
+        tape.start = min(start, head)
+        tape.stop = max(stop, head + 1)
+        return state, head, steps
+
+    def resume(self, configuration, max_steps=None, engine=None,
+               detect_loops=False):
+        """Continues the computation from `configuration`, as described in
+        :meth:`TuringMachine.resume`.
+
+        """
+        if max_steps is None:
+            max_steps = sys.maxsize
+        if engine is None:
+            engine = 'table'
+        if engine not in ENGINES:
+            raise ValueError('unknown engine: {}'.format(engine))
+        observers = self.machine.observers
+        profile = self.machine.profile
+        tape = configuration.tape
+        state = self.state_index[configuration.state]
+        head = configuration.head
+        if isinstance(tape, MappedTape):
+            if (observers or profile is not None or detect_loops
+                    or engine != 'table'):
+                raise ValueError('memory-mapped tapes are only supported by'
+                                 ' the table engine without observers,'
+                                 ' profiling, or loop detection')
+            state, head, steps = self.execute_mapped(tape, head, state,
+                                                     max_steps)
+            return self.finish(configuration, state, head, steps)
+        if isinstance(tape, PagedTape):
+            if (observers or profile is not None or detect_loops
+                    or engine not in ('table', 'paged')):
+                raise ValueError('paged tapes are only supported by the'
+                                 ' paged engine without observers,'
+                                 ' profiling, or loop detection')
+            engine = 'paged'
+        if profile is not None:
+            if observers or detect_loops:
+                raise ValueError('profiling is not supported with observers'
+                                 ' or loop detection')
+            state, head, steps = self.execute_profiling(tape, head, state,
+                                                        max_steps, profile)
+            return self.finish(configuration, state, head, steps)
+        if detect_loops:
+            if observers or engine != 'table':
+                raise ValueError('loop detection is only supported by the'
+                                 ' table engine without observers')
+            state, head, steps, loops = self.execute_detecting_loops(
+                tape, head, state, max_steps)
+            return self.finish(configuration, state, head, steps, loops)
+        if observers:
+            state, head, steps = self.trace(tape, head, state, max_steps,
+                                            observers)
+        elif engine == 'rle':
+            state, head, steps = self.execute_runs(tape, head, state,
+                                                   max_steps)
+        elif engine == 'codegen':
+            state, head, steps = self.generate()(tape, head, state,
+                                                 max_steps)
+        elif engine == 'paged':
+            if not isinstance(tape, PagedTape):
+                tape = configuration.tape = PagedTape(
+                    tape.cells[tape.offset + tape.start:
+                               tape.offset + tape.stop],
+                    tape.symbols, tape.start)
+            state, head, steps = self.execute_paged(tape, head, state,
+                                                    max_steps)
+        else:
+            state, head, steps = self.execute(tape, head, state, max_steps)
+        return self.finish(configuration, state, head, steps)
+
+    def lockstep(self, strings, max_steps=None, return_tape=False):
+        """Runs this machine on each of `strings` simultaneously, as
+        described in :meth:`TuringMachine.run_lockstep`.
+
+        """
+        if numpy is None:
+            raise ImportError('the lockstep simulator requires NumPy')
+        if max_steps is None:
+            max_steps = sys.maxsize
+        strings = list(strings)
+        # Encoding may add symbols to the alphabet, so intern every symbol
+        # of the strings before reading the transition table.
+        joined = ''.join(strings)
+        index = self.symbol_index
+        for c in set(joined):
+            if c not in index:
+                self.intern(c)
+        symbols = self.symbols
+        width = self.width
+        running = self.running
+        table = self.table
+        next_state = numpy.array([entry[0] for entry in table], numpy.intp)
+        new_symbol = numpy.array([entry[1] for entry in table], numpy.uint8)
+        direction = numpy.array([entry[2] for entry in table], numpy.intp)
+        # The head of each machine can move at most `block * distance` cells
+        # in `block` steps, so the bounds of the tape only need to be checked
+        # once per block.
+        distance = max(int(abs(direction).max()) if len(table) else 0, 1)
+        block = LOCKSTEP_BLOCK
+        margin = block * distance
+        count = len(strings)
+        lengths = numpy.fromiter(map(len, strings), numpy.intp, count)
+        length = int(lengths.max()) if count else 0
+        # Each row of `cells` is the tape of one machine. Position zero of
+        # each tape is at column `origin`. The strings are translated to
+        # symbol indices all at once and scattered into their rows.
+        if all(isinstance(symbol, str) and ord(symbol) < 256
+               for symbol in symbols):
+            translation = bytearray(256)
+            for i, symbol in enumerate(symbols):
+                translation[ord(symbol)] = i
+            encoded = joined.encode('latin-1').translate(translation)
+        else:
+            encoded = bytes([index[c] for c in joined])
+        flat = numpy.frombuffer(encoded, numpy.uint8)
+        origin = margin
+        cells = numpy.zeros((count, margin + length + margin), numpy.uint8)
+        if count and (lengths == length).all():
+            cells[:, origin:origin + length] = flat.reshape(count, length)
+        elif count:
+            starts = numpy.cumsum(lengths) - lengths
+            columns = (numpy.arange(len(flat))
+                       - numpy.repeat(starts, lengths) + origin)
+            cells[numpy.repeat(numpy.arange(count), lengths),
+                  columns] = flat
+        # The row index, state index, and head column of each machine that
+        # has not yet halted.
+        rows = numpy.arange(count)
+        state = numpy.full(count, self.state_index[self.machine.initial_state],
+                           numpy.intp)
+        head = numpy.full(count, origin + 1, numpy.intp)
+        # The extent of the cells visited by each head, if requested.
+        low = head.copy()
+        high = head.copy()
+        final_state = numpy.empty(count, numpy.intp)
+        final_head = numpy.empty(count, numpy.intp)
+        final_steps = numpy.empty(count, numpy.intp)
+        steps = 0
+        while True:
+            # Record and remove the machines that have halted.
+            halted = state >= running
+            if halted.any():
+                done = rows[halted]
+                final_state[done] = state[halted]
+                final_head[done] = head[halted]
+                final_steps[done] = steps
+                remaining = ~halted
+                rows = rows[remaining]
+                state = state[remaining]
+                head = head[remaining]
+            if not rows.size or steps == max_steps:
+                break
+            # Add blank columns at either end of the tapes so that no head
+            # can move off the tape during the next block of steps.
+            left = max(margin - int(head.min()), 0)
+            right = max(int(head.max()) + margin + 1 - cells.shape[1], 0)
+            if left or right:
+                left = max(left, cells.shape[1]) if left else 0
+                right = max(right, cells.shape[1]) if right else 0
+                cells = numpy.concatenate(
+                    (numpy.zeros((count, left), numpy.uint8), cells,
+                     numpy.zeros((count, right), numpy.uint8)), axis=1)
+                origin += left
+                head += left
+                low += left
+                high += left
+            for i in range(min(block, max_steps - steps)):
+                entry = state * width + cells[rows, head]
+                cells[rows, head] = new_symbol[entry]
+                head += direction[entry]
+                state = next_state[entry]
+                if return_tape:
+                    low[rows] = numpy.minimum(low[rows], head)
+                    high[rows] = numpy.maximum(high[rows], head)
+                if (state >= running).any():
+                    steps += i + 1
+                    break
+            else:
+                steps += min(block, max_steps - steps)
+        # The machines that have not halted have exceeded their budget.
+        final_state[rows] = state
+        final_head[rows] = head
+        final_steps[rows] = steps
+        # The status of each state index; error states have none.
+        labels = numpy.full(len(self.states), None, object)
+        labels[:running] = TIMEOUT
+        labels[self.accept_index] = ACCEPT
+        labels[self.reject_index] = REJECT
+        statuses = labels[final_state]
+        # Error states are numbered after the accept and reject states.
+        if not return_tape and (final_state <= self.reject_index).all():
+            return list(map(Result, statuses.tolist(), final_steps.tolist(),
+                            itertools.repeat(None, count)))
+        results = []
+        for i in range(count):
+            status = statuses[i]
+            if status is not None and not return_tape:
+                results.append(Result(status, int(final_steps[i]), None))
+                continue
+            # Copy the tape of the machine into a Tape, so that the result
+            # (or error) is computed exactly as by execute().
+            tape = Tape(cells[i].tobytes(), symbols)
+            tape.offset = origin
+            tape.start = 0
+            tape.stop = int(lengths[i])
+            if return_tape:
+                tape.start = min(int(low[i]) - origin, 0)
+                tape.stop = max(int(high[i]) - origin + 1, tape.stop)
+            head = int(final_head[i]) - origin
+            configuration = Configuration(self.machine.initial_state, tape)
+            self.finish(configuration, int(final_state[i]), head,
+                        int(final_steps[i]))
+            results.append(configuration.result(return_tape))
+        return results
+
+    def __call__(self, string, return_tape=False):
+        """Runs this machine on `string`, as described in
+        :meth:`TuringMachine.__call__`.
+
+        """
+        configuration = self.resume(
+            Configuration(self.machine.initial_state, self.encode(string)))
+        result = configuration.status == ACCEPT
+        if return_tape:
+            return result, str(configuration.tape)
+        return result
+
+
+class CompiledMultiTapeMachine(object):
+    """A :class:`MultiTapeTuringMachine` whose states and symbols have been
+    interned to small integers.
+
+    Instances of this class should be created by calling
+    :meth:`MultiTapeTuringMachine.compile`. States and symbols are numbered
+    as in :class:`CompiledMachine`, and each tape is a :class:`Tape`.
+
+    Since the number of tuples of symbols grows exponentially with the
+    number of tapes, the transition table is not a flat list but a list of
+    dictionaries, :attr:`table`, one for each non-halting state, that map
+    each tuple of symbol indices in the transition dictionary to a
+    three-tuple *(new_state, new_symbols, moves)*. *new_symbols* is a tuple
+    of symbol indices and *moves* is a tuple of pairs *(tape, direction)*
+    for each tape whose head moves.
+
+    """
+
+    def __init__(self, machine):
+        self.machine = machine
+        #: The list of symbols, indexed by symbol index.
+        self.symbols = [BLANK]
+        #: Maps each symbol to its index in :attr:`symbols`.
+        self.symbol_index = {BLANK: 0}
+        transition = machine.transition
+        accept_state = machine.accept_state
+        reject_state = machine.reject_state
+        #: The list of states, indexed by state index.
+        self.states = [q for q in transition
+                       if q != accept_state and q != reject_state]
+        self.running = running = len(self.states)
+        self.accept_index = running
+        self.reject_index = running + 1
+        self.states += [accept_state, reject_state]
+        #: Maps each state to its index in :attr:`states`.
+        self.state_index = index = {}
+        for i in reversed(range(len(self.states))):
+            index[self.states[i]] = i
+        #: Maps each error state index to a three-tuple, as in
+        #: :attr:`CompiledMachine.errors`.
+        self.errors = {}
+        for q in itertools.chain([machine.initial_state], machine.states):
+            self._state(q)
+        #: The transition table.
+        self.table = []
+        for q in range(running):
+            row = {}
+            for symbols, entry in transition[self.states[q]].items():
+                if not all(isinstance(symbol, str) and len(symbol) == 1
+                           for symbol in symbols):
+                    # This entry can never be read from the tapes.
+                    continue
+                key = tuple(self._add_symbol(symbol) for symbol in symbols)
+                new_state, new_symbols, directions = entry
+                bad = [symbol for symbol in new_symbols if len(symbol) != 1]
+                if bad:
+                    message = ('tape alphabet must only include symbols of'
+                               ' length 1 ({})'.format(bad[0]))
+                    i = len(self.states)
+                    self.states.append(None)
+                    self.errors[i] = (BadSymbol, message, q)
+                    row[key] = (i, key, ())
+                    continue
+                new_symbols = tuple(self._add_symbol(symbol)
+                                    for symbol in new_symbols)
+                moves = tuple((tape, direction)
+                              for tape, direction in enumerate(directions)
+                              if direction)
+                row[key] = (self._state(new_state), new_symbols, moves)
+            self.table.append(row)
+
+    def _state(self, q):
+        """Returns the index of state `q`, which is an error state that
+        raises :exc:`UnknownState` if it is not a state of the machine.
+
+        """
+        if q not in self.state_index:
+            i = len(self.states)
+            self.states.append(q)
+            self.state_index[q] = i
+            message = '{} is not in transition dictionary'.format(q)
+            self.errors[i] = (UnknownState, message, None)
+        return self.state_index[q]
+
+    # Symbols are interned in the same way as for a single tape.
+    _add_symbol = CompiledMachine._add_symbol
+
+    def encode(self, string):
+        """Returns a :class:`Tape` containing `string`.
+
+        Characters of `string` that are not in the alphabet of this machine
+        are added to it; reading them raises :exc:`UnknownSymbol`.
+
+        """
+        return Tape([self._add_symbol(c) for c in string], self.symbols)
+
+    def execute(self, tapes, heads, state, budget):
+        """Runs the machine on `tapes` (a list of :class:`Tape` objects),
+        beginning with the heads at the positions in the list `heads` in
+        state index `state`, until the machine halts, reads a tuple of
+        symbols that is not in the transition dictionary, or has taken
+        `budget` steps.
+
+        Returns the four-tuple *(state, heads, steps, unknown)*, where
+        *unknown* is ``True`` if and only if the machine stopped because
+        the tuple of symbols under the heads is not in the transition
+        dictionary. The tapes are modified in place.
+
+        """
+        table = self.table
+        running = self.running
+        heads = list(heads)
+        indices = range(len(tapes))
+        steps = 0
+        while state < running and steps < budget:
+            for i in indices:
+                tape = tapes[i]
+                if not tape.start <= heads[i] < tape.stop:
+                    tape.reach(heads[i])
+            read = tuple([tapes[i].cells[tapes[i].offset + heads[i]]
+                          for i in indices])
+            entry = table[state].get(read)
+            if entry is None:
+                return state, heads, steps, True
+            state, written, moves = entry
+            if written != read:
+                for i in indices:
+                    tapes[i].cells[tapes[i].offset + heads[i]] = written[i]
+            for i, direction in moves:
+                heads[i] += direction
+            steps += 1
+        for i in indices:
+            tapes[i].reach(heads[i])
+        return state, heads, steps, False
+
+    def resume(self, configuration, max_steps=None):
+        """Continues the computation from `configuration`, as described in
+        :meth:`MultiTapeTuringMachine.resume`.
+
+        """
+        if max_steps is None:
+            max_steps = sys.maxsize
+        state = self.state_index.get(configuration.state)
+        if state is None or state in self.errors:
+            raise UnknownState('{} is not in transition dictionary'.format(
+                configuration.state))
+        state, heads, steps, unknown = self.execute(
+            configuration.tape, configuration.head, state, max_steps)
+        if unknown:
+            configuration.update(self.states[state], heads, steps)
+            symbols = tuple(tape[head] for tape, head
+                            in zip(configuration.tape, heads))
+            raise UnknownSymbol('{} not in transition dictionary'.format(
+                symbols))
+        if state in self.errors:
+            exception, message, previous_state = self.errors[state]
+            if previous_state is not None:
+                state = previous_state
+                steps -= 1
+            configuration.update(self.states[state], heads, steps)
+            raise exception(message)
+        if state == self.accept_index:
+            status = ACCEPT
+        elif state == self.reject_index:
+            status = REJECT
+        else:
+            status = TIMEOUT
+        configuration.update(self.states[state], heads, steps, status)
+        return configuration
+
+
+class CompiledNondeterministicMachine(object):
+    """A :class:`NondeterministicTuringMachine` whose states and symbols have
+    been interned to small integers.
+
+    Instances of this class should be created by calling
+    :meth:`NondeterministicTuringMachine.compile`. States and symbols are
+    numbered as in :class:`CompiledMachine`. The transition table,
+    :attr:`table`, is a list of dictionaries, one for each non-halting
+    state, that map each symbol index in the transition dictionary to the
+    tuple of the moves *(new_state, new_symbol, direction)* of the machine,
+    in a fixed order.
+
+    A configuration is a four-tuple *(state, head, start, cells)* of the
+    state index, the position of the head, and the non-blank portion of the
+    tape: the :class:`bytes` object *cells* of symbol indices, whose first
+    cell is at position *start* (or the empty :class:`bytes` object at
+    position zero if the tape is blank). Equal configurations are
+    therefore equal tuples, with equal hashes.
+
+    """
+
+    def __init__(self, machine):
+        self.machine = machine
+        #: The list of symbols, indexed by symbol index.
+        self.symbols = [BLANK]
+        #: Maps each symbol to its index in :attr:`symbols`.
+        self.symbol_index = {BLANK: 0}
+        transition = machine.transition
+        accept_state = machine.accept_state
+        reject_state = machine.reject_state
+        #: The list of states, indexed by state index.
+        self.states = [q for q in transition
+                       if q != accept_state and q != reject_state]
+        self.running = running = len(self.states)
+        self.accept_index = running
+        self.reject_index = running + 1
+        self.states += [accept_state, reject_state]
+        #: Maps each state to its index in :attr:`states`.
+        self.state_index = index = {}
+        for i in reversed(range(len(self.states))):
+            index[self.states[i]] = i
+        #: Maps each error state index to a two-tuple *(exception,
+        #: message)*; entering the state raises the exception.
+        self.errors = {}
+        for q in itertools.chain([machine.initial_state], machine.states):
+            self._state(q)
+        #: The transition table.
+        self.table = []
+        for q in range(running):
+            row = {}
+            for symbol, moves in transition[self.states[q]].items():
+                if not (isinstance(symbol, str) and len(symbol) == 1):
+                    # This entry can never be read from the tape.
+                    continue
+                entry = []
+                for new_state, new_symbol, direction in moves:
+                    if len(new_symbol) != 1:
+                        message = ('tape alphabet must only include symbols'
+                                   ' of length 1 ({})'.format(new_symbol))
+                        i = len(self.states)
+                        self.states.append(None)
+                        self.errors[i] = (BadSymbol, message)
+                        entry.append((i, 0, 0))
+                        continue
+                    entry.append((self._state(new_state),
+                                  self._add_symbol(new_symbol), direction))
+                row[self._add_symbol(symbol)] = tuple(sorted(entry))
+            self.table.append(row)
+
+    def _state(self, q):
+        """Returns the index of state `q`, which is an error state that
+        raises :exc:`UnknownState` if it is not a state of the machine.
+
+        """
+        if q not in self.state_index:
+            i = len(self.states)
+            self.states.append(q)
+            self.state_index[q] = i
+            message = '{} is not in transition dictionary'.format(q)
+            self.errors[i] = (UnknownState, message)
+        return self.state_index[q]
+
+    # Symbols are interned in the same way as for a deterministic machine.
+    _add_symbol = CompiledMachine._add_symbol
+
+    def initial_configuration(self, string):
+        """Returns the configuration of this machine before it begins
+        executing on `string`.
+
+        """
+        state = self.state_index[self.machine.initial_state]
+        if state in self.errors:
+            exception, message = self.errors[state]
+            raise exception(message)
+        cells = bytes([self._add_symbol(c) for c in string])
+        return _strip(state, 1, 0, cells)
+
+    def successors(self, configuration):
+        """Returns the list of configurations that this machine may enter in
+        one step from `configuration`, which must not be a halting
+        configuration.
+
+        """
+        state, head, start, cells = configuration
+        i = head - start
+        symbol = cells[i] if 0 <= i < len(cells) else 0
+        moves = self.table[state].get(symbol)
+        if moves is None:
+            raise UnknownSymbol('"{}" not in transition dictionary'.format(
+                self.symbols[symbol]))
+        successors = []
+        for new_state, new_symbol, direction in moves:
+            if new_state in self.errors:
+                exception, message = self.errors[new_state]
+                raise exception(message)
+            if new_symbol == symbol:
+                successors.append((new_state, head + direction, start,
+                                   cells))
+                continue
+            if 0 <= i < len(cells):
+                written = cells[:i] + bytes((new_symbol,)) + cells[i + 1:]
+                position = start
+            elif i < 0:
+                written = bytes((new_symbol,)) + bytes(-i - 1) + cells
+                position = head
+            else:
+                written = cells + bytes(i - len(cells)) + bytes((new_symbol,))
+                position = start
+            successors.append(_strip(new_state, head + direction, position,
+                                     written))
+        return successors
+
+    def search_breadth(self, string, max_steps, max_configurations,
+                       workers):
+        """Searches breadth-first for an accepting computation on `string`,
+        as described in :meth:`NondeterministicTuringMachine.evaluate`.
+
+        Returns the three-tuple *(status, steps, configuration)*, where
+        *configuration* is the accepting configuration, if any.
+
+        """
+        configuration = self.initial_configuration(string)
+        if configuration[0] >= self.running:
+            return self._halted(configuration, 0)
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if workers == 1:
+            return self._search_breadth(
+                configuration, max_steps, max_configurations,
+                lambda frontier: map(self.successors, frontier))
+        with multiprocessing.Pool(workers, _initialize_worker,
+                                  (self.machine, None, None)) as pool:
+
+            def expand(frontier):
+                # This is the heuristic used by multiprocessing.Pool.map.
+                chunksize, extra = divmod(len(frontier), workers * 4)
+                return pool.imap(_successors, frontier,
+                                 max(chunksize + bool(extra), 1))
+
+            return self._search_breadth(configuration, max_steps,
+                                        max_configurations, expand)
+
+    def _search_breadth(self, configuration, max_steps, max_configurations,
+                        expand):
+        """Implements :meth:`search_breadth`, beginning at the running
+        configuration `configuration`. ``expand(frontier)`` must return an
+        iterable of the lists of :meth:`successors` of the configurations in
+        the list `frontier`, in order.
+
+        """
+        accept_index = self.accept_index
+        running = self.running
+        seen = {configuration}
+        frontier = [configuration]
+        steps = 0
+        while frontier:
+            if steps == max_steps:
+                return TIMEOUT, steps, None
+            steps += 1
+            successors = []
+            for configurations in expand(frontier):
+                for configuration in configurations:
+                    state = configuration[0]
+                    if state == accept_index:
+                        return ACCEPT, steps, configuration
+                    if state >= running or configuration in seen:
+                        continue
+                    seen.add(configuration)
+                    successors.append(configuration)
+            if len(seen) > max_configurations:
+                return TIMEOUT, steps, None
+            frontier = successors
+        return REJECT, steps, None
+
+    def search_depth(self, string, max_steps):
+        """Searches for an accepting computation on `string` by iterative
+        deepening, as described in
+        :meth:`NondeterministicTuringMachine.evaluate`, and returns a
+        three-tuple as :meth:`search_breadth` does.
+
+        """
+        initial = self.initial_configuration(string)
+        if initial[0] >= self.running:
+            return self._halted(initial, 0)
+        accept_index = self.accept_index
+        running = self.running
+        limit = 0
+        while True:
+            # Whether some computation was cut short by the limit.
+            deeper = limit == 0
+            path = {initial}
+            stack = []
+            if limit:
+                stack.append((initial, iter(self.successors(initial))))
+            while stack:
+                configuration, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    path.remove(configuration)
+                    continue
+                state = child[0]
+                if state == accept_index:
+                    return ACCEPT, len(stack), child
+                if state >= running or child in path:
+                    continue
+                if len(stack) == limit:
+                    deeper = True
+                    continue
+                path.add(child)
+                stack.append((child, iter(self.successors(child))))
+            if not deeper:
+                return REJECT, limit, None
+            if limit == max_steps:
+                return TIMEOUT, limit, None
+            limit += 1
+
+    def _halted(self, configuration, steps):
+        """Returns the result of a search that ends in the halting
+        `configuration` after `steps` steps.
+
+        """
+        if configuration[0] == self.accept_index:
+            return ACCEPT, steps, configuration
+        return REJECT, steps, None
+
+    def decode(self, configuration, length):
+        """Returns the contents of the tape in `configuration` as a string,
+        from the leftmost to the rightmost of the first `length` cells, the
+        non-blank cells, and the cell under the head.
+
+        """
+        state, head, start, cells = configuration
+        low = min(0, head)
+        high = max(length, head + 1)
+        if cells:
+            low = min(low, start)
+            high = max(high, start + len(cells))
+        symbols = self.symbols
+        return ''.join([symbols[cells[p - start]]
+                        if 0 <= p - start < len(cells) else symbols[0]
+                        for p in range(low, high)])
+
+
+def _strip(state, head, start, cells):
+    """Returns the configuration of a :class:`CompiledNondeterministicMachine`
+    in state index `state` with the head at `head` and the :class:`bytes`
+    object `cells` on the tape beginning at position `start`, with the
+    blanks at either end of `cells` removed.
+
+    """
+    stripped = cells.lstrip(b'\0')
+    start += len(cells) - len(stripped)
+    stripped = stripped.rstrip(b'\0')
+    if not stripped:
+        start = 0
+    return state, head, start, stripped
+
+
+class Configuration(object):
+    """A configuration of a Turing machine: its state, the contents of its
+    tape, and the position of its read/write head, along with the number of
+    steps the machine has taken to reach it.
+
+    Instances of this class are returned by :meth:`TuringMachine.run` and
+    may be passed to :meth:`TuringMachine.resume` to continue the
+    computation. A configuration is updated in place as the computation
+    proceeds.
+
+    `state` is the current state of the machine. `tape` is a :class:`Tape`.
+    `head` is the position of the read/write head on `tape`; the default,
+    ``1``, is the left-most non-blank character of an input string. `steps`
+    is the number of steps taken so far. `status` is one of :data:`ACCEPT`,
+    :data:`REJECT`, :data:`TIMEOUT`, or :data:`LOOPS`, or ``None`` if the
+    computation has not yet begun.
+
+    """
+
+    def __init__(self, state, tape, head=1, steps=0, status=None):
+        self.state = state
+        self.tape = tape
+        self.head = head
+        self.steps = steps
+        self.status = status
+
+    @property
+    def halted(self):
+        """Whether the machine has halted in this configuration."""
+        return self.status in (ACCEPT, REJECT)
+
+    def result(self, return_tape=False):
+        """Returns the :class:`Result` summarizing this configuration.
+
+        The result includes the contents of the tape only if `return_tape`
+        is ``True``.
+
+        """
+        tape = str(self.tape) if return_tape else None
+        return Result(self.status, self.steps, tape)
+
+    def update(self, state, head, steps, status=None):
+        """Records that the machine has taken `steps` more steps and is now
+        in `state` with the head at `head`.
+
+        """
+        self.state = state
+        self.head = head
+        self.steps += steps
+        self.status = status
+
+    def __repr__(self):
+        return '{}({!r}, {!r}, head={}, steps={}, status={!r})'.format(
+            type(self).__name__, self.state, str(self.tape), self.head,
+            self.steps, self.status)
+
+
+class MultiTapeConfiguration(Configuration):
+    """A configuration of a :class:`MultiTapeTuringMachine`.
+
+    This is the same as :class:`Configuration`, except that :attr:`tape` is
+    a list of :class:`Tape` objects and :attr:`head` is the list of the
+    positions of the corresponding read/write heads.
+
+    """
+
+    def result(self, return_tape=False):
+        """Returns the :class:`Result` summarizing this configuration.
+
+        If `return_tape` is ``True``, the result includes the tuple of the
+        contents of each tape.
+
+        """
+        tape = None
+        if return_tape:
+            tape = tuple(str(tape) for tape in self.tape)
+        return Result(self.status, self.steps, tape)
+
+    def __repr__(self):
+        return '{}({!r}, {!r}, head={}, steps={}, status={!r})'.format(
+            type(self).__name__, self.state,
+            [str(tape) for tape in self.tape], self.head, self.steps,
+            self.status)
+
+
+class Tape(object):
+    """A tape of a Turing machine that can grow at both ends.
+
+    The cells of the tape are stored as symbol indices in a
+    :class:`bytearray`, :attr:`cells`. Positions on the tape are integers
+    relative to the first cell of the tape as it was initially specified;
+    position *p* is stored at index ``offset + p`` of :attr:`cells`. Extending
+    the tape in either direction at least doubles the size of
+    :attr:`cells`, so a computation that visits *n* cells beyond the ends of
+    its input spends amortized constant time per cell growing the tape, and
+    writing a symbol is always a constant time operation.
+
+    The positions in the half-open interval [:attr:`start`, :attr:`stop`)
+    have been visited by the read/write head (or were part of the initial
+    contents of the tape); every other cell is blank.
+
+    `cells` is an iterable of symbol indices, each of which must be less than
+    256. `symbols` is the list of symbols, indexed by symbol index, as in
+    :attr:`CompiledMachine.symbols`.
+
+    """
+
+    def __init__(self, cells, symbols):
+        self.cells = bytearray(cells)
+        self.symbols = symbols
+        self.offset = 0
+        self.start = 0
+        self.stop = len(self.cells)
+
+    def reach(self, position):
+        """Extends the visited portion of the tape so that it includes
+        `position`.
+
+        """
+        cells = self.cells
+        if position < self.start:
+            physical = self.offset + position
+            if physical < 0:
+                extra = max(-physical, len(cells))
+                cells[0:0] = bytes(extra)
+                self.offset += extra
+            self.start = position
+        elif position >= self.stop:
+            physical = self.offset + position
+            if physical >= len(cells):
+                cells.extend(bytes(max(physical - len(cells) + 1, len(cells))))
+            self.stop = position + 1
+
+    def runs(self):
+        """Returns the visited portion of this tape as a :class:`bytearray`
+        of the symbol index of each maximal run of equal symbols and a list
+        of the length of each run.
+
+        """
+        cells = bytes(self.cells[self.offset + self.start:
+                                 self.offset + self.stop])
+        symbols = bytearray()
+        lengths = []
+        for match in _RUN.finditer(cells):
+            symbols.append(cells[match.start()])
+            lengths.append(match.end() - match.start())
+        return symbols, lengths
+
+    def set_runs(self, start, symbols, lengths):
+        """Replaces the contents of this tape by the runs of symbols given by
+        the lists `symbols` and `lengths`, beginning at position `start`.
+
+        """
+        self.cells = bytearray(b''.join([bytes((symbol,)) * length
+                                         for symbol, length
+                                         in zip(symbols, lengths)]))
+        self.offset = -start
+        self.start = start
+        self.stop = start + len(self.cells)
+
+    def nonblank(self):
+        """Returns a two-tuple *(position, cells)*, where *cells* is the
+        shortest :class:`bytes` object containing every non-blank cell of
+        this tape and *position* is the position of its first cell.
+
+        Two tapes with equal symbols at every position have equal
+        non-blank contents.
+
+        """
+        cells = bytes(self.cells)
+        stripped = cells.lstrip(b'\0')
+        position = len(cells) - len(stripped) - self.offset
+        stripped = stripped.rstrip(b'\0')
+        if not stripped:
+            position = 0
+        return position, stripped
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, position):
+        """Returns the symbol at `position` on this tape."""
+        physical = self.offset + position
+        if not 0 <= physical < len(self.cells):
+            return self.symbols[0]
+        return self.symbols[self.cells[physical]]
+
+    def __str__(self):
+        """Returns the visited portion of this tape as a string."""
+        symbols = self.symbols
+        cells = self.cells[self.offset + self.start:self.offset + self.stop]
+        return ''.join([symbols[c] for c in cells])
+
+
+class PagedTape(object):
+    """A tape of a Turing machine stored as a dictionary of pages.
+
+    The tape is divided into pages of `page_size` cells each, where page
+    *n* holds the positions from ``n * page_size`` up to (but not including)
+    ``(n + 1) * page_size``. :attr:`pages` maps the number of each page that
+    has been written to a :class:`bytearray` of symbol indices; every other
+    page is blank. The memory used is therefore proportional to the number
+    of pages written, however far apart they are, and the tape grows in
+    constant time in either direction.
+
+    `cells` is an iterable of symbol indices, the initial contents of the
+    tape beginning at position `start`. `symbols` is as in :class:`Tape`.
+    As for :class:`Tape`, the positions in the half-open interval
+    [:attr:`start`, :attr:`stop`) have been visited by the read/write head
+    (or were part of the initial contents of the tape).
+
+    """
+
+    def __init__(self, cells, symbols, start=0, page_size=PAGE_SIZE):
+        self.symbols = symbols
+        self.page_size = page_size
+        #: The page of blanks read in place of each page not in
+        #: :attr:`pages`; it is never written.
+        self.blank = bytes(page_size)
+        #: Maps the number of each page that has been written to its cells.
+        self.pages = {}
+        cells = bytes(cells)
+        self.start = start
+        self.stop = start + len(cells)
+        # Copy the cells a page at a time, skipping the pages that would be
+        # entirely blank.
+        for number in range(start // page_size,
+                            -(-self.stop // page_size)):
+            base = number * page_size
+            first = max(start, base)
+            chunk = cells[first - start:min(self.stop, base + page_size)
+                          - start]
+            if chunk.count(0) == len(chunk):
+                continue
+            if len(chunk) == page_size:
+                self.pages[number] = bytearray(chunk)
+            else:
+                page = self.pages[number] = bytearray(page_size)
+                page[first - base:first - base + len(chunk)] = chunk
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, position):
+        """Returns the symbol at `position` on this tape."""
+        number, i = divmod(position, self.page_size)
+        return self.symbols[self.pages.get(number, self.blank)[i]]
+
+    def __str__(self):
+        """Returns the visited portion of this tape as a string."""
+        return ''.join([self[p] for p in range(self.start, self.stop)])
+
+
+class MappedTape(object):
+    """A tape whose initial contents are the contents of a memory-mapped
+    file.
+
+    The bytes of the file named `filename` are the cells at positions ``1``
+    through the size of the file, read as Latin-1 characters; every other
+    cell is initially blank. The file is never modified. Instead, each cell
+    written is stored in :attr:`overlay`, a dictionary mapping its position
+    to its symbol index, which takes precedence over the file. `symbols` is
+    as in :class:`Tape`.
+
+    As for :class:`Tape`, the positions in the half-open interval
+    [:attr:`start`, :attr:`stop`) have been visited by the read/write head
+    (or were part of the initial contents of the tape, including a blank
+    at each end of the file). Instances of this class are context managers
+    that close the file on exit.
+
+    """
+
+    def __init__(self, filename, symbols):
+        self.symbols = symbols
+        with open(filename, 'rb') as f:
+            self.size = os.fstat(f.fileno()).st_size
+            # Empty files cannot be memory-mapped.
+            if self.size:
+                self.base = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.base = b''
+        #: Maps each position that has been written to its symbol index.
+        self.overlay = {}
+        #: Maps each byte of the file to its symbol index, or to -1 if it
+        #: has not been translated yet.
+        self.translation = [-1] * 256
+        for i, symbol in enumerate(symbols):
+            if isinstance(symbol, str) and ord(symbol) < 256:
+                self.translation[ord(symbol)] = i
+        self.start = 0
+        self.stop = self.size + 2
+
+    def close(self):
+        """Closes the memory-mapped file."""
+        if isinstance(self.base, mmap.mmap):
+            self.base.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, position):
+        """Returns the symbol at `position` on this tape."""
+        symbol = self.overlay.get(position)
+        if symbol is not None:
+            return self.symbols[symbol]
+        if 0 < position <= self.size:
+            return chr(self.base[position - 1])
+        return self.symbols[0]
+
+    def __str__(self):
+        """Returns the visited portion of this tape as a string.
+
+        This reads the entire file, so it should only be used for small
+        files.
+
+        """
+        return ''.join([self[p] for p in range(self.start, self.stop)])
+
+
+class ResultCache(object):
+    """A cache of the :class:`Result` of running Turing machines on input
+    strings, with least recently used eviction and optional persistence.
+
+    Results are keyed by the fingerprint of the Turing machine (see
+    :meth:`TuringMachine.fingerprint`) and the input string; see
+    :meth:`key`. A cache may therefore be shared by many Turing machines.
+
+    At most `maxsize` results are kept in memory; when another result is
+    added, the least recently used result is evicted. If `path` is not
+    ``None``, it is the name of an SQLite database file in which every
+    result is also stored, so that results survive the process. Results
+    evicted from memory are then reloaded from the file when they are next
+    requested.
+
+    """
+
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self._results = OrderedDict()
+        self._connection = None
+        if path is not None:
+            self._connection = sqlite3.connect(path)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY,'
+                ' status TEXT, steps INTEGER, tape TEXT)')
+            self._connection.commit()
+
+    @staticmethod
+    def key(fingerprint, string):
+        """Returns the key of the result of running the Turing machine with
+        the given `fingerprint` on `string`.
+
+        """
+        digest = hashlib.sha256(fingerprint.encode('ascii'))
+        digest.update(string.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Returns the :class:`Result` stored under `key`, or ``None`` if
+        there is none.
+
+        """
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+            return result
+        if self._connection is None:
+            return None
+        row = self._connection.execute(
+            'SELECT status, steps, tape FROM results WHERE key = ?',
+            (key,)).fetchone()
+        if row is None:
+            return None
+        result = Result(*row)
+        self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        """Stores the :class:`Result` `result` under `key`."""
+        self._remember(key, result)
+        if self._connection is not None:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                (key,) + tuple(result))
+            self._connection.commit()
+
+    def _remember(self, key, result):
+        """Stores `result` in memory, evicting the least recently used
+        result if the cache is full.
+
+        """
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def clear(self):
+        """Removes every result from the cache, including from the
+        database file, if any.
+
+        """
+        self._results.clear()
+        if self._connection is not None:
+            self._connection.execute('DELETE FROM results')
+            self._connection.commit()
+
+    def close(self):
+        """Closes the database file, if any."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __len__(self):
+        """Returns the number of results in memory."""
+        return len(self._results)
+
+
+class Profile(object):
+    """Counts where the steps of the computations of a
+    :class:`TuringMachine` go.
+
+    A profile is attached to a Turing machine by passing it as the `profile`
+    argument of :class:`TuringMachine` (or by setting
+    :attr:`TuringMachine.profile`). Every computation of the machine then
+    runs in a profiling interpreter, whatever the engine requested, and adds
+    to the counters of the profile, so a single profile aggregates any
+    number of computations, and :meth:`update` aggregates profiles, such as
+    those of the worker processes of :meth:`TuringMachine.map`. Results
+    found in a :class:`ResultCache` are not profiled.
+
+    The counters are:
+
+    * :attr:`hits`, the number of times each transition was taken, keyed by
+      the two-tuple *(state, symbol)*;
+    * :attr:`dwell`, the number of steps taken in each state;
+    * :attr:`entries`, the number of times each state was entered, including
+      the state in which each computation began, so that the mean number of
+      consecutive steps spent in a state is its dwell divided by its entries;
+    * :attr:`reversals`, the number of times the read/write head changed
+      direction;
+    * :attr:`leftmost` and :attr:`rightmost`, the extent of the tape reached
+      by the head.
+
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Resets every counter to zero."""
+        #: Maps each pair *(state, symbol)* to the number of times the
+        #: transition from that state on reading that symbol was taken.
+        self.hits = {}
+        #: Maps each state to the number of steps taken in that state.
+        self.dwell = {}
+        #: Maps each state to the number of times it was entered.
+        self.entries = {}
+        #: The number of times the read/write head changed direction.
+        self.reversals = 0
+        #: The leftmost and rightmost positions of the read/write head, or
+        #: ``None`` if no computation has been profiled.
+        self.leftmost = self.rightmost = None
+        #: The number of computations profiled.
+        self.runs = 0
+        #: The total number of steps taken.
+        self.steps = 0
+
+    def add(self, compiled, hits, entries, reversals, leftmost, rightmost):
+        """Adds the counters of a computation of the :class:`CompiledMachine`
+        `compiled` to this profile.
+
+        `hits` and `entries` are lists of counters indexed in the same way as
+        the transition table and the list of states of `compiled`,
+        respectively. The remaining arguments are as described in the
+        documentation of this class.
+
+        """
+        states = compiled.states
+        symbols = compiled.symbols
+        width = compiled.width
+        errors = compiled.errors
+        for index, count in enumerate(hits):
+            if not count:
+                continue
+            q, s = divmod(index, width)
+            # Reading a symbol that is not in the transition dictionary is
+            # not a step of the computation.
+            error = errors.get(compiled.table[index][0])
+            if error is not None and error[2] is not None:
+                count -= 1
+                if not count:
+                    continue
+            key = (states[q], symbols[s])
+            self.hits[key] = self.hits.get(key, 0) + count
+            self.dwell[states[q]] = self.dwell.get(states[q], 0) + count
+            self.steps += count
+        for index, count in enumerate(entries):
+            if count and states[index] is not None:
+                state = states[index]
+                self.entries[state] = self.entries.get(state, 0) + count
+        self.reversals += reversals
+        self._extend(leftmost, rightmost)
+        self.runs += 1
+
+    def _extend(self, leftmost, rightmost):
+        """Extends the extent of the tape reached by the head to include
+        the positions from `leftmost` to `rightmost`.
+
+        """
+        if leftmost is None:
+            return
+        if self.leftmost is None or leftmost < self.leftmost:
+            self.leftmost = leftmost
+        if self.rightmost is None or rightmost > self.rightmost:
+            self.rightmost = rightmost
+
+    def update(self, other):
+        """Adds the counters of the profile `other` to this profile."""
+        for mine, theirs in ((self.hits, other.hits),
+                             (self.dwell, other.dwell),
+                             (self.entries, other.entries)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+        self.reversals += other.reversals
+        self._extend(other.leftmost, other.rightmost)
+        self.runs += other.runs
+        self.steps += other.steps
+
+    def as_dict(self):
+        """Returns the counters of this profile as a dictionary of lists,
+        numbers, and strings that can be serialized as JSON.
+
+        The transitions and the states are each listed in decreasing order
+        of the number of steps taken.
+
+        """
+        transitions = sorted(self.hits.items(), key=lambda item: -item[1])
+        states = sorted(self.dwell.items(), key=lambda item: -item[1])
+        return {
+            'runs': self.runs,
+            'steps': self.steps,
+            'reversals': self.reversals,
+            'extent': [self.leftmost, self.rightmost],
+            'transitions': [{'state': state, 'symbol': symbol, 'hits': count}
+                            for (state, symbol), count in transitions],
+            'states': [{'state': state, 'dwell': count,
+                        'entries': self.entries.get(state, 0)}
+                       for state, count in states],
+        }
+
+    def to_json(self, **kw):
+        """Returns the result of :meth:`as_dict` serialized as JSON.
+
+        States that cannot be serialized as JSON are converted to strings.
+        The keyword arguments are passed to :func:`json.dumps`.
+
+        """
+        return json.dumps(self.as_dict(), default=str, **kw)
+
+    def report(self, limit=None):
+        """Returns a report of the counters of this profile as a string, in
+        the style of the :mod:`profile` module.
+
+        The report lists the transitions, then the states, in decreasing
+        order of the number of steps taken. If `limit` is not ``None``, only
+        that many of each are listed.
+
+        """
+        total = self.steps or 1
+        lines = [
+            '{} steps in {} runs; {} reversals; extent [{}, {}]'.format(
+                self.steps, self.runs, self.reversals, self.leftmost,
+                self.rightmost),
+            '',
+            '{:>12} {:>7}  {:<16} {}'.format('hits', 'percent', 'state',
+                                             'symbol'),
+        ]
+        transitions = sorted(self.hits.items(), key=lambda item: -item[1])
+        for (state, symbol), count in transitions[:limit]:
+            lines.append('{:>12} {:>7.2%}  {:<16} {!r}'.format(
+                count, count / total, str(state), symbol))
+        lines += [
+            '',
+            '{:>12} {:>7}  {:<16} {:>12} {:>10}'.format(
+                'dwell', 'percent', 'state', 'entries', 'per entry'),
+        ]
+        states = sorted(self.dwell.items(), key=lambda item: -item[1])
+        for state, count in states[:limit]:
+            entries = self.entries.get(state, 0)
+            lines.append('{:>12} {:>7.2%}  {:<16} {:>12} {:>10.1f}'.format(
+                count, count / total, str(state), entries,
+                count / entries if entries else 0))
+        return '\n'.join(lines)
+
+
+class Observer(object):
+    """Base class for objects that are notified as a :class:`TuringMachine`
+    executes.
+
+    Subclasses override any of the methods below; the default
+    implementations do nothing. Observers are attached to a Turing machine
+    by adding them to :attr:`TuringMachine.observers`.
+
+    In each method, `state` is the current state of the machine, `tape` is
+    the :class:`Tape` of the machine, and `head` is the position of the
+    read/write head on the tape.
+
+    """
+
+    def on_step(self, state, tape, head):
+        """Called before the machine takes each step of its computation."""
+        pass
+
+    def on_halt(self, state, tape, head):
+        """Called when the machine enters the accept or reject state."""
+        pass
+
+    def on_tape_grow(self, tape, head):
+        """Called when the head visits a cell beyond the previously visited
+        portion of `tape`.
+
+        """
+        pass
+
+
+class LoggingObserver(Observer):
+    """An observer that logs a visual representation of the current head
+    location, state, and contents of the tape of the Turing machine.
+
+    For example, if the Turing machine has ``'_010_'`` on its input tape, is
+    in state ``4``, and has read/write head at the location of the ``1``
+    symbol, this observer would log the following messages, one line at a
+    time.
+
+        _010_
+          ^
+          4
+
+    The caret represents the current location of the read/write head, and
+    the number beneath it represents the current state of the machine.
+
+    The messages are logged at the debug level to `log`, which defaults to
+    the :data:`logger` of this module. If `log` does not have the debug level
+    enabled, the tape is not rendered at all.
+
+    """
+
+    def __init__(self, log=None):
+        self.log = logger if log is None else log
+
+    def on_step(self, state, tape, head):
+        # Rendering the tape is expensive, so skip it entirely unless the
+        # messages would actually be logged.
+        if not self.log.isEnabledFor(logging.DEBUG):
+            return
+        # Draw the caret relative to the left end of the visited tape.
+        column = head - tape.start
+        self.log.debug('')
+        self.log.debug(str(tape))
+        self.log.debug(' ' * column + '^')
+        self.log.debug(' ' * column + str(state))
+
+    on_halt = on_step
+
+
+def load_machine(path):
+    """Returns the :class:`TuringMachine` defined in the JSON or YAML file
+    named `path`.
+
+    The file is read as YAML if its name ends with ``.yaml`` or ``.yml``
+    (which requires PyYAML) and as JSON otherwise. It must contain an
+    object with the keys ``initial_state``, ``accept_state``,
+    ``reject_state``, and ``transition``, and optionally ``states``, as in
+    the arguments of :class:`TuringMachine`; if ``states`` is missing, the
+    states are those that appear anywhere else. ``transition`` maps each
+    state to an object that maps each symbol to a list ``[new_state,
+    new_symbol, direction]``, where *direction* is ``"L"``, ``"R"``, or
+    ``"S"`` (or ``-1``, ``1``, or ``0``). For example::
+
+        {"initial_state": "even", "accept_state": "accept",
+         "reject_state": "reject",
+         "transition": {"even": {"0": ["even", "0", "R"],
+                                 "1": ["odd", "1", "R"],
+                                 "_": ["reject", "_", "L"]},
+                        "odd": {"0": ["odd", "0", "R"],
+                                "1": ["even", "1", "R"],
+                                "_": ["accept", "_", "R"]}}}
+
+    Since the keys of JSON objects are always strings, every state is
+    converted to a string.
+
+    """
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ImportError('reading YAML requires PyYAML')
+            description = yaml.safe_load(f)
+        else:
+            description = json.load(f)
+    transition = {}
+    for state, row in description['transition'].items():
+        transition[str(state)] = {
+            str(symbol): (str(new_state), str(new_symbol),
+                          _DIRECTIONS.get(direction, direction))
+            for symbol, (new_state, new_symbol, direction) in row.items()}
+    initial_state = str(description['initial_state'])
+    accept_state = str(description['accept_state'])
+    reject_state = str(description['reject_state'])
+    if 'states' in description:
+        states = {str(state) for state in description['states']}
+    else:
+        states = {initial_state, accept_state, reject_state}
+        for state, row in transition.items():
+            states.add(state)
+            states.update(entry[0] for entry in row.values())
+    return TuringMachine(states, initial_state, accept_state, reject_state,
+                         transition)
+
+
+def main(argv=None):
+    """Runs a Turing machine on a stream of inputs as specified by the
+    command-line arguments `argv` and returns the exit status.
+
+    This is the entry point of ``python -m turingmachine``. The machine is
+    read from a file by :func:`load_machine`, and the inputs are read one
+    per line from a file or standard input and evaluated by
+    :meth:`TuringMachine.map`. For each input, a line containing a JSON
+    object with the keys ``input``, ``status``, ``steps``, and, if
+    requested, ``tape`` is written to standard output, in the order of the
+    inputs. Every :data:`DEFAULT_PROGRESS_SECONDS` seconds (or as often as
+    requested), and once at the end, the number of inputs evaluated and the
+    numbers of inputs and steps per second are written to standard error.
+
+    A machine file that cannot be read is a usage error. An input on which
+    the machine raises one of :data:`_COMPUTATION_ERRORS` is reported on
+    standard error instead of a result, the remaining inputs are still
+    evaluated, and the exit status is ``1``.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m turingmachine',
+        description='Run a Turing machine on each line of the input and'
+        ' write the results as JSON lines.')
+    parser.add_argument('machine',
+                        help='the JSON or YAML file defining the machine')
+    parser.add_argument('inputs', nargs='?', default='-',
+                        help='the file of input strings, one per line'
+                        ' (default: standard input)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='the file to which to write the results'
+                        ' (default: standard output)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='the number of worker processes (default: 1,'
+                        ' 0 for one per CPU)')
+    parser.add_argument('-c', '--chunksize', type=int,
+                        help='the number of inputs sent to a worker at once')
+    parser.add_argument('-n', '--max-steps', type=int,
+                        help='stop each computation after this many steps')
+    parser.add_argument('-e', '--engine', choices=ENGINES, default='table')
+    parser.add_argument('-l', '--detect-loops', action='store_true',
+                        help='stop computations that repeat a'
+                        ' configuration')
+    parser.add_argument('-t', '--tape', action='store_true',
+                        help='include the final contents of each tape')
+    parser.add_argument('-p', '--pad', action='store_true',
+                        help='surround each input with blanks')
+    parser.add_argument('--progress', type=float,
+                        default=DEFAULT_PROGRESS_SECONDS,
+                        help='the number of seconds between reports of'
+                        ' throughput (0 for none until the end)')
+    arguments = parser.parse_args(argv)
+    # Reject the combinations of options that the engines do not support
+    # (see CompiledMachine.resume) before reading anything.
+    if arguments.detect_loops and arguments.engine != 'table':
+        parser.error('--detect-loops is only supported by the table engine')
+    if arguments.workers < 0:
+        parser.error('--workers must not be negative')
+    if arguments.chunksize is not None and arguments.chunksize < 1:
+        parser.error('--chunksize must be positive')
+    if arguments.max_steps is not None and arguments.max_steps < 0:
+        parser.error('--max-steps must not be negative')
+    errors = (OSError, ImportError, AttributeError, KeyError, TypeError,
+              ValueError)
+    if yaml is not None:
+        errors += (yaml.YAMLError,)
+    try:
+        machine = load_machine(arguments.machine)
+    except errors as exception:
+        parser.error('cannot load {}: {}: {}'.format(
+            arguments.machine, type(exception).__name__, exception))
+    if arguments.inputs == '-':
+        source = sys.stdin
+    else:
+        source = open(arguments.inputs)
+    if arguments.output == '-':
+        output = sys.stdout
+    else:
+        output = open(arguments.output, 'w')
+    strings = (line.rstrip('\r\n') for line in source)
+    if arguments.pad:
+        strings = (BLANK + string + BLANK for string in strings)
+    # The inputs may be consumed by map() in another thread, ahead of the
+    # results, so they are queued here to be written alongside them.
+    pending = deque()
+    strings = (pending.append(string) or string for string in strings)
+    results = machine.map(strings, workers=arguments.workers or None,
+                          chunksize=arguments.chunksize,
+                          max_steps=arguments.max_steps,
+                          return_tape=arguments.tape,
+                          engine=arguments.engine,
+                          detect_loops=arguments.detect_loops,
+                          return_errors=True)
+    count = steps = failures = 0
+    started = reported = time.monotonic()
+
+    def report():
+        elapsed = max(time.monotonic() - started, 1e-9)
+        print('{} inputs, {:.0f} inputs/s, {:.0f} steps/s'.format(
+            count, count / elapsed, steps / elapsed), file=sys.stderr)
+
+    try:
+        for result in results:
+            string = pending.popleft()
+            count += 1
+            if isinstance(result, Exception):
+                failures += 1
+                print('error: input {}: {}: {}'.format(
+                    count, type(result).__name__, result), file=sys.stderr)
+            else:
+                record = dict(input=string, status=result.status,
+                              steps=result.steps)
+                if arguments.tape:
+                    record['tape'] = result.tape
+                output.write(json.dumps(record) + '\n')
+                steps += result.steps
+            now = time.monotonic()
+            if arguments.progress and now - reported >= arguments.progress:
+                output.flush()
+                report()
+                reported = now
+        output.flush()
+        report()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    # Run the main function of the imported module, rather than of this
+    # script, so that the machine is pickled for worker processes as an
+    # instance of turingmachine.TuringMachine.
+    import turingmachine
+    sys.exit(turingmachine.main())